@@ -0,0 +1,26 @@
+"""
+Analytics Metrics
+
+Derived metrics computed from query results (conversion and drop-off rates).
+"""
+from typing import Dict, List, Sequence
+
+
+def _rate(numerator: int, denominator: int) -> float:
+    return round(numerator / denominator, 4) if denominator else 0.0
+
+
+def funnel_conversion(steps: Sequence[str], counts: Sequence[int]) -> List[Dict]:
+    """Per-step users plus conversion from the previous step and from the funnel entry."""
+    entered = counts[0] if counts else 0
+    result = []
+    for index, (step, users) in enumerate(zip(steps, counts)):
+        previous = counts[index - 1] if index else users
+        result.append({
+            "step": step,
+            "users": users,
+            "conversion_from_previous": _rate(users, previous),
+            "conversion_from_start": _rate(users, entered),
+            "drop_off": previous - users,
+        })
+    return result
@@ -0,0 +1,171 @@
+"""
+Analytics Queries
+
+Set-based SQL for the analytics endpoints. Everything runs in the database as
+one statement; nothing iterates over users or events in Python.
+
+Funnels
+-------
+A funnel is an ordered list of steps from ``FUNNEL_STEPS``. A user enters the
+funnel at their first occurrence of the first step inside ``[start, end)``.
+They reach step *n* when a step *n* event happens at or after the time they
+reached step *n-1*, and no later than ``entry time + window``. At each step the
+earliest qualifying event is taken, so users are counted at most once per step.
+
+Each step becomes a CTE that joins the previous step's users to the step's
+event table on ``user_id`` and an ``event_time`` range. These joins are served
+by the ``(user_id, event_time)`` indexes, and order-level steps use the
+``order_id`` indexes. Guest events (``user_id`` NULL) cannot be followed across
+tables and are excluded.
+"""
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from app.db.functions import add_seconds
+from app.db.models.cart_events import CartEvent
+from app.db.models.logistics_events import LogisticsEvent, LogisticsStatus
+from app.db.models.order_events import OrderEvent
+from app.db.models.order_item_events import OrderItemEvent
+from app.db.models.payment_events import PaymentEvent
+from app.db.models.user_behavior_events import UserBehaviorEvent, UserBehaviorEventType
+
+# payment_events.status is free text; these count as a completed payment
+PAYMENT_SUCCESS_STATUSES = ("success", "succeeded", "paid", "captured", "completed")
+
+DEFAULT_FUNNEL = ("view", "cart", "order", "payment", "delivered")
+
+
+def _orders_with_product(product_id: int):
+    # order_item_events.product_id is a string column
+    return select(OrderItemEvent.order_id).where(OrderItemEvent.product_id == str(product_id))
+
+
+def _behavior_step(event_type: UserBehaviorEventType):
+    def source(product_id: Optional[int]):
+        query = select(UserBehaviorEvent.user_id, UserBehaviorEvent.event_time).where(
+            UserBehaviorEvent.event_type == event_type
+        )
+        if product_id is not None:
+            query = query.where(UserBehaviorEvent.product_id == product_id)
+        return query, UserBehaviorEvent.event_time
+    return source
+
+
+def _cart_step(product_id: Optional[int]):
+    # action is free text as sent by the client ("add", "Add", "ADD")
+    query = select(CartEvent.user_id, CartEvent.event_time).where(func.lower(CartEvent.action) == "add")
+    if product_id is not None:
+        query = query.where(CartEvent.product_id == product_id)
+    return query, CartEvent.event_time
+
+
+def _order_step(product_id: Optional[int]):
+    query = select(OrderEvent.user_id, OrderEvent.event_time)
+    if product_id is not None:
+        query = query.where(OrderEvent.order_id.in_(_orders_with_product(product_id)))
+    return query, OrderEvent.event_time
+
+
+def _payment_step(product_id: Optional[int]):
+    query = (
+        select(OrderEvent.user_id, PaymentEvent.event_time)
+        .join(OrderEvent, OrderEvent.order_id == PaymentEvent.order_id)
+        .where(func.lower(PaymentEvent.status).in_(PAYMENT_SUCCESS_STATUSES))
+    )
+    if product_id is not None:
+        query = query.where(PaymentEvent.order_id.in_(_orders_with_product(product_id)))
+    return query, PaymentEvent.event_time
+
+
+def _delivered_step(product_id: Optional[int]):
+    query = (
+        select(OrderEvent.user_id, LogisticsEvent.event_time)
+        .join(OrderEvent, OrderEvent.order_id == LogisticsEvent.order_id)
+        .where(LogisticsEvent.status == LogisticsStatus.DELIVERED)
+    )
+    if product_id is not None:
+        query = query.where(LogisticsEvent.order_id.in_(_orders_with_product(product_id)))
+    return query, LogisticsEvent.event_time
+
+
+# step name -> builder returning (select of (user_id, event_time), event_time column)
+FUNNEL_STEPS: Dict[str, Callable] = {
+    "view": _behavior_step(UserBehaviorEventType.PRODUCT_VIEWED),
+    "search": _behavior_step(UserBehaviorEventType.PRODUCT_SEARCHED),
+    "cart": _cart_step,
+    "order": _order_step,
+    "payment": _payment_step,
+    "delivered": _delivered_step,
+}
+
+
+def funnel_counts(
+    db: Session,
+    steps: Sequence[str],
+    start: datetime,
+    end: datetime,
+    window: timedelta,
+    product_id: Optional[int] = None,
+) -> List[int]:
+    """Number of users reaching each step of the funnel, in step order."""
+    unknown = [step for step in steps if step not in FUNNEL_STEPS]
+    if unknown:
+        raise ValueError(f"Unknown funnel steps: {', '.join(unknown)}")
+    if len(steps) < 2:
+        raise ValueError("A funnel needs at least two steps")
+
+    dialect = db.get_bind().dialect.name
+    horizon = end + window  # no later step can happen after this
+
+    def step_events(index: int, step: str, upper: datetime):
+        query, event_time = FUNNEL_STEPS[step](product_id)
+        return (
+            query.where(event_time >= start, event_time < upper)
+            .subquery(f"events_{index}")
+        )
+
+    entry = step_events(0, steps[0], end)
+    previous = (
+        select(
+            entry.c.user_id,
+            func.min(entry.c.event_time).label("entered_at"),
+            func.min(entry.c.event_time).label("reached_at"),
+        )
+        .where(entry.c.user_id.is_not(None))
+        .group_by(entry.c.user_id)
+        .cte("step_0")
+    )
+    ctes = [previous]
+
+    for index, step in enumerate(steps[1:], start=1):
+        events = step_events(index, step, horizon)
+        previous = (
+            select(
+                previous.c.user_id,
+                previous.c.entered_at,
+                func.min(events.c.event_time).label("reached_at"),
+            )
+            .join_from(
+                previous,
+                events,
+                and_(
+                    events.c.user_id == previous.c.user_id,
+                    events.c.event_time >= previous.c.reached_at,
+                    events.c.event_time <= add_seconds(
+                        previous.c.entered_at, window.total_seconds(), dialect
+                    ),
+                ),
+            )
+            .group_by(previous.c.user_id, previous.c.entered_at)
+            .cte(f"step_{index}")
+        )
+        ctes.append(previous)
+
+    counts = select(*[
+        select(func.count()).select_from(cte).scalar_subquery().label(f"step_{i}")
+        for i, cte in enumerate(ctes)
+    ])
+    return list(db.execute(counts).one())
@@ -0,0 +1,151 @@
+"""
+Behavior Trends
+
+View/search time series for one product or for all products, at ``hour``,
+``day`` or ``week`` granularity (UTC; weeks start on Monday).
+
+Counts come from ``hourly_product_behavior_agg``. Hourly rows are summed per
+hour in SQL and rolled up to days or weeks here, so a series costs one row per
+hour of the range, however many products there are.
+
+In ``watermark`` aggregation mode the aggregate lags behind ingestion. Events
+ingested after the job's watermark are counted from ``user_behavior_events``,
+through the ``ingested_at`` index, so only the not-yet-aggregated tail is read.
+The aggregate rows and the tail, bounded by the watermark, are read in a
+single statement. As a result, an aggregation run that commits concurrently
+cannot make an event count twice or not at all.
+
+In ``inmemory`` mode there is no such boundary. Series come from the aggregate
+alone and trail ingestion by up to ``AGGREGATOR_INTERVAL_S``.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import case, func, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.config import AGGREGATOR_MODE
+from app.db.functions import as_utc, hour_bucket
+from app.db.models.aggregates import AggregationWatermark, HourlyProductBehaviorAggregate
+from app.db.models.user_behavior_events import UserBehaviorEvent, UserBehaviorEventType
+from app.services.persistence.aggregates import COUNT_COLUMNS, JOB_NAME, get_watermark
+
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1)}
+
+# Upper bound on points per series (about seven months of hours)
+MAX_POINTS = 5000
+
+
+class TrendSeries(NamedTuple):
+    start: datetime                       # aligned to the first bucket
+    end: datetime                         # aligned to the end of the last bucket
+    aggregated_until: Optional[datetime]  # watermark the raw tail starts from
+    points: List[Dict]
+
+
+def bucket_start(value: datetime, granularity: str) -> datetime:
+    value = as_utc(value).replace(minute=0, second=0, microsecond=0)
+    if granularity == "hour":
+        return value
+    value = value.replace(hour=0)
+    if granularity == "week":
+        value -= timedelta(days=value.weekday())
+    return value
+
+
+def aligned_range(start: datetime, end: datetime, granularity: str):
+    """``[start, end)`` widened to whole buckets."""
+    first = bucket_start(start, granularity)
+    last = bucket_start(end, granularity)
+    if last < as_utc(end):
+        last += GRANULARITIES[granularity]
+    return first, last
+
+
+def hourly_totals(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    product_id: Optional[int] = None,
+    include_tail: bool = True,
+) -> Dict[datetime, Dict[str, int]]:
+    """
+    Counts per UTC hour in ``[start, end)``: aggregated hours, plus raw events
+    ingested after the aggregation watermark when ``include_tail``.
+    """
+    dialect = db.get_bind().dialect.name
+    agg = HourlyProductBehaviorAggregate
+    aggregated = select(
+        hour_bucket(agg.event_hour, dialect).label("event_hour"),
+        *[getattr(agg, name).label(name) for name in COUNT_COLUMNS],
+    ).where(agg.event_hour >= start, agg.event_hour < end)
+    if product_id is not None:
+        aggregated = aggregated.where(agg.product_id == product_id)
+    parts = [aggregated]
+
+    if include_tail:
+        event = UserBehaviorEvent
+        bucket = hour_bucket(event.event_time, dialect)
+        watermark = (
+            select(AggregationWatermark.watermark)
+            .where(AggregationWatermark.job_name == JOB_NAME)
+            .scalar_subquery()
+        )
+        tail = (
+            select(
+                bucket.label("event_hour"),
+                func.sum(case((event.event_type == UserBehaviorEventType.PRODUCT_VIEWED, 1), else_=0)),
+                func.sum(case((event.event_type == UserBehaviorEventType.PRODUCT_SEARCHED, 1), else_=0)),
+                func.count(),
+            )
+            # No watermark yet compares as NULL: nothing is read from the raw table.
+            .where(event.ingested_at > watermark, event.event_time >= start, event.event_time < end)
+            .group_by(bucket)
+        )
+        if product_id is not None:
+            tail = tail.where(event.product_id == product_id)
+        parts.append(tail)
+
+    rows = union_all(*parts).subquery("hourly")
+    query = (
+        select(rows.c.event_hour, *[func.sum(rows.c[name]) for name in COUNT_COLUMNS])
+        .group_by(rows.c.event_hour)
+    )
+    return {
+        as_utc(event_hour): dict(zip(COUNT_COLUMNS, counts))
+        for event_hour, *counts in db.execute(query)
+    }
+
+
+def behavior_trend(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    granularity: str = "hour",
+    product_id: Optional[int] = None,
+) -> TrendSeries:
+    """A zero-filled series of view/search counts per bucket of ``granularity``."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity '{granularity}', expected one of: {', '.join(GRANULARITIES)}")
+    step = GRANULARITIES[granularity]
+    first, last = aligned_range(start, end, granularity)
+    if (last - first) / step > MAX_POINTS:
+        raise ValueError(f"Range too large for granularity '{granularity}' (max {MAX_POINTS} points)")
+
+    include_tail = AGGREGATOR_MODE == "watermark"
+    buckets = {}
+    bucket = first
+    while bucket < last:
+        buckets[bucket] = {name: 0 for name in COUNT_COLUMNS}
+        bucket += step
+    for hour, counts in hourly_totals(db, first, last, product_id, include_tail).items():
+        totals = buckets[bucket_start(hour, granularity)]
+        for name in COUNT_COLUMNS:
+            totals[name] += counts[name]
+
+    return TrendSeries(
+        start=first,
+        end=last,
+        aggregated_until=get_watermark(db) if include_tail else None,
+        points=[{"bucket_start": key, **counts} for key, counts in buckets.items()],
+    )
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
-from app.api.v1.routers import events
+from app.core.config import DB_ASYNC
+from app.api.v1.routers import analytics, events, events_async
 
 api_router = APIRouter()
 
-api_router.include_router(events.router)
+api_router.include_router(events_async.router if DB_ASYNC else events.router)
+api_router.include_router(analytics.router)
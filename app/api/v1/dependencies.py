@@ -0,0 +1,227 @@
+"""
+Shared request dependencies and helpers for the v1 ingestion routers.
+
+Used by both the sync (``routers/events.py``) and async
+(``routers/events_async.py``) implementations so they behave identically.
+Everything that does no database I/O lives here; the routers only sequence
+the queries, the writes and the commit around these helpers.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from uuid import UUID
+
+from fastapi import Body, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.core.config import BATCH_MAX_SIZE, INGEST_RESPONSE_MODE
+from app.core.metrics import record_duplicates, record_rejects
+from app.db.partitioning import unique_columns
+from app.schemas.events.base import (
+    BatchIngestResponse,
+    BatchItemResult,
+    EventExportQuery,
+    IngestResponseMode,
+)
+from app.services.ingestion.dedup import remember
+from app.services.persistence.event_writer import (
+    WriterQueueFull,
+    WriterStopped,
+    get_event_writer,
+    notify_committed,
+)
+from app.services.persistence.exporters import MEDIA_TYPES, export_filename
+
+BatchPayload = List[Dict[str, Any]]
+
+
+def batch_body():
+    return Body(..., min_length=1, max_length=BATCH_MAX_SIZE)
+
+
+def get_response_mode(
+    response_mode: Optional[IngestResponseMode] = Query(
+        None,
+        description="'lean' skips the post-commit re-read and echoes the payload "
+                    "plus generated fields. Defaults to INGEST_RESPONSE_MODE.",
+    ),
+) -> IngestResponseMode:
+    return response_mode or IngestResponseMode(INGEST_RESPONSE_MODE)
+
+
+def conflict_detail(model) -> str:
+    unique = [c.name for c in unique_columns(model)]
+    if unique:
+        return f"{unique[0]} already exists"
+    return "event conflicts with an existing event"
+
+
+def buffered_writer(model):
+    """
+    Return the write-behind writer if ``model`` may be written through it.
+
+    Tables with unique constraints (order_events.order_id) stay synchronous so
+    conflicts can still be reported to the client as 409s.
+    """
+    writer = get_event_writer()
+    if writer is None or unique_columns(model):
+        return None
+    return writer
+
+
+def enqueue(writer, model, rows):
+    try:
+        return writer.submit_many(model, rows)
+    except WriterQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="ingestion queue is full, retry later",
+            headers={"Retry-After": "1"},
+        )
+
+
+def write_behind(model, rows) -> Optional[List[UUID]]:
+    """
+    Enqueue ``rows`` on the write-behind writer and return their event_ids,
+    or None when they must be written synchronously (no writer, a table with
+    unique columns, or a writer that is shutting down).
+    """
+    writer = buffered_writer(model)
+    if writer is None:
+        return None
+    try:
+        event_ids = enqueue(writer, model, rows)
+    except WriterStopped:
+        return None
+    remember(model, [row.get("idempotency_key") for row in rows], event_ids)
+    return event_ids
+
+
+def buffer_event(response: Response, model, data: Dict[str, Any]) -> bool:
+    """Hand one event to the write-behind writer; True (and a 202) if it took it."""
+    event_ids = write_behind(model, [data])
+    if event_ids is None:
+        return False
+    data["event_id"] = event_ids[0]
+    response.status_code = status.HTTP_202_ACCEPTED
+    return True
+
+
+def committed(model, rows: Sequence[Dict[str, Any]], event_ids: Sequence[UUID]) -> None:
+    """Bookkeeping once ``rows`` are committed: commit listeners and the dedup cache."""
+    notify_committed(model, rows)
+    remember(model, [row.get("idempotency_key") for row in rows], event_ids)
+
+
+def replay_duplicate(response: Response, model, payload: BaseModel, event_id) -> Dict[str, Any]:
+    """Answer a retried event with the original event_id instead of writing it again."""
+    record_duplicates(model, 1)
+    response.status_code = status.HTTP_200_OK
+    response.headers["Idempotent-Replayed"] = "true"
+    return {**payload.model_dump(), "event_id": event_id}
+
+
+def replay_or_conflict(response: Response, model, payload: BaseModel, original) -> Dict[str, Any]:
+    """Replay the original of a conflicting event, or answer 409 when there is none."""
+    if original is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=conflict_detail(model))
+    return replay_duplicate(response, model, payload, original)
+
+
+def batch_conflict() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="batch conflicts with concurrently ingested events",
+    )
+
+
+def screened(model, accepted, rejected, duplicates, conflicts):
+    """Count a screened batch's rejects and duplicates; conflicts join the rejects."""
+    record_rejects(model, len(rejected), len(conflicts))
+    record_duplicates(model, len(duplicates))
+    rejected.extend(conflicts)
+    return accepted, rejected, duplicates
+
+
+def resolve_duplicates(accepted, event_ids, duplicates) -> list:
+    """Point repeats within a batch at the event_id of their first occurrence."""
+    if all(duplicate.event_id is not None for duplicate in duplicates):
+        return list(duplicates)
+    ids_by_key = {item.idempotency_key: event_id for (_, item), event_id in zip(accepted, event_ids)}
+    return [
+        duplicate if duplicate.event_id is not None
+        else duplicate._replace(event_id=ids_by_key.get(duplicate.key))
+        for duplicate in duplicates
+    ]
+
+
+def reindex(positions: List[int], accepted, rejected, duplicates, error_prefix=()):
+    """
+    Map results of validating a sub-list back to positions in the submitted
+    batch, optionally prefixing error locations (e.g. with ``"data"``).
+    """
+    accepted = [(positions[index], item) for index, item in accepted]
+    rejected = [
+        (positions[index], [{**error, "loc": [*error_prefix, *error["loc"]]} for error in errors])
+        for index, errors in rejected
+    ]
+    duplicates = [duplicate._replace(index=positions[duplicate.index]) for duplicate in duplicates]
+    return accepted, rejected, duplicates
+
+
+def build_batch_response(accepted, rejected, event_ids, duplicates=()) -> BatchIngestResponse:
+    """Merge accepted/rejected/duplicate items back into submission order."""
+    results = [
+        BatchItemResult(index=index, status="accepted", event_id=event_id)
+        for (index, _), event_id in zip(accepted, event_ids)
+    ]
+    results.extend(
+        BatchItemResult(index=index, status="rejected", errors=errors)
+        for index, errors in rejected
+    )
+    results.extend(
+        BatchItemResult(index=duplicate.index, status="duplicate", event_id=duplicate.event_id)
+        for duplicate in resolve_duplicates(accepted, event_ids, duplicates)
+    )
+    results.sort(key=lambda r: r.index)
+    return BatchIngestResponse(
+        accepted=len(accepted),
+        rejected=len(rejected),
+        duplicates=len(duplicates),
+        results=results,
+    )
+
+
+def build_envelope_response(screened_groups: Iterable, event_ids_per_group: Iterable, rejected) -> BatchIngestResponse:
+    """
+    Response to a committed mixed batch. ``screened_groups`` holds one
+    ``(model, accepted, duplicates, rows)`` per table, ``event_ids_per_group``
+    the ids written for each.
+    """
+    all_accepted, all_duplicates, all_event_ids = [], [], []
+    for (model, accepted, duplicates, rows), event_ids in zip(screened_groups, event_ids_per_group):
+        committed(model, rows, event_ids)
+        all_accepted.extend(accepted)
+        all_event_ids.extend(event_ids)
+        all_duplicates.extend(resolve_duplicates(accepted, event_ids, duplicates))
+    return build_batch_response(all_accepted, rejected, all_event_ids, all_duplicates)
+
+
+def invalid_cursor(exc: Exception) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+
+
+def page(response: Response, rows, next_cursor: Optional[str]):
+    """One keyset page of events; the next page's cursor goes in ``X-Next-Cursor``."""
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+
+def export_response(chunks, model, query: EventExportQuery) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[query.format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{export_filename(model, query.format)}"'
+        },
+    )
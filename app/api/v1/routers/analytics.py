@@ -0,0 +1,104 @@
+"""
+API Router for Analytics
+
+Read-only endpoints for dashboards. Counters and trends are served from
+pre-aggregated tables; funnels run as a single set-based query over
+index-backed ranges.
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.db import get_db
+from app.db.functions import as_utc
+from app.analytics.metrics import funnel_conversion
+from app.analytics.queries import DEFAULT_FUNNEL, FUNNEL_STEPS, funnel_counts
+from app.analytics.trends import GRANULARITIES, behavior_trend
+from app.schemas.analytics import FunnelResponse, HourlyProductCounts, TrendResponse
+from app.services.persistence.aggregates import read_hourly_counts
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+def _check_range(start: datetime, end: datetime) -> Tuple[datetime, datetime]:
+    """``(start, end)`` as UTC; naive timestamps are taken to be UTC."""
+    start, end = as_utc(start), as_utc(end)
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="end must be after start",
+        )
+    return start, end
+
+
+@router.get("/products/hourly", response_model=List[HourlyProductCounts])
+def get_hourly_product_counts(
+    start: datetime,
+    end: datetime,
+    product_id: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """Hourly view/search counts per product for [start, end) from hourly_product_behavior_agg."""
+    start, end = _check_range(start, end)
+    return read_hourly_counts(db, start, end, product_id)
+
+
+@router.get("/funnel", response_model=FunnelResponse)
+def get_funnel(
+    start: datetime,
+    end: datetime,
+    steps: str = Query(
+        ",".join(DEFAULT_FUNNEL),
+        description=f"Comma-separated ordered steps from: {', '.join(FUNNEL_STEPS)}",
+    ),
+    window_hours: float = Query(72, gt=0, description="Conversion window from funnel entry"),
+    product_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """Users reaching each funnel step in [start, end), with conversion and drop-off."""
+    start, end = _check_range(start, end)
+    step_names = [step.strip() for step in steps.split(",") if step.strip()]
+    try:
+        counts = funnel_counts(
+            db, step_names, start, end, timedelta(hours=window_hours), product_id
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+
+    return FunnelResponse(
+        start=start,
+        end=end,
+        window_hours=window_hours,
+        product_id=product_id,
+        steps=funnel_conversion(step_names, counts),
+    )
+
+
+@router.get("/trends", response_model=TrendResponse)
+def get_trends(
+    start: datetime,
+    end: datetime,
+    granularity: str = Query("hour", description=f"One of: {', '.join(GRANULARITIES)}"),
+    product_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    View/search counts per hour, day or week in [start, end), for one product
+    or all of them. The range is widened to whole buckets (UTC, weeks from Monday).
+    """
+    start, end = _check_range(start, end)
+    try:
+        series = behavior_trend(db, start, end, granularity, product_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+
+    return TrendResponse(
+        granularity=granularity,
+        start=series.start,
+        end=series.end,
+        product_id=product_id,
+        aggregated_until=series.aggregated_until,
+        points=series.points,
+    )
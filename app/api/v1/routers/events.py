@@ -4,17 +4,26 @@ API Router for Event Ingestion
 This router handles HTTP requests for various event types and routes them
 to the appropriate database tables.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
 # Import Pydantic schemas
-from app.schemas.events.user_events import UserBehaviorCreate
-from app.schemas.events.cart_events import CartCreate
-from app.schemas.events.order_events import OrderCreate
-from app.schemas.events.order_base import OrderItemCreate
-from app.schemas.events.payment_events import PaymentCreate
-from app.schemas.events.logistic_events import LogisticsCreate
+from app.schemas.events.user_events import UserBehaviorCreate, UserBehaviorQuery
+from app.schemas.events.cart_events import CartCreate, CartQuery
+from app.schemas.events.order_events import OrderCreate, OrderQuery
+from app.schemas.events.order_base import OrderItemCreate, OrderItemQuery
+from app.schemas.events.payment_events import PaymentCreate, PaymentQuery
+from app.schemas.events.logistic_events import LogisticsCreate, LogisticsQuery
+from app.schemas.events.base import (
+    BatchIngestResponse,
+    EventExportQuery,
+    EventQuery,
+    IngestResponseMode,
+)
 
 # Import SQLAlchemy models
 from app.db.models.user_behavior_events import UserBehaviorEvent
@@ -25,103 +34,409 @@ from app.db.models.payment_events import PaymentEvent
 from app.db.models.logistics_events import LogisticsEvent
 
 from app.db import get_db
+from app.api.v1.dependencies import (
+    BatchPayload,
+    batch_body,
+    buffer_event,
+    batch_conflict,
+    build_batch_response,
+    build_envelope_response,
+    committed,
+    export_response,
+    get_response_mode,
+    invalid_cursor,
+    page,
+    reindex,
+    replay_duplicate,
+    replay_or_conflict,
+    screened,
+    write_behind,
+)
+from app.services.ingestion.dedup import assign_key, cached_original, drop_duplicates, find_original
+from app.services.ingestion.event_router import EVENT_TYPES, EventEnvelope, group_envelopes
+from app.services.ingestion.pipeline import prepare_rows
+from app.services.ingestion.validators import (
+    find_unique_conflict,
+    reject_unique_conflicts,
+    validate_batch,
+)
+from app.services.persistence.event_writer import insert_event_returning, insert_events
+from app.services.persistence.exporters import stream_export
+from app.services.persistence.readers import InvalidCursor, read_events_page
 
 router = APIRouter(prefix="/events", tags=["Events"])
 
 
+def _create_event(db: Session, response: Response, payload, model, mode: IngestResponseMode):
+    """
+    Persist one event, through the write-behind buffer when it is running.
+
+    In lean mode the row is written with a single INSERT (plus RETURNING for
+    server defaults) instead of add/commit/refresh. A retry of an event that
+    was already written is answered with the original event_id (200).
+    Unique columns the database cannot enforce are checked up front (409).
+    """
+    key = assign_key(payload)
+    original = cached_original(model, key)
+    if original is not None:
+        return replay_duplicate(response, model, payload, original)
+    if find_unique_conflict(db, model, payload) is not None:
+        return replay_or_conflict(response, model, payload, find_original(db, model, key))
+
+    data = payload.model_dump()
+    prepare_rows(db, model, [data])
+    if buffer_event(response, model, data):
+        return data
+
+    try:
+        if mode is IngestResponseMode.LEAN:
+            data = insert_event_returning(db, model, data)
+            db.commit()
+            committed(model, [data], [data["event_id"]])
+            return data
+
+        db_event = model(**data)
+        db.add(db_event)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return replay_or_conflict(response, model, payload, find_original(db, model, key))
+    db.refresh(db_event)
+    committed(model, [data], [db_event.event_id])
+    return db_event
+
+
+def _screen_batch(db: Session, payloads, schema, model):
+    """Validate a batch, drop retried events and reject unique conflicts."""
+    accepted, rejected = validate_batch(schema, payloads)
+    accepted, duplicates = drop_duplicates(db, model, accepted)
+    accepted, conflicts = reject_unique_conflicts(db, model, accepted)
+    return screened(model, accepted, rejected, duplicates, conflicts)
+
+
+def _ingest_batch(db: Session, payloads: BatchPayload, schema, model) -> BatchIngestResponse:
+    """
+    Validate a batch in one pass and insert the valid items in one transaction.
+    Retries of already written events are reported as duplicates, not written.
+    """
+    accepted, rejected, duplicates = _screen_batch(db, payloads, schema, model)
+    rows = [item.model_dump() for _, item in accepted]
+    prepare_rows(db, model, rows)
+
+    event_ids = write_behind(model, rows)
+    if event_ids is None:
+        try:
+            event_ids = insert_events(db, model, rows)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise batch_conflict()
+        committed(model, rows, event_ids)
+    return build_batch_response(accepted, rejected, event_ids, duplicates)
+
+
+def _ingest_envelopes(db: Session, envelopes: BatchPayload) -> BatchIngestResponse:
+    """
+    Ingest a mixed batch of typed envelopes: group the items per table, screen
+    each group like a per-type batch and write each group with one bulk
+    insert. All groups commit in one transaction; mixed batches bypass the
+    write-behind buffer so the batch is stored (or fails) as a whole.
+    """
+    groups, rejected = group_envelopes(envelopes)
+    screened_groups = []
+    for name, (positions, payloads) in groups.items():
+        model = EVENT_TYPES[name].model
+        accepted, group_rejected, duplicates = reindex(
+            positions, *_screen_batch(db, payloads, EVENT_TYPES[name].schema, model), error_prefix=("data",)
+        )
+        rejected.extend(group_rejected)
+        rows = [item.model_dump() for _, item in accepted]
+        prepare_rows(db, model, rows)
+        screened_groups.append((model, accepted, duplicates, rows))
+
+    try:
+        event_ids = [insert_events(db, model, rows) for model, _, _, rows in screened_groups]
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise batch_conflict()
+    return build_envelope_response(screened_groups, event_ids, rejected)
+
+
+def _read_events(db: Session, response: Response, model, query: EventQuery):
+    """One keyset page of events; the next page's cursor goes in ``X-Next-Cursor``."""
+    try:
+        return page(response, *read_events_page(db, model, query))
+    except InvalidCursor as exc:
+        raise invalid_cursor(exc)
+
+
+def _export_events(db: Session, model, query: EventExportQuery) -> StreamingResponse:
+    """Stream the whole (time-filtered) table; the export runs on its own session."""
+    return export_response(stream_export(db.get_bind(), model, query), model, query)
+
+
+# Generic endpoints: one URL for every event type
+@router.post("", status_code=status.HTTP_201_CREATED)
+def create_event(
+    envelope: EventEnvelope,
+    response: Response,
+    mode: IngestResponseMode = Depends(get_response_mode),
+    db: Session = Depends(get_db),
+):
+    """Create an event of any type from a ``{"type": ..., "data": {...}}`` envelope."""
+    return _create_event(db, response, envelope.data, EVENT_TYPES[envelope.type].model, mode)
+
+
+@router.post("/batch", response_model=BatchIngestResponse)
+def create_events_batch(
+    envelopes: BatchPayload = batch_body(),
+    db: Session = Depends(get_db),
+):
+    """Create a mixed batch of typed envelopes; items are validated and reported individually."""
+    return _ingest_envelopes(db, envelopes)
+
+
 # 1️ User Behavior
 @router.post("/user-behavior", status_code=status.HTTP_201_CREATED)
 def create_user_behavior_event(
     payload: UserBehaviorCreate,
+    response: Response,
+    mode: IngestResponseMode = Depends(get_response_mode),
     db: Session = Depends(get_db),
 ):
     """Create a new user behavior event."""
-    db_event = UserBehaviorEvent(**payload.model_dump())
-    db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
-    return db_event
+    return _create_event(db, response, payload, UserBehaviorEvent, mode)
 
 
 # 2️ Cart
 @router.post("/cart", status_code=status.HTTP_201_CREATED)
 def create_cart_event(
     payload: CartCreate,
+    response: Response,
+    mode: IngestResponseMode = Depends(get_response_mode),
     db: Session = Depends(get_db),
 ):
     """Create a new cart event."""
-    db_event = CartEvent(**payload.model_dump())
-    db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
-    return db_event
+    return _create_event(db, response, payload, CartEvent, mode)
 
 
 # 3️ Order
 @router.post("/order", status_code=status.HTTP_201_CREATED)
 def create_order_event(
     payload: OrderCreate,
+    response: Response,
+    mode: IngestResponseMode = Depends(get_response_mode),
     db: Session = Depends(get_db),
 ):
     """Create a new order event."""
-    db_event = OrderEvent(**payload.model_dump())
-    db.add(db_event)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="order_id already exists",
-        )
-    db.refresh(db_event)
-    return db_event
+    return _create_event(db, response, payload, OrderEvent, mode)
 
 
 # 4️ Order Item
 @router.post("/order-item", status_code=status.HTTP_201_CREATED)
 def create_order_item_event(
     payload: OrderItemCreate,
+    response: Response,
+    mode: IngestResponseMode = Depends(get_response_mode),
     db: Session = Depends(get_db),
 ):
     """Create a new order item event."""
-    db_event = OrderItemEvent(**payload.model_dump())
-    db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
-    return db_event
+    return _create_event(db, response, payload, OrderItemEvent, mode)
 
 
 # 5️ Payment
 @router.post("/payment", status_code=status.HTTP_201_CREATED)
 def create_payment_event(
     payload: PaymentCreate,
+    response: Response,
+    mode: IngestResponseMode = Depends(get_response_mode),
     db: Session = Depends(get_db),
 ):
     """Create a new payment event."""
-    db_event = PaymentEvent(**payload.model_dump())
-    db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
-    return db_event
+    return _create_event(db, response, payload, PaymentEvent, mode)
 
 
 # 6️ Logistics
 @router.post("/logistics", status_code=status.HTTP_201_CREATED)
 def create_logistics_event(
     payload: LogisticsCreate,
+    response: Response,
+    mode: IngestResponseMode = Depends(get_response_mode),
     db: Session = Depends(get_db),
 ):
     """Create a new logistics event."""
-    db_event = LogisticsEvent(**payload.model_dump())
-    db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
-    return db_event
+    return _create_event(db, response, payload, LogisticsEvent, mode)
+
+
+# Batch endpoints
+@router.post("/user-behavior/batch", response_model=BatchIngestResponse)
+def create_user_behavior_events_batch(
+    payloads: BatchPayload = batch_body(),
+    db: Session = Depends(get_db),
+):
+    """Create a batch of user behavior events."""
+    return _ingest_batch(db, payloads, UserBehaviorCreate, UserBehaviorEvent)
+
+
+@router.post("/cart/batch", response_model=BatchIngestResponse)
+def create_cart_events_batch(
+    payloads: BatchPayload = batch_body(),
+    db: Session = Depends(get_db),
+):
+    """Create a batch of cart events."""
+    return _ingest_batch(db, payloads, CartCreate, CartEvent)
+
+
+@router.post("/order/batch", response_model=BatchIngestResponse)
+def create_order_events_batch(
+    payloads: BatchPayload = batch_body(),
+    db: Session = Depends(get_db),
+):
+    """Create a batch of order events. Duplicate order_ids are rejected per item."""
+    return _ingest_batch(db, payloads, OrderCreate, OrderEvent)
+
+
+@router.post("/order-item/batch", response_model=BatchIngestResponse)
+def create_order_item_events_batch(
+    payloads: BatchPayload = batch_body(),
+    db: Session = Depends(get_db),
+):
+    """Create a batch of order item events."""
+    return _ingest_batch(db, payloads, OrderItemCreate, OrderItemEvent)
+
+
+@router.post("/payment/batch", response_model=BatchIngestResponse)
+def create_payment_events_batch(
+    payloads: BatchPayload = batch_body(),
+    db: Session = Depends(get_db),
+):
+    """Create a batch of payment events."""
+    return _ingest_batch(db, payloads, PaymentCreate, PaymentEvent)
+
+
+@router.post("/logistics/batch", response_model=BatchIngestResponse)
+def create_logistics_events_batch(
+    payloads: BatchPayload = batch_body(),
+    db: Session = Depends(get_db),
+):
+    """Create a batch of logistics events."""
+    return _ingest_batch(db, payloads, LogisticsCreate, LogisticsEvent)
 
 
 # GET endpoints
+# Pages are ordered by (event_time, event_id). Pass the X-Next-Cursor header of
+# a response as ``cursor`` to fetch the next page; it is absent on the last page.
 @router.get("/user-behavior")
-def get_user_behavior_events(db: Session = Depends(get_db)):
-    """Retrieve user behavior events (limited to 100)."""
-    return db.query(UserBehaviorEvent).limit(100).all()
+def get_user_behavior_events(
+    query: Annotated[UserBehaviorQuery, Query()],
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """Retrieve a page of user behavior events."""
+    return _read_events(db, response, UserBehaviorEvent, query)
+
+
+@router.get("/cart")
+def get_cart_events(
+    query: Annotated[CartQuery, Query()],
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """Retrieve a page of cart events."""
+    return _read_events(db, response, CartEvent, query)
+
+
+@router.get("/order")
+def get_order_events(
+    query: Annotated[OrderQuery, Query()],
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """Retrieve a page of order events."""
+    return _read_events(db, response, OrderEvent, query)
+
+
+@router.get("/order-item")
+def get_order_item_events(
+    query: Annotated[OrderItemQuery, Query()],
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """Retrieve a page of order item events."""
+    return _read_events(db, response, OrderItemEvent, query)
+
+
+@router.get("/payment")
+def get_payment_events(
+    query: Annotated[PaymentQuery, Query()],
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """Retrieve a page of payment events."""
+    return _read_events(db, response, PaymentEvent, query)
+
+
+@router.get("/logistics")
+def get_logistics_events(
+    query: Annotated[LogisticsQuery, Query()],
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """Retrieve a page of logistics events."""
+    return _read_events(db, response, LogisticsEvent, query)
+
+
+# Export endpoints
+@router.get("/user-behavior/export")
+def export_user_behavior_events(
+    query: Annotated[EventExportQuery, Query()],
+    db: Session = Depends(get_db),
+):
+    """Stream user behavior events as NDJSON or CSV."""
+    return _export_events(db, UserBehaviorEvent, query)
+
+
+@router.get("/cart/export")
+def export_cart_events(
+    query: Annotated[EventExportQuery, Query()],
+    db: Session = Depends(get_db),
+):
+    """Stream cart events as NDJSON or CSV."""
+    return _export_events(db, CartEvent, query)
+
+
+@router.get("/order/export")
+def export_order_events(
+    query: Annotated[EventExportQuery, Query()],
+    db: Session = Depends(get_db),
+):
+    """Stream order events as NDJSON or CSV."""
+    return _export_events(db, OrderEvent, query)
+
+
+@router.get("/order-item/export")
+def export_order_item_events(
+    query: Annotated[EventExportQuery, Query()],
+    db: Session = Depends(get_db),
+):
+    """Stream order item events as NDJSON or CSV."""
+    return _export_events(db, OrderItemEvent, query)
+
+
+@router.get("/payment/export")
+def export_payment_events(
+    query: Annotated[EventExportQuery, Query()],
+    db: Session = Depends(get_db),
+):
+    """Stream payment events as NDJSON or CSV."""
+    return _export_events(db, PaymentEvent, query)
+
+
+@router.get("/logistics/export")
+def export_logistics_events(
+    query: Annotated[EventExportQuery, Query()],
+    db: Session = Depends(get_db),
+):
+    """Stream logistics events as NDJSON or CSV."""
+    return _export_events(db, LogisticsEvent, query)
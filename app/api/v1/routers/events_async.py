@@ -0,0 +1,250 @@
+"""
+Async API Router for Event Ingestion
+
+``async def`` twin of ``routers/events.py`` running on an ``AsyncSession``.
+Selected instead of the sync router when ``DB_ASYNC`` is enabled, so request
+concurrency is bounded by the connection pool rather than the threadpool.
+
+Routes are generated from the event type registry and expose the same paths,
+payloads and responses as the sync router, including the paged GET reads and
+the generic envelope endpoints.
+"""
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, Response, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_async_db
+from app.api.v1.dependencies import (
+    BatchPayload,
+    batch_body,
+    batch_conflict,
+    buffer_event,
+    build_batch_response,
+    build_envelope_response,
+    committed,
+    export_response,
+    get_response_mode,
+    invalid_cursor,
+    page,
+    reindex,
+    replay_duplicate,
+    replay_or_conflict,
+    screened,
+    write_behind,
+)
+from app.schemas.events.base import BatchIngestResponse, EventExportQuery, IngestResponseMode
+from app.services.ingestion.dedup import (
+    assign_key,
+    cached_original,
+    drop_duplicates_async,
+    find_original_async,
+)
+from app.services.ingestion.event_router import (
+    EVENT_TYPES,
+    EventEnvelope,
+    EventType,
+    group_envelopes,
+)
+from app.services.ingestion.pipeline import prepare_rows_async
+from app.services.ingestion.validators import (
+    find_unique_conflict_async,
+    reject_unique_conflicts_async,
+    validate_batch,
+)
+from app.services.persistence.event_writer import insert_event_returning_async, insert_events_async
+from app.services.persistence.exporters import stream_export_async
+from app.services.persistence.readers import InvalidCursor, read_events_page_async
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+
+async def _create_event(db: AsyncSession, response: Response, payload, model, mode: IngestResponseMode):
+    """Persist one event; mirrors ``_create_event`` in the sync router."""
+    key = assign_key(payload)
+    original = cached_original(model, key)
+    if original is not None:
+        return replay_duplicate(response, model, payload, original)
+    if await find_unique_conflict_async(db, model, payload) is not None:
+        return replay_or_conflict(response, model, payload, await find_original_async(db, model, key))
+
+    data = payload.model_dump()
+    await prepare_rows_async(db, model, [data])
+    if buffer_event(response, model, data):
+        return data
+
+    try:
+        if mode is IngestResponseMode.LEAN:
+            data = await insert_event_returning_async(db, model, data)
+            await db.commit()
+            committed(model, [data], [data["event_id"]])
+            return data
+
+        db_event = model(**data)
+        db.add(db_event)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return replay_or_conflict(response, model, payload, await find_original_async(db, model, key))
+    await db.refresh(db_event)
+    committed(model, [data], [db_event.event_id])
+    return db_event
+
+
+async def _screen_batch(db: AsyncSession, payloads, schema, model):
+    """Validate a batch, drop retried events and reject unique conflicts."""
+    accepted, rejected = validate_batch(schema, payloads)
+    accepted, duplicates = await drop_duplicates_async(db, model, accepted)
+    accepted, conflicts = await reject_unique_conflicts_async(db, model, accepted)
+    return screened(model, accepted, rejected, duplicates, conflicts)
+
+
+async def _ingest_batch(db: AsyncSession, payloads: BatchPayload, schema, model) -> BatchIngestResponse:
+    """Validate and write one batch; mirrors ``_ingest_batch`` in the sync router."""
+    accepted, rejected, duplicates = await _screen_batch(db, payloads, schema, model)
+    rows = [item.model_dump() for _, item in accepted]
+    await prepare_rows_async(db, model, rows)
+
+    event_ids = write_behind(model, rows)
+    if event_ids is None:
+        try:
+            event_ids = await insert_events_async(db, model, rows)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise batch_conflict()
+        committed(model, rows, event_ids)
+    return build_batch_response(accepted, rejected, event_ids, duplicates)
+
+
+async def _ingest_envelopes(db: AsyncSession, envelopes: BatchPayload) -> BatchIngestResponse:
+    """Mixed batch of typed envelopes; mirrors ``_ingest_envelopes`` in the sync router."""
+    groups, rejected = group_envelopes(envelopes)
+    screened_groups = []
+    for name, (positions, payloads) in groups.items():
+        model = EVENT_TYPES[name].model
+        accepted, group_rejected, duplicates = reindex(
+            positions,
+            *await _screen_batch(db, payloads, EVENT_TYPES[name].schema, model),
+            error_prefix=("data",),
+        )
+        rejected.extend(group_rejected)
+        rows = [item.model_dump() for _, item in accepted]
+        await prepare_rows_async(db, model, rows)
+        screened_groups.append((model, accepted, duplicates, rows))
+
+    try:
+        event_ids = [await insert_events_async(db, model, rows) for model, _, _, rows in screened_groups]
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise batch_conflict()
+    return build_envelope_response(screened_groups, event_ids, rejected)
+
+
+@router.post("", status_code=status.HTTP_201_CREATED)
+async def create_event(
+    envelope: EventEnvelope,
+    response: Response,
+    mode: IngestResponseMode = Depends(get_response_mode),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Create an event of any type from a ``{"type": ..., "data": {...}}`` envelope."""
+    return await _create_event(db, response, envelope.data, EVENT_TYPES[envelope.type].model, mode)
+
+
+@router.post("/batch", response_model=BatchIngestResponse)
+async def create_events_batch(
+    envelopes: BatchPayload = batch_body(),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Create a mixed batch of typed envelopes; items are validated and reported individually."""
+    return await _ingest_envelopes(db, envelopes)
+
+
+def _make_create_handler(event_type: EventType):
+    schema, model = event_type.schema, event_type.model
+
+    async def create_event(
+        payload: schema,
+        response: Response,
+        mode: IngestResponseMode = Depends(get_response_mode),
+        db: AsyncSession = Depends(get_async_db),
+    ):
+        return await _create_event(db, response, payload, model, mode)
+
+    create_event.__name__ = f"create_{model.__tablename__}_async"
+    create_event.__doc__ = f"Create a new {event_type.name} event."
+    return create_event
+
+
+def _make_batch_handler(event_type: EventType):
+    schema, model = event_type.schema, event_type.model
+
+    async def create_events_batch(
+        payloads: BatchPayload = batch_body(),
+        db: AsyncSession = Depends(get_async_db),
+    ):
+        return await _ingest_batch(db, payloads, schema, model)
+
+    create_events_batch.__name__ = f"create_{model.__tablename__}_batch_async"
+    create_events_batch.__doc__ = f"Create a batch of {event_type.name} events."
+    return create_events_batch
+
+
+def _make_list_handler(event_type: EventType):
+    query_schema, model = event_type.query, event_type.model
+
+    async def list_events(
+        query: Annotated[query_schema, Query()],
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
+    ):
+        try:
+            return page(response, *await read_events_page_async(db, model, query))
+        except InvalidCursor as exc:
+            raise invalid_cursor(exc)
+
+    list_events.__name__ = f"get_{model.__tablename__}_async"
+    list_events.__doc__ = f"Retrieve a page of {event_type.name} events."
+    return list_events
+
+
+def _make_export_handler(event_type: EventType):
+    model = event_type.model
+
+    async def export_events(
+        query: Annotated[EventExportQuery, Query()],
+        db: AsyncSession = Depends(get_async_db),
+    ):
+        return export_response(stream_export_async(db.bind, model, query), model, query)
+
+    export_events.__name__ = f"export_{model.__tablename__}_async"
+    export_events.__doc__ = f"Stream {event_type.name} events as NDJSON or CSV."
+    return export_events
+
+
+for _event_type in EVENT_TYPES.values():
+    router.add_api_route(
+        f"/{_event_type.name}",
+        _make_create_handler(_event_type),
+        methods=["POST"],
+        status_code=status.HTTP_201_CREATED,
+    )
+    router.add_api_route(
+        f"/{_event_type.name}/batch",
+        _make_batch_handler(_event_type),
+        methods=["POST"],
+        response_model=BatchIngestResponse,
+    )
+    router.add_api_route(
+        f"/{_event_type.name}",
+        _make_list_handler(_event_type),
+        methods=["GET"],
+    )
+    router.add_api_route(
+        f"/{_event_type.name}/export",
+        _make_export_handler(_event_type),
+        methods=["GET"],
+    )
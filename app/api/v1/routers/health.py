@@ -0,0 +1,160 @@
+"""
+API Router for Health & Diagnostics
+
+Operational endpoints served at the application root (not under /api/v1).
+
+``/health/live``
+    Liveness: the process is serving requests and its background writer (if
+    enabled) is still running. Never touches the database, so a database
+    outage does not get healthy pods restarted.
+``/health/ready`` (and ``/health``)
+    Readiness: database round-trip latency, connection pool saturation and
+    write-behind backlog. Returns 503 when the pod should be taken out of
+    rotation.
+
+Readiness results are cached for ``HEALTH_CACHE_TTL_S``, and only one probe
+runs at a time. While a probe is running, concurrent callers get the previous
+result instead of queueing behind it. Load-balancer probes therefore cost at
+most one ``SELECT 1`` per TTL and cannot pile up on a stuck database. When
+the pool is already saturated, the database probe is skipped: it would only
+wait for a connection too.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Response, status
+from sqlalchemy import text
+
+from app.core.config import (
+    EVENT_WRITER_ENABLED,
+    HEALTH_CACHE_TTL_S,
+    HEALTH_DB_LATENCY_MAX_MS,
+    HEALTH_POOL_SATURATION_MAX,
+    HEALTH_WRITER_BACKLOG_MAX,
+)
+from app.db.session import engine, get_pool_stats
+from app.services.persistence.event_writer import get_event_writer
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+def _check_pools() -> Dict[str, Any]:
+    pools = {}
+    healthy = True
+    for name, stats in get_pool_stats().items():
+        capacity = stats.get("size", 0) + stats.get("max_overflow", 0)
+        if not capacity:
+            continue  # pools without a fixed size (in-memory SQLite) cannot saturate
+        saturation = stats["checked_out"] / capacity
+        ok = saturation < HEALTH_POOL_SATURATION_MAX
+        healthy = healthy and ok
+        pools[name] = {"ok": ok, "saturation": round(saturation, 3), "checked_out": stats["checked_out"]}
+    return {"ok": healthy, "pools": pools}
+
+
+def _check_database() -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as exc:
+        return {"ok": False, "error": type(exc).__name__}
+    latency_ms = (time.perf_counter() - started) * 1000
+    return {"ok": latency_ms <= HEALTH_DB_LATENCY_MAX_MS, "latency_ms": round(latency_ms, 2)}
+
+
+def _check_writer() -> Dict[str, Any]:
+    if not EVENT_WRITER_ENABLED:
+        return {"ok": True, "enabled": False}
+    writer = get_event_writer()
+    if writer is None or not writer.alive:
+        return {"ok": False, "enabled": True, "running": False}
+    backlog = writer.depth / writer.max_queue_size
+    return {
+        "ok": backlog < HEALTH_WRITER_BACKLOG_MAX,
+        "enabled": True,
+        "running": True,
+        "depth": writer.depth,
+        "backlog": round(backlog, 3),
+    }
+
+
+def check_readiness() -> Dict[str, Any]:
+    pool = _check_pools()
+    if pool["ok"]:
+        database = _check_database()
+    else:
+        database = {"ok": False, "skipped": "connection pool saturated"}
+    checks = {"database": database, "pool": pool, "writer": _check_writer()}
+    ready = all(check["ok"] for check in checks.values())
+    return {"status": "ready" if ready else "unavailable", "checks": checks}
+
+
+class _ReadinessCache:
+    """Single-flight, TTL-cached readiness result."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+
+    def get(self) -> Tuple[Dict[str, Any], float]:
+        """Return (result, age in seconds)."""
+        now = time.monotonic()
+        if self._result is not None and now - self._checked_at < self.ttl:
+            return self._result, now - self._checked_at
+
+        # Another thread is probing: serve the previous result rather than wait.
+        if not self._lock.acquire(blocking=self._result is None):
+            return self._result, now - self._checked_at
+        try:
+            if self._result is None or time.monotonic() - self._checked_at >= self.ttl:
+                self._result = check_readiness()
+                self._checked_at = time.monotonic()
+            return self._result, time.monotonic() - self._checked_at
+        finally:
+            self._lock.release()
+
+    def clear(self) -> None:
+        self._result = None
+
+
+readiness_cache = _ReadinessCache(HEALTH_CACHE_TTL_S)
+
+
+def _readiness_response(response: Response) -> Dict[str, Any]:
+    result, age = readiness_cache.get()
+    if result["status"] != "ready":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {**result, "cached_for_s": round(age, 3)}
+
+
+@router.get("")
+def get_health(response: Response):
+    """Readiness summary; kept at /health for existing load-balancer configuration."""
+    return _readiness_response(response)
+
+
+@router.get("/ready")
+def get_readiness(response: Response):
+    """Database latency, pool saturation and writer backlog. 503 when not ready."""
+    return _readiness_response(response)
+
+
+@router.get("/live")
+def get_liveness(response: Response):
+    """Process liveness. Does not touch the database."""
+    if EVENT_WRITER_ENABLED:
+        writer = get_event_writer()
+        if writer is None or not writer.alive:
+            response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            return {"status": "writer stopped"}
+    return {"status": "alive"}
+
+
+@router.get("/pool")
+def get_connection_pool_stats():
+    """Live connection pool usage: checked-out connections, overflow and checkout wait times."""
+    return get_pool_stats()
@@ -22,3 +22,126 @@ CORS_ORIGINS: list = ["*"]  # Tighten in production
 
 # Application Settings
 DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
+
+# Ingestion Settings
+BATCH_MAX_SIZE: int = int(os.getenv("BATCH_MAX_SIZE", "1000"))
+
+# Write-behind event writer (buffers POSTed events and flushes them in batches)
+EVENT_WRITER_ENABLED: bool = os.getenv("EVENT_WRITER_ENABLED", "false").lower() == "true"
+EVENT_WRITER_BATCH_SIZE: int = int(os.getenv("EVENT_WRITER_BATCH_SIZE", "500"))
+EVENT_WRITER_MAX_LATENCY_MS: int = int(os.getenv("EVENT_WRITER_MAX_LATENCY_MS", "50"))
+EVENT_WRITER_QUEUE_SIZE: int = int(os.getenv("EVENT_WRITER_QUEUE_SIZE", "50000"))
+EVENT_WRITER_DRAIN_TIMEOUT_S: float = float(os.getenv("EVENT_WRITER_DRAIN_TIMEOUT_S", "10"))
+
+# Response body for single-event POSTs: "full" re-reads the row after commit,
+# "lean" echoes the payload plus generated keys (no extra SELECT).
+INGEST_RESPONSE_MODE: str = os.getenv("INGEST_RESPONSE_MODE", "full").lower()
+
+# Async database access: serve ingestion/read routes as ``async def`` on an
+# AsyncSession (asyncpg for Postgres, aiosqlite for SQLite; install them with
+# requirements-async.txt).
+DB_ASYNC: bool = os.getenv("DB_ASYNC", "false").lower() == "true"
+ASYNC_DATABASE_URL: Optional[str] = os.getenv("ASYNC_DATABASE_URL")
+
+# Connection pool / engine tuning
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_S: float = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+DB_POOL_RECYCLE_S: int = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))  # -1 disables
+DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# psycopg2 only: "values_only" (insertmanyvalues) or "values_plus_batch" (execute_values/execute_batch)
+DB_EXECUTEMANY_MODE: str = os.getenv("DB_EXECUTEMANY_MODE", "values_only")
+DB_INSERTMANYVALUES_PAGE_SIZE: int = int(os.getenv("DB_INSERTMANYVALUES_PAGE_SIZE", "1000"))
+# Server-side statement timeout in milliseconds (Postgres); 0 disables
+DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+# Create missing tables with metadata.create_all() at startup. Off by default:
+# the schema is managed by migrations (python -m scripts.init_db).
+DB_AUTO_CREATE: bool = os.getenv("DB_AUTO_CREATE", "false").lower() == "true"
+
+# Range partitioning of the event tables by event_time (Postgres): "", "daily"
+# or "monthly". Fixed when the tables are created, see app/db/partitioning.py.
+DB_PARTITIONING: str = os.getenv("DB_PARTITIONING", "").lower()
+# Partitions created ahead of the current one, and how often maintenance runs
+PARTITION_PREMAKE: int = int(os.getenv("PARTITION_PREMAKE", "3"))
+PARTITION_MAINTENANCE_INTERVAL_S: float = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL_S", "3600"))
+# Partitions wholly older than this many days are expired (0 keeps everything):
+# "drop" deletes them, "archive" detaches them into RETENTION_ARCHIVE_SCHEMA.
+RETENTION_DAYS: int = int(os.getenv("RETENTION_DAYS", "0"))
+RETENTION_MODE: str = os.getenv("RETENTION_MODE", "drop").lower()
+RETENTION_ARCHIVE_SCHEMA: str = os.getenv("RETENTION_ARCHIVE_SCHEMA", "archive")
+
+# Incremental hourly product aggregation (user_behavior_events -> hourly_product_behavior_agg)
+AGGREGATOR_ENABLED: bool = os.getenv("AGGREGATOR_ENABLED", "false").lower() == "true"
+AGGREGATOR_INTERVAL_S: float = float(os.getenv("AGGREGATOR_INTERVAL_S", "10"))
+# Events younger than this are left for the next run, so rows from transactions
+# that were still open (ingested_at = transaction start) are not skipped.
+AGGREGATOR_LAG_S: float = float(os.getenv("AGGREGATOR_LAG_S", "30"))
+AGGREGATOR_MAX_WINDOW_S: float = float(os.getenv("AGGREGATOR_MAX_WINDOW_S", "3600"))
+# "watermark": periodic incremental job over raw events.
+# "inmemory": counters fed by the ingestion path, flushed every AGGREGATOR_INTERVAL_S.
+AGGREGATOR_MODE: str = os.getenv("AGGREGATOR_MODE", "watermark").lower()
+# inmemory mode: hours rebuilt from raw events at startup to repair lost increments.
+# Only safe with a single API process; with several, set 0 and use
+# `python -m scripts.init_db --recompute-hours N` at deploy instead.
+AGGREGATOR_RECOMPUTE_HOURS: int = int(os.getenv("AGGREGATOR_RECOMPUTE_HOURS", "2"))
+
+# Streamed exports: rows fetched per server-side cursor round trip
+EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Bulk file loader (scripts/seed_data.py): records per validated/written batch
+BULK_LOAD_BATCH_SIZE: int = int(os.getenv("BULK_LOAD_BATCH_SIZE", "5000"))
+# Parallel backfill: worker processes and target byte size of each file chunk
+BULK_LOAD_WORKERS: int = int(os.getenv("BULK_LOAD_WORKERS", "1"))
+BULK_LOAD_CHUNK_MB: int = int(os.getenv("BULK_LOAD_CHUNK_MB", "64"))
+
+# Prometheus metrics at /metrics (request middleware, commit counters, DB timings)
+METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Health probes (/health, /health/ready): results are cached so load-balancer
+# probes cost at most one DB round trip per TTL.
+HEALTH_CACHE_TTL_S: float = float(os.getenv("HEALTH_CACHE_TTL_S", "2"))
+HEALTH_DB_LATENCY_MAX_MS: float = float(os.getenv("HEALTH_DB_LATENCY_MAX_MS", "500"))
+# Not ready above these fractions of pool capacity / writer queue capacity
+HEALTH_POOL_SATURATION_MAX: float = float(os.getenv("HEALTH_POOL_SATURATION_MAX", "0.9"))
+HEALTH_WRITER_BACKLOG_MAX: float = float(os.getenv("HEALTH_WRITER_BACKLOG_MAX", "0.8"))
+
+# Deduplication of retried events by idempotency key (unique per event table)
+DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+# Derive the key from a hash of the payload when the client sends none. Off by
+# default: byte-identical events (same time, user, product...) then count once.
+DEDUP_CONTENT_HASH: bool = os.getenv("DEDUP_CONTENT_HASH", "false").lower() == "true"
+# In-process cache of recently written keys: entries and how long they are trusted
+DEDUP_CACHE_SIZE: int = int(os.getenv("DEDUP_CACHE_SIZE", "100000"))
+DEDUP_CACHE_TTL_S: float = float(os.getenv("DEDUP_CACHE_TTL_S", "900"))
+
+# Server-side sessions (user_behavior_events / cart_events.server_session_id):
+# a new session starts after this much inactivity (event time) per actor.
+SESSIONIZATION_ENABLED: bool = os.getenv("SESSIONIZATION_ENABLED", "false").lower() == "true"
+SESSION_INACTIVITY_GAP_S: float = float(os.getenv("SESSION_INACTIVITY_GAP_S", "1800"))
+# In-memory session table: actors kept, and idle time (wall clock) before an
+# actor is evicted and falls back to the persisted actor_sessions table
+SESSION_CACHE_SIZE: int = int(os.getenv("SESSION_CACHE_SIZE", "200000"))
+SESSION_CACHE_TTL_S: float = float(os.getenv("SESSION_CACHE_TTL_S", "3600"))
+# How often changed sessions are written behind to actor_sessions
+SESSION_FLUSH_INTERVAL_S: float = float(os.getenv("SESSION_FLUSH_INTERVAL_S", "5"))
+
+# Identity resolution (user_behavior_events / cart_events.actor_id): guests are
+# attributed to the user their session id was linked to on login.
+IDENTITY_RESOLUTION_ENABLED: bool = os.getenv("IDENTITY_RESOLUTION_ENABLED", "false").lower() == "true"
+# In-memory session id -> actor map: entries kept and how long they are trusted
+IDENTITY_CACHE_SIZE: int = int(os.getenv("IDENTITY_CACHE_SIZE", "200000"))
+IDENTITY_CACHE_TTL_S: float = float(os.getenv("IDENTITY_CACHE_TTL_S", "3600"))
+# "Not linked" results expire sooner: other workers may link the session meanwhile
+IDENTITY_NEGATIVE_TTL_S: float = float(os.getenv("IDENTITY_NEGATIVE_TTL_S", "60"))
+# How often new links are persisted and earlier guest events stitched
+IDENTITY_FLUSH_INTERVAL_S: float = float(os.getenv("IDENTITY_FLUSH_INTERVAL_S", "5"))
+
+# Enrichment of user_behavior_events (device_type, traffic_source, page_type,
+# product_category) from in-memory lookup tables
+ENRICHMENT_ENABLED: bool = os.getenv("ENRICHMENT_ENABLED", "true").lower() == "true"
+# CSV files: "product_id,category" and "pattern,channel" (built-in rules if unset)
+ENRICHMENT_CATEGORY_FILE: str = os.getenv("ENRICHMENT_CATEGORY_FILE", "")
+ENRICHMENT_CHANNEL_RULES_FILE: str = os.getenv("ENRICHMENT_CHANNEL_RULES_FILE", "")
+# How often the files' modification times are checked for a hot reload
+ENRICHMENT_RELOAD_CHECK_S: float = float(os.getenv("ENRICHMENT_RELOAD_CHECK_S", "30"))
@@ -0,0 +1,339 @@
+"""
+Application Metrics
+
+Prometheus-style counters, histograms and scrape-time gauges, rendered by
+``GET /metrics`` in the text exposition format.
+
+Recording is cheap enough for the ingestion hot path. Each thread writes to
+its own shard (a plain dict reached through ``threading.local``), so
+increments never take a lock. A scrape sums the shards. It can race with a
+concurrent increment, but it never loses one: the next scrape sees it.
+Gauges (pool usage, writer depth) are computed when scraped, so they cost
+nothing between scrapes.
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; tuned for API handlers and database round trips.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Sharded:
+    """Per-thread shards of ``{label values: state}``."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()  # only taken when a thread creates its shard
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot(self) -> List[dict]:
+        with self._lock:
+            return [dict(shard) for shard in self._shards]
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        shard = self._shard()
+        state = shard.get(labelvalues)
+        if state is None:
+            # per-bucket counts (last slot is +Inf), sum, count
+            state = shard[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def values(self) -> Dict[LabelValues, Tuple[List[int], float, int]]:
+        totals: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+        for shard in self._snapshot():
+            for labels, (counts, total, count) in shard.items():
+                merged = totals.get(labels)
+                if merged is None:
+                    totals[labels] = (list(counts), total, count)
+                else:
+                    totals[labels] = (
+                        [a + b for a, b in zip(merged[0], counts)], merged[1] + total, merged[2] + count
+                    )
+        return totals
+
+    def samples(self) -> Iterable[str]:
+        bounds = [*self.buckets, float("inf")]
+        for labels, (counts, total, count) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(total)}"
+            yield f"{self.name}_count{label_text} {count}"
+
+
+class CallbackMetric:
+    """A gauge (or externally kept counter) whose values ``collect()`` produces at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Dict[LabelValues, float]],
+        labelnames: Sequence[str] = (),
+        kind: str = "gauge",
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self.collect().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status.",
+    ("method", "route", "status"),
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route"),
+))
+EVENTS_INGESTED = REGISTRY.register(Counter(
+    "events_ingested_total", "Events durably committed, by table.", ("table",),
+))
+INGEST_REJECTS = REGISTRY.register(Counter(
+    "ingest_rejects_total", "Batch items rejected at ingestion, by table and reason.",
+    ("table", "reason"),
+))
+EVENTS_DEDUPLICATED = REGISTRY.register(Counter(
+    "events_deduplicated_total", "Retried events dropped as duplicates, by table.", ("table",),
+))
+DB_COMMIT_LATENCY = REGISTRY.register(Histogram(
+    "db_commit_duration_seconds", "ORM session commit latency (flush plus COMMIT).",
+))
+
+
+def _pool_connections() -> Dict[LabelValues, float]:
+    from app.db.session import get_pool_stats
+
+    values: Dict[LabelValues, float] = {}
+    for engine_name, stats in get_pool_stats().items():
+        for state in ("size", "checked_out", "checked_in", "overflow"):
+            if state in stats:
+                values[(engine_name, state)] = stats[state]
+    return values
+
+
+def _pool_stat(key: str) -> Callable[[], Dict[LabelValues, float]]:
+    def collect() -> Dict[LabelValues, float]:
+        from app.db.session import get_pool_stats
+
+        return {
+            (engine_name,): stats[key]
+            for engine_name, stats in get_pool_stats().items()
+            if key in stats
+        }
+    return collect
+
+
+def _writer_stat(attribute: str) -> Callable[[], Dict[LabelValues, float]]:
+    def collect() -> Dict[LabelValues, float]:
+        from app.services.persistence.event_writer import get_event_writer
+
+        writer = get_event_writer()
+        return {(): getattr(writer, attribute) if writer is not None else 0}
+    return collect
+
+
+REGISTRY.register(CallbackMetric(
+    "db_pool_connections", "Connection pool usage by engine and state.",
+    _pool_connections, ("engine", "state"),
+))
+REGISTRY.register(CallbackMetric(
+    "db_pool_checkout_wait_seconds_total", "Time spent waiting for a pooled connection.",
+    _pool_stat("wait_seconds_total"), ("engine",), kind="counter",
+))
+REGISTRY.register(CallbackMetric(
+    "db_pool_checkout_timeouts_total", "Pool checkouts that timed out.",
+    _pool_stat("checkout_timeouts"), ("engine",), kind="counter",
+))
+REGISTRY.register(CallbackMetric(
+    "event_writer_queue_depth", "Events buffered in the write-behind queue.",
+    _writer_stat("depth"),
+))
+REGISTRY.register(CallbackMetric(
+    "event_writer_flushed_total", "Events flushed by the write-behind writer.",
+    _writer_stat("flushed_total"), kind="counter",
+))
+REGISTRY.register(CallbackMetric(
+    "event_writer_failed_total", "Events the write-behind writer failed to store.",
+    _writer_stat("failed_total"), kind="counter",
+))
+REGISTRY.register(CallbackMetric(
+    "event_writer_retried_total", "Events requeued after a database error unrelated to their data.",
+    _writer_stat("retried_total"), kind="counter",
+))
+
+
+# --------------------------------------------------------------------------- #
+# Instrumentation
+# --------------------------------------------------------------------------- #
+class MetricsMiddleware:
+    """
+    ASGI middleware recording count and latency per route template. Using the
+    template (e.g. ``/api/v1/events/{type}``) rather than the raw path keeps
+    label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "<unmatched>"
+            method = scope["method"]
+            HTTP_LATENCY.observe(time.perf_counter() - started, method, template)
+            HTTP_REQUESTS.inc(method, template, str(status_code))
+
+
+def record_committed(model, rows) -> None:
+    """Commit listener: count events per table."""
+    EVENTS_INGESTED.inc(model.__tablename__, amount=len(rows))
+
+
+def record_rejects(model, validation: int, conflicts: int = 0) -> None:
+    table = model.__tablename__
+    if validation:
+        INGEST_REJECTS.inc(table, "validation", amount=validation)
+    if conflicts:
+        INGEST_REJECTS.inc(table, "conflict", amount=conflicts)
+
+
+def record_duplicates(model, count: int) -> None:
+    if count:
+        EVENTS_DEDUPLICATED.inc(model.__tablename__, amount=count)
+
+
+def _before_commit(session: Session) -> None:
+    session.info["metrics_commit_started"] = time.perf_counter()
+
+
+def _after_commit(session: Session) -> None:
+    started = session.info.pop("metrics_commit_started", None)
+    if started is not None:
+        DB_COMMIT_LATENCY.observe(time.perf_counter() - started)
+
+
+def install_session_metrics() -> None:
+    """Time every ORM session commit (sync sessions and those behind AsyncSession)."""
+    if not event.contains(Session, "before_commit", _before_commit):
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_commit", _after_commit)
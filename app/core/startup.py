@@ -0,0 +1,172 @@
+"""
+Background services started and stopped by the application lifespan.
+"""
+import logging
+import threading
+from typing import Callable, List, Optional
+
+from app.core.config import (
+    AGGREGATOR_ENABLED,
+    AGGREGATOR_INTERVAL_S,
+    AGGREGATOR_LAG_S,
+    AGGREGATOR_MAX_WINDOW_S,
+    AGGREGATOR_MODE,
+    AGGREGATOR_RECOMPUTE_HOURS,
+    EVENT_WRITER_ENABLED,
+    EVENT_WRITER_BATCH_SIZE,
+    EVENT_WRITER_MAX_LATENCY_MS,
+    EVENT_WRITER_QUEUE_SIZE,
+    EVENT_WRITER_DRAIN_TIMEOUT_S,
+    IDENTITY_FLUSH_INTERVAL_S,
+    IDENTITY_RESOLUTION_ENABLED,
+    PARTITION_MAINTENANCE_INTERVAL_S,
+    SESSION_FLUSH_INTERVAL_S,
+    SESSIONIZATION_ENABLED,
+)
+from app.db.partitioning import PARTITIONED
+from app.db.session import SessionLocal
+from app.services.ingestion.identity import flush_identity_links
+from app.services.ingestion.sessionizer import flush_sessions
+from app.services.persistence.aggregates import (
+    HourlyCounterMap,
+    recompute_recent_hours,
+    run_incremental_aggregation,
+)
+from app.services.persistence.event_writer import (
+    add_commit_listener,
+    remove_commit_listener,
+    start_event_writer,
+    stop_event_writer,
+)
+from app.services.persistence.partitions import run_partition_maintenance
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Runs ``func`` every ``interval`` seconds on a daemon thread until stopped."""
+
+    def __init__(self, name: str, func: Callable[[], None], interval: float):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.func()
+            except Exception:
+                logger.exception("Periodic task %s failed", self.name)
+
+
+_tasks: List[PeriodicTask] = []
+
+
+def start_periodic(name: str, func: Callable[[], None], interval: float) -> PeriodicTask:
+    task = PeriodicTask(name, func, interval)
+    task.start()
+    _tasks.append(task)
+    return task
+
+
+def stop_periodic(timeout: Optional[float] = None) -> None:
+    while _tasks:
+        _tasks.pop().stop(timeout)
+
+
+# --------------------------------------------------------------------------- #
+# Lifespan hooks
+# --------------------------------------------------------------------------- #
+def _aggregate_hourly_products() -> None:
+    with SessionLocal() as db:
+        run_incremental_aggregation(
+            db, lag_seconds=AGGREGATOR_LAG_S, max_window_seconds=AGGREGATOR_MAX_WINDOW_S
+        )
+
+
+hourly_counters = HourlyCounterMap()
+
+
+def _flush_hourly_counters() -> None:
+    with SessionLocal() as db:
+        hourly_counters.flush(db)
+
+
+def _start_aggregator() -> None:
+    if AGGREGATOR_MODE == "inmemory":
+        # Repair hours whose increments may have been lost by a previous crash
+        # before new increments start accumulating (single-process deployments).
+        if AGGREGATOR_RECOMPUTE_HOURS > 0:
+            with SessionLocal() as db:
+                recompute_recent_hours(db, AGGREGATOR_RECOMPUTE_HOURS)
+        add_commit_listener(hourly_counters.on_commit)
+        start_periodic("hourly-counter-flush", _flush_hourly_counters, AGGREGATOR_INTERVAL_S)
+    elif AGGREGATOR_MODE == "watermark":
+        start_periodic("hourly-aggregator", _aggregate_hourly_products, AGGREGATOR_INTERVAL_S)
+    else:
+        raise ValueError(f"Unknown AGGREGATOR_MODE '{AGGREGATOR_MODE}'")
+
+
+def _flush_identity_links() -> None:
+    with SessionLocal() as db:
+        flush_identity_links(db)
+
+
+def _flush_sessions() -> None:
+    with SessionLocal() as db:
+        flush_sessions(db)
+
+
+def _maintain_partitions() -> None:
+    with SessionLocal() as db:
+        run_partition_maintenance(db)
+
+
+def start_background_services() -> None:
+    if PARTITIONED:
+        # Before any writer starts, so the current period's partition exists.
+        # Rows go to the DEFAULT partition until a later run succeeds.
+        try:
+            _maintain_partitions()
+        except Exception:
+            logger.exception("Partition maintenance failed at startup")
+        start_periodic("partition-maintenance", _maintain_partitions, PARTITION_MAINTENANCE_INTERVAL_S)
+    if EVENT_WRITER_ENABLED:
+        start_event_writer(
+            SessionLocal,
+            batch_size=EVENT_WRITER_BATCH_SIZE,
+            max_latency=EVENT_WRITER_MAX_LATENCY_MS / 1000,
+            max_queue_size=EVENT_WRITER_QUEUE_SIZE,
+        )
+    if AGGREGATOR_ENABLED:
+        _start_aggregator()
+    if IDENTITY_RESOLUTION_ENABLED:
+        start_periodic("identity-link-flush", _flush_identity_links, IDENTITY_FLUSH_INTERVAL_S)
+    if SESSIONIZATION_ENABLED:
+        start_periodic("session-flush", _flush_sessions, SESSION_FLUSH_INTERVAL_S)
+
+
+def stop_background_services() -> None:
+    # Drain the writer first so the final aggregation pass can see its rows.
+    stop_event_writer(timeout=EVENT_WRITER_DRAIN_TIMEOUT_S)
+    stop_periodic(timeout=EVENT_WRITER_DRAIN_TIMEOUT_S)
+    if AGGREGATOR_ENABLED and AGGREGATOR_MODE == "inmemory":
+        remove_commit_listener(hourly_counters.on_commit)
+        _flush_hourly_counters()
+    if SESSIONIZATION_ENABLED:
+        _flush_sessions()
+    if IDENTITY_RESOLUTION_ENABLED:
+        _flush_identity_links()
@@ -1,2 +1,2 @@
-from .session import get_db
-from .base import Base
\ No newline at end of file
+from .session import get_db, get_async_db
+from .base import Base
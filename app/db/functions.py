@@ -0,0 +1,68 @@
+"""
+Dialect-aware SQL expressions.
+
+Postgres is the production database and SQLite backs the test suite; the
+helpers here render equivalent SQL for both.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Union
+
+from sqlalchemy import Interval, func, literal, select
+
+
+def hour_bucket(column, dialect_name: str):
+    """Truncate a timestamp column to the start of its UTC hour."""
+    if dialect_name == "postgresql":
+        return func.date_trunc("hour", func.timezone("UTC", column))
+    if dialect_name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:00:00", column)
+    raise NotImplementedError(f"hour_bucket is not implemented for {dialect_name}")
+
+
+def add_seconds(column, seconds: float, dialect_name: str):
+    """``column + seconds`` as a timestamp expression."""
+    if dialect_name == "postgresql":
+        return column + literal(timedelta(seconds=seconds), Interval)
+    if dialect_name == "sqlite":
+        # Same textual layout SQLAlchemy stores, so string comparison stays ordered.
+        return func.strftime("%Y-%m-%d %H:%M:%f", column, f"+{seconds} seconds")
+    raise NotImplementedError(f"add_seconds is not implemented for {dialect_name}")
+
+
+def as_utc(value: Union[str, datetime]) -> datetime:
+    """Normalise a timestamp read back from the database to an aware UTC datetime."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def dialect_insert(db):
+    """The dialect's ``insert`` construct, which supports ``on_conflict_do_update``."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not implemented for {dialect}")
+    return insert
+
+
+def try_advisory_xact_lock(db, name: str) -> bool:
+    """
+    Take the transaction-level advisory lock ``name`` without waiting; False
+    if another transaction holds it. The lock is released when the current
+    transaction ends. SQLite serialises writers itself, so there it always
+    succeeds.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    return bool(db.scalar(select(func.pg_try_advisory_xact_lock(func.hashtext(name)))))
+
+
+def advisory_xact_lock(db, name: str) -> None:
+    """Like ``try_advisory_xact_lock``, but waits for the lock."""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(func.hashtext(name))))
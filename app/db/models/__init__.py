@@ -8,7 +8,9 @@ from app.db.models.order_events import OrderEvent
 from app.db.models.order_item_events import OrderItemEvent
 from app.db.models.payment_events import PaymentEvent
 from app.db.models.logistics_events import LogisticsEvent
-from app.db.models.aggregates import HourlyProductBehaviorAggregate
+from app.db.models.aggregates import HourlyProductBehaviorAggregate, AggregationWatermark
+from app.db.models.sessions import ActorSession
+from app.db.models.identity import IdentityLink
 
 __all__ = [
     "UserBehaviorEvent",
@@ -19,4 +21,7 @@ __all__ = [
     "PaymentEvent",
     "LogisticsEvent",
     "HourlyProductBehaviorAggregate",
+    "AggregationWatermark",
+    "ActorSession",
+    "IdentityLink",
 ]
@@ -3,6 +3,7 @@ import uuid
 from sqlalchemy import (
     Column,
     Integer,
+    String,
     DateTime,
     Index,
     func
@@ -38,4 +39,23 @@ class HourlyProductBehaviorAggregate(Base):
 
     __table_args__ = (
         Index("idx_hourly_product_time", "product_id", "event_hour", unique=True),
-    )
\ No newline at end of file
+    )
+
+
+class AggregationWatermark(Base):
+    """
+    High-water mark per aggregation job.
+
+    ``watermark`` is the largest ``ingested_at`` already folded into the
+    aggregate table, so each run only reads events ingested after it.
+    """
+    __tablename__ = "aggregation_watermarks"
+
+    job_name = Column(String, primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
@@ -8,6 +8,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.base import Base
+from app.db.partitioning import PARTITIONED, partition_key, partitioned_table_args
 import uuid
 
 class CartEvent(Base):
@@ -19,8 +20,15 @@ class CartEvent(Base):
     product_id = Column(Integer, nullable=False)
     action = Column(String, nullable=False)   # whether the user added or removed the product from the cart
     quantity = Column(Integer, nullable=False)
-    event_time = Column(DateTime(timezone=True), nullable=False)
-    
-    __table_args__ = (
+    event_time = Column(DateTime(timezone=True), nullable=False, primary_key=PARTITIONED)
+    idempotency_key = Column(String(128), nullable=True)  # client key or payload hash, see ingestion/dedup.py
+    actor_id = Column(String, nullable=True, comment="Assigned by ingestion/identity.py")
+    server_session_id = Column(String(36), nullable=True, comment="Assigned by ingestion/sessionizer.py")
+
+    __table_args__ = partitioned_table_args(
+        Index("uq_cart_idempotency_key", *partition_key("idempotency_key"), unique=True),
         Index("idx_cart_user_time", "user_id", "event_time"),
+        Index("idx_cart_time", "event_time", "event_id"),
+        Index("idx_cart_actor_time", "actor_id", "event_time"),
+        Index("idx_cart_server_session", "server_session_id", "event_time"),
     )
\ No newline at end of file
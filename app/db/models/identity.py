@@ -0,0 +1,24 @@
+from sqlalchemy import (
+    Column,
+    String,
+    DateTime,
+    func,
+)
+from app.db.base import Base
+
+
+class IdentityLink(Base):
+    """
+    Anonymous id (client session id) -> actor it has been linked to on login,
+    written behind by identity resolution (services/ingestion/identity.py).
+    """
+    __tablename__ = "identity_links"
+
+    anonymous_id = Column(String, primary_key=True)
+    actor_id = Column(String, nullable=False, comment="user:<user_id>")
+    linked_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
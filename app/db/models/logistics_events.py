@@ -9,6 +9,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.base import Base
+from app.db.partitioning import PARTITIONED, partition_key, partitioned_table_args
 import uuid
 import enum
 
@@ -35,4 +36,11 @@ class LogisticsEvent(Base):
         ),
         nullable=False,
     )
-    event_time = Column(DateTime(timezone=True), nullable=False)
+    event_time = Column(DateTime(timezone=True), nullable=False, primary_key=PARTITIONED)
+    idempotency_key = Column(String(128), nullable=True)  # client key or payload hash, see ingestion/dedup.py
+
+    __table_args__ = partitioned_table_args(
+        Index("uq_logistics_idempotency_key", *partition_key("idempotency_key"), unique=True),
+        # Keyset pagination and time-range exports
+        Index("idx_logistics_time", "event_time", "event_id"),
+    )
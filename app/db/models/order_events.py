@@ -9,6 +9,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.base import Base
+from app.db.partitioning import PARTITIONED, partition_key, partitioned_table_args
 import uuid
 import enum
 
@@ -25,7 +26,13 @@ class OrderEvent(Base):
     __tablename__ = "order_events"
 
     event_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    order_id = Column(String, nullable=False, unique=True, comment="Maps to InvoiceNo")
+    order_id = Column(
+        String,
+        nullable=False,
+        unique=not PARTITIONED,   # see app/db/partitioning.py
+        info={"unique": True},
+        comment="Maps to InvoiceNo",
+    )
     user_id = Column(Integer, nullable=True)
     status = Column(
         Enum(
@@ -36,5 +43,15 @@ class OrderEvent(Base):
         nullable=False,
     )
     country = Column(String)
-    event_time = Column(DateTime(timezone=True), nullable=False)
+    event_time = Column(DateTime(timezone=True), nullable=False, primary_key=PARTITIONED)
     ingested_at = Column(DateTime(timezone=True), server_default=func.now())
+    idempotency_key = Column(String(128), nullable=True)  # client key or payload hash, see ingestion/dedup.py
+
+    __table_args__ = partitioned_table_args(
+        Index("uq_order_idempotency_key", *partition_key("idempotency_key"), unique=True),
+        # Funnel steps join orders to earlier steps by user within a time window
+        Index("idx_order_user_time", "user_id", "event_time"),
+        Index("idx_order_time", "event_time", "event_id"),
+        # Serves the order_id pre-check in place of the unique constraint
+        partitioned_only=(Index("idx_order_order_id", "order_id"),),
+    )
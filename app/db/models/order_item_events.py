@@ -8,6 +8,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.base import Base
+from app.db.partitioning import PARTITIONED, partition_key, partitioned_table_args
 import uuid
 
 class OrderItemEvent(Base):
@@ -20,4 +21,11 @@ class OrderItemEvent(Base):
     description = Column(String)
     quantity = Column(Integer, nullable=False)
     price_at_purchase = Column(Integer, nullable=False, comment="Price in cents/pence")
-    event_time = Column(DateTime(timezone=True), nullable=False)
\ No newline at end of file
+    event_time = Column(DateTime(timezone=True), nullable=False, primary_key=PARTITIONED)
+    idempotency_key = Column(String(128), nullable=True)  # client key or payload hash, see ingestion/dedup.py
+
+    __table_args__ = partitioned_table_args(
+        Index("uq_order_item_idempotency_key", *partition_key("idempotency_key"), unique=True),
+        # Keyset pagination and time-range exports
+        Index("idx_order_item_time", "event_time", "event_id"),
+    )
@@ -8,6 +8,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.base import Base
+from app.db.partitioning import PARTITIONED, partition_key, partitioned_table_args
 import uuid
 
 
@@ -20,4 +21,11 @@ class PaymentEvent(Base):
     order_id = Column(String, nullable=False, index=True)
     amount = Column(Integer, nullable=False)
     status = Column(String, nullable=False) # e.g., 'Success', 'Refunded'
-    event_time = Column(DateTime(timezone=True), nullable=False)
\ No newline at end of file
+    event_time = Column(DateTime(timezone=True), nullable=False, primary_key=PARTITIONED)
+    idempotency_key = Column(String(128), nullable=True)  # client key or payload hash, see ingestion/dedup.py
+
+    __table_args__ = partitioned_table_args(
+        Index("uq_payment_idempotency_key", *partition_key("idempotency_key"), unique=True),
+        # Keyset pagination and time-range exports
+        Index("idx_payment_time", "event_time", "event_id"),
+    )
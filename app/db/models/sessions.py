@@ -0,0 +1,29 @@
+from sqlalchemy import (
+    Column,
+    String,
+    DateTime,
+    func,
+)
+from app.db.base import Base
+
+
+class ActorSession(Base):
+    """
+    Current session per actor, written behind by the sessionizer
+    (services/ingestion/sessionizer.py).
+
+    Only read for actors that are not in the sessionizer's in-memory table,
+    e.g. after a restart or once an idle actor has been evicted.
+    """
+    __tablename__ = "actor_sessions"
+
+    actor = Column(String, primary_key=True, comment="actor_id, see ingestion/identity.py")
+    session_id = Column(String(36), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    last_event_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
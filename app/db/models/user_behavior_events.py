@@ -9,6 +9,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.base import Base
+from app.db.partitioning import PARTITIONED, partition_key, partitioned_table_args
 import uuid
 import enum
 
@@ -34,16 +35,35 @@ class UserBehaviorEvent(Base):
     user_id = Column(Integer,
         nullable=True,
         comment="Nullable to support guest users",)
-    event_time = Column(DateTime(timezone=True), nullable=False)
+    event_time = Column(DateTime(timezone=True), nullable=False, primary_key=PARTITIONED)
     ingested_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     product_id = Column(Integer, nullable=False)
     session_id = Column(String, nullable=False)
     country = Column(String, nullable=True)
     source = Column(String, nullable=True)
     platform = Column(String, nullable=True)
+    idempotency_key = Column(String(128), nullable=True)  # client key or payload hash, see ingestion/dedup.py
+    actor_id = Column(String, nullable=True, comment="Assigned by ingestion/identity.py")
+    server_session_id = Column(String(36), nullable=True, comment="Assigned by ingestion/sessionizer.py")
+    # Derived at write time by ingestion/enrichment.py
+    device_type = Column(String, nullable=True)
+    traffic_source = Column(String, nullable=True)
+    page_type = Column(String, nullable=True)
+    product_category = Column(String, nullable=True)
 
-    
-    __table_args__ = (
+    __table_args__ = partitioned_table_args(
+        Index("uq_user_behavior_idempotency_key", *partition_key("idempotency_key"), unique=True),
         Index("idx_user_behavior_user_time", "user_id", "event_time"),
         Index("idx_user_behavior_product_time", "product_id", "event_time"),
+        # Time-range scans without a user/product filter (funnel entry step,
+        # keyset pagination on (event_time, event_id))
+        Index("idx_user_behavior_time", "event_time", "event_id"),
+        # Range scans by the incremental aggregator's high-water mark
+        Index("idx_user_behavior_ingested_at", "ingested_at"),
+        # Per-actor reads (guests included) and identity stitching
+        Index("idx_user_behavior_actor_time", "actor_id", "event_time"),
+        # Session-scoped funnels and session lookups
+        Index("idx_user_behavior_server_session", "server_session_id", "event_time"),
+        # Category breakdowns over a time range
+        Index("idx_user_behavior_category_time", "product_category", "event_time"),
     )
@@ -0,0 +1,62 @@
+"""
+Time Partitioning of the Event Tables (Postgres)
+
+With ``DB_PARTITIONING`` set to ``daily`` or ``monthly``, the six event
+tables are declared ``PARTITION BY RANGE (event_time)``. Partitions are
+created ahead of time and expired ones are dropped or archived by
+``services/persistence/partitions.py``. SQLite ignores the partitioning
+clause, so the models stay usable in tests.
+
+Postgres requires every primary key and unique index of a partitioned table
+to contain the partition key. When partitioning is on:
+
+- the primary key is ``(event_id, event_time)``;
+- the idempotency-key unique indexes become ``(idempotency_key, event_time)``.
+  A retried event repeats its ``event_time``, so it still collides;
+- ``order_events.order_id`` loses its database-level unique constraint. The
+  ingestion pre-checks (``reject_unique_conflicts`` for batches,
+  ``find_unique_conflict`` for single events) still reject known order_ids
+  with a 409, but two concurrent requests for the same new order_id are no
+  longer serialized by the database.
+
+The layout is fixed when a table is created: switching an existing
+deployment to partitioning needs a migration that rebuilds the tables.
+Until then, migrations refuse to run against tables whose layout differs
+from the setting (``partitioning_mismatch``).
+"""
+from typing import Any, Tuple
+
+from app.core.config import DB_PARTITIONING
+
+PARTITION_COLUMN = "event_time"
+PARTITION_GRANULARITIES = ("daily", "monthly")
+
+if DB_PARTITIONING and DB_PARTITIONING not in PARTITION_GRANULARITIES:
+    raise ValueError(f"Unknown DB_PARTITIONING '{DB_PARTITIONING}'")
+
+PARTITIONED: bool = DB_PARTITIONING in PARTITION_GRANULARITIES
+
+
+def partition_key(*columns: str) -> Tuple[str, ...]:
+    """Columns of a unique index, extended with the partition key when partitioned."""
+    if PARTITIONED:
+        return (*columns, PARTITION_COLUMN)
+    return columns
+
+
+def partitioned_table_args(*args: Any, partitioned_only: Tuple[Any, ...] = ()) -> Tuple[Any, ...]:
+    """
+    ``__table_args__`` for an event table: ``args``, plus ``partitioned_only``
+    and the ``PARTITION BY`` clause when partitioning is on.
+    """
+    if not PARTITIONED:
+        return args
+    return (*args, *partitioned_only, {"postgresql_partition_by": f"RANGE ({PARTITION_COLUMN})"})
+
+
+def unique_columns(model) -> list:
+    """
+    Columns whose values must be unique per table. Includes columns marked
+    ``info={"unique": True}`` whose constraint cannot exist on a partitioned table.
+    """
+    return [c for c in model.__table__.columns if c.unique or c.info.get("unique")]
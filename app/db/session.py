@@ -1,8 +1,64 @@
+from typing import Any, Dict, Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from app.core.config import DATABASE_URL
+from app.core.config import (
+    ASYNC_DATABASE_URL,
+    DATABASE_URL,
+    DB_ASYNC,
+    DB_EXECUTEMANY_MODE,
+    DB_INSERTMANYVALUES_PAGE_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE_S,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_S,
+    DB_STATEMENT_TIMEOUT_MS,
+)
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, pool_stats
+
+
+def engine_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """
+    Build create_engine() keyword arguments for ``url`` from the DB_* settings.
+
+    In-memory SQLite keeps SQLAlchemy's default single-connection pool; every
+    other database gets an instrumented queue pool so checkout waits are visible.
+    """
+    parsed = make_url(url)
+    backend, driver = parsed.get_backend_name(), parsed.get_driver_name()
+    options: Dict[str, Any] = {
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "insertmanyvalues_page_size": DB_INSERTMANYVALUES_PAGE_SIZE,
+    }
+
+    if not (backend == "sqlite" and parsed.database in (None, "", ":memory:")):
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT_S,
+            pool_recycle=DB_POOL_RECYCLE_S,
+        )
 
-engine = create_engine(DATABASE_URL)
+    if backend == "postgresql":
+        if driver == "psycopg2":
+            options["executemany_mode"] = DB_EXECUTEMANY_MODE
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            if driver == "asyncpg":
+                options["connect_args"] = {
+                    "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+                }
+            else:
+                options["connect_args"] = {
+                    "options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+                }
+    return options
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -13,3 +69,50 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# --------------------------------------------------------------------------- #
+# Async engine (only built when DB_ASYNC is enabled, so the async drivers
+# stay optional for sync deployments; they are in requirements-async.txt)
+# --------------------------------------------------------------------------- #
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Swap a sync driver for its async equivalent, e.g. postgresql:// -> postgresql+asyncpg://."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' URLs")
+    return parsed.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+if DB_ASYNC:
+    _async_url = ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+    async_engine = create_async_engine(_async_url, **engine_options(_async_url, is_async=True))
+    # expire_on_commit=False: returned ORM objects must stay readable after
+    # commit without triggering an implicit (sync) refresh.
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database access is disabled (set DB_ASYNC=true)")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Live pool statistics for the sync engine and, if enabled, the async engine."""
+    stats = {"sync": pool_stats(engine.pool)}
+    if async_engine is not None:
+        stats["async"] = pool_stats(async_engine.pool)
+    return stats
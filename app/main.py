@@ -2,8 +2,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.api.v1.api_router import api_router
+from app.api.v1.routers import health, metrics
+from app.core.config import DB_AUTO_CREATE, METRICS_ENABLED
+from app.core.metrics import MetricsMiddleware, install_session_metrics, record_committed
 from app.db.base import Base
-from app.db.session import engine
+from app.db.session import engine, async_engine
+from app.core.startup import start_background_services, stop_background_services
+from app.services.persistence.event_writer import add_commit_listener
 # Import all models to register them with Base
 import app.db.models  # noqa: F401
 
@@ -11,12 +16,17 @@ import app.db.models  # noqa: F401
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup/shutdown events."""
-    # Startup
-    Base.metadata.create_all(bind=engine)
+    # Startup. The schema comes from migrations (scripts/init_db.py); create_all
+    # reflects every table on each worker start, so it is opt-in.
+    if DB_AUTO_CREATE:
+        Base.metadata.create_all(bind=engine)
+    start_background_services()
     print("🚀 InsightHub API Started")
     yield
-    # Shutdown
-    pass
+    # Shutdown: flush everything still buffered before the process exits
+    stop_background_services()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
 def create_application() -> FastAPI:
@@ -34,10 +44,19 @@ def create_application() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 
+    if METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+        add_commit_listener(record_committed)
+        install_session_metrics()
+
     # Include versioned API
     app.include_router(api_router, prefix="/api/v1")
+    app.include_router(health.router)
+    if METRICS_ENABLED:
+        app.include_router(metrics.router)
 
     return app
 
@@ -48,9 +67,3 @@ app = create_application()
 @app.get("/")
 def root():
     return {"message": "InsightHub API is running"}
-
-
-@app.get("/health")
-def health():
-    """Basic health-check endpoint used by CI/tests."""
-    return {"status": "ok"}
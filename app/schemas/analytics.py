@@ -0,0 +1,45 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import List, Optional
+
+
+class HourlyProductCounts(BaseModel):
+    product_id: int
+    event_hour: datetime
+    view_count: int
+    search_count: int
+    total_events: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class FunnelStep(BaseModel):
+    step: str
+    users: int
+    conversion_from_previous: float
+    conversion_from_start: float
+    drop_off: int
+
+
+class FunnelResponse(BaseModel):
+    start: datetime
+    end: datetime
+    window_hours: float
+    product_id: Optional[int] = None
+    steps: List[FunnelStep]
+
+
+class TrendPoint(BaseModel):
+    bucket_start: datetime
+    view_count: int
+    search_count: int
+    total_events: int
+
+
+class TrendResponse(BaseModel):
+    granularity: str
+    start: datetime
+    end: datetime
+    product_id: Optional[int] = None
+    aggregated_until: Optional[datetime] = None
+    points: List[TrendPoint]
@@ -1,10 +1,11 @@
 """Event schemas for API request/response validation."""
-from app.schemas.events.user_events import UserBehaviorCreate, UserBehaviorEventType
-from app.schemas.events.cart_events import CartCreate
-from app.schemas.events.order_base import OrderItemCreate, OrderItemResponse
-from app.schemas.events.order_events import OrderCreate, OrderStatus, OrderResponse
-from app.schemas.events.payment_events import PaymentCreate
-from app.schemas.events.logistic_events import LogisticsCreate, LogisticsStatus
+from app.schemas.events.base import EventCreate, EventQuery
+from app.schemas.events.user_events import UserBehaviorCreate, UserBehaviorEventType, UserBehaviorQuery
+from app.schemas.events.cart_events import CartCreate, CartQuery
+from app.schemas.events.order_base import OrderItemCreate, OrderItemResponse, OrderItemQuery
+from app.schemas.events.order_events import OrderCreate, OrderStatus, OrderResponse, OrderQuery
+from app.schemas.events.payment_events import PaymentCreate, PaymentQuery
+from app.schemas.events.logistic_events import LogisticsCreate, LogisticsStatus, LogisticsQuery
 
 __all__ = [
     "UserBehaviorCreate",
@@ -17,5 +18,13 @@ __all__ = [
     "OrderItemResponse",
     "PaymentCreate",  "LogisticsCreate",
     "LogisticsStatus",
+    "EventCreate",
+    "EventQuery",
+    "UserBehaviorQuery",
+    "CartQuery",
+    "OrderQuery",
+    "OrderItemQuery",
+    "PaymentQuery",
+    "LogisticsQuery",
 ]
 
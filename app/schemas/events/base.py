@@ -0,0 +1,71 @@
+from pydantic import BaseModel, Field, model_validator
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Literal, Optional
+from uuid import UUID
+
+from app.services.ingestion.normalizer import normalize_payload
+
+
+class EventCreate(BaseModel):
+    """Fields accepted on every ``*Create`` schema."""
+    idempotency_key: Optional[str] = Field(
+        None,
+        min_length=1,
+        max_length=128,
+        description="Client key identifying retries of the same event. "
+                    "When omitted, derived from a hash of the payload only if "
+                    "DEDUP_CONTENT_HASH is enabled.",
+    )
+
+    @model_validator(mode="before")
+    @classmethod
+    def _normalize(cls, data: Any) -> Any:
+        # Canonical field names and values before validation (productId -> product_id, ...)
+        return normalize_payload(cls, data)
+
+
+class BatchItemResult(BaseModel):
+    # Position of the item in the submitted list
+    index: int
+    # "duplicate": a retry of an already ingested event; event_id is the original's
+    status: Literal["accepted", "rejected", "duplicate"]
+    event_id: Optional[UUID] = None
+    errors: Optional[List[Dict[str, Any]]] = None
+
+
+class BatchIngestResponse(BaseModel):
+    accepted: int
+    rejected: int
+    duplicates: int = 0
+    results: List[BatchItemResult]
+
+
+class IngestResponseMode(str, Enum):
+    FULL = "full"
+    LEAN = "lean"
+
+
+class EventQuery(BaseModel):
+    """Common query parameters for paged event reads, ordered by (event_time, event_id)."""
+    start: Optional[datetime] = Field(None, description="Inclusive lower bound on event_time")
+    end: Optional[datetime] = Field(None, description="Exclusive upper bound on event_time")
+    limit: int = Field(100, ge=1, le=1000)
+    cursor: Optional[str] = Field(None, description="X-Next-Cursor from the previous page")
+
+    @classmethod
+    def filter_fields(cls) -> List[str]:
+        """Equality filters declared by the per-type subclass."""
+        return [name for name in cls.model_fields if name not in EventQuery.model_fields]
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class EventExportQuery(BaseModel):
+    """Query parameters for streamed exports of a whole event table."""
+    format: ExportFormat = ExportFormat.NDJSON
+    start: Optional[datetime] = Field(None, description="Inclusive lower bound on event_time")
+    end: Optional[datetime] = Field(None, description="Exclusive upper bound on event_time")
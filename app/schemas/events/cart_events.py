@@ -2,7 +2,9 @@ from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import Optional
 
-class CartCreate(BaseModel):
+from app.schemas.events.base import EventCreate, EventQuery
+
+class CartCreate(EventCreate):
     correlation_id: str
     user_id: Optional[int] = None
     product_id: int
@@ -10,4 +12,11 @@ class CartCreate(BaseModel):
     quantity: int = Field(..., gt=0)
     event_time: datetime
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CartQuery(EventQuery):
+    user_id: Optional[int] = None
+    product_id: Optional[int] = None
+    correlation_id: Optional[str] = None
+    actor_id: Optional[str] = None
@@ -1,6 +1,9 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 from enum import Enum
+from typing import Optional
+
+from app.schemas.events.base import EventCreate, EventQuery
 
 class LogisticsStatus(str, Enum):
     PICKED_UP = "picked_up"
@@ -9,9 +12,13 @@ class LogisticsStatus(str, Enum):
     DELIVERED = "delivered"
     DELAYED = "delayed"
 
-class LogisticsCreate(BaseModel):
+class LogisticsCreate(EventCreate):
     order_id: str
     status: LogisticsStatus
     event_time: datetime
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class LogisticsQuery(EventQuery):
+    order_id: Optional[str] = None
@@ -2,8 +2,10 @@ from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import Optional
 
+from app.schemas.events.base import EventCreate, EventQuery
 
-class OrderItemCreate(BaseModel):
+
+class OrderItemCreate(EventCreate):
     order_id: str
     product_id: str
     description: Optional[str] = None
@@ -17,4 +19,9 @@ class OrderItemCreate(BaseModel):
 class OrderItemResponse(OrderItemCreate):
     event_id: int
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class OrderItemQuery(EventQuery):
+    order_id: Optional[str] = None
+    product_id: Optional[str] = None
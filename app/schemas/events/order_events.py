@@ -3,6 +3,8 @@ from datetime import datetime
 from typing import Optional
 from enum import Enum
 
+from app.schemas.events.base import EventCreate, EventQuery
+
 
 class OrderStatus(str, Enum):
     PENDING = "pending"
@@ -11,7 +13,7 @@ class OrderStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
-class OrderCreate(BaseModel):
+class OrderCreate(EventCreate):
     order_id: str = Field(..., json_schema_extra={"example": "ORD-123456"})
     user_id: Optional[int] = None
     status: OrderStatus
@@ -24,4 +26,9 @@ class OrderCreate(BaseModel):
 class OrderResponse(OrderCreate):
     event_id: int
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class OrderQuery(EventQuery):
+    user_id: Optional[int] = None
+    order_id: Optional[str] = None
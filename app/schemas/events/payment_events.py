@@ -1,8 +1,11 @@
 from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
+from typing import Optional
 
+from app.schemas.events.base import EventCreate, EventQuery
 
-class PaymentCreate(BaseModel):
+
+class PaymentCreate(EventCreate):
     # We use order_id as a string to match your DB Column
     order_id: str = Field(..., json_schema_extra={"example": "ORD-992834"})
     # to avoid floating-point errors.
@@ -12,3 +15,7 @@ class PaymentCreate(BaseModel):
     event_time: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class PaymentQuery(EventQuery):
+    order_id: Optional[str] = None
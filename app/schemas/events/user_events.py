@@ -3,12 +3,14 @@ from datetime import datetime
 from typing import Optional
 from enum import Enum
 
+from app.schemas.events.base import EventCreate, EventQuery
+
 # Mirror the Enum from your DB model for strict validation
 class UserBehaviorEventType(str, Enum):
     PRODUCT_VIEWED = "product_viewed"
     PRODUCT_SEARCHED = "product_searched"
 
-class UserBehaviorCreate(BaseModel):
+class UserBehaviorCreate(EventCreate):
     # We don't include event_id or ingested_at because the DB generates those
     event_type: UserBehaviorEventType
     user_id: Optional[int] = None  # Match your 'nullable=True' for guests
@@ -21,3 +23,10 @@ class UserBehaviorCreate(BaseModel):
 
     # This allows Pydantic to work with SQLAlchemy objects if needed later
     model_config = ConfigDict(from_attributes=True)
+
+
+class UserBehaviorQuery(EventQuery):
+    user_id: Optional[int] = None
+    product_id: Optional[int] = None
+    session_id: Optional[str] = None
+    actor_id: Optional[str] = None
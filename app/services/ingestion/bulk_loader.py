@@ -0,0 +1,388 @@
+"""
+Bulk Event Loader
+
+Loads historical event files straight into the event tables, bypassing HTTP.
+Inputs are NDJSON (``.ndjson`` / ``.jsonl``) or CSV (``.csv``) files, optionally
+gzip-compressed (``.gz``). They are read as streams, so file size does not
+affect memory use.
+
+Every record is routed to an event type from ``EVENT_TYPES``. The type comes
+from a ``"type"`` field on the record (its value is the URL slug, e.g.
+``"user-behavior"``) or, failing that, from the loader's default type. Records
+are buffered per type and flushed in batches of ``batch_size``. Each flush
+validates the batch against the ``*Create`` schema and rejects unique
+conflicts. It also rejects records whose ``idempotency_key`` was already
+written or repeats an earlier record (``duplicate``). It then resolves
+actors, enriches and writes the valid rows, and commits. Rejected records are
+reported with their line number and never abort the load.
+
+Identity resolution (``IDENTITY_RESOLUTION_ENABLED``) runs as it does on the
+HTTP path. Links found in the file are persisted, and earlier guest rows are
+stitched, after every committed batch. In ``db`` mode, links are persisted
+only when the caller runs ``flush_identity_links`` after its commit. Server
+sessions are not assigned to backfilled rows.
+
+Writes use ``COPY ... FROM STDIN`` on Postgres with psycopg2 and batched
+multi-row INSERTs everywhere else.
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import time
+from datetime import datetime
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy.orm import Session
+
+from app.core.config import AGGREGATOR_MODE, BULK_LOAD_BATCH_SIZE
+from app.db.functions import as_utc
+from app.db.models.user_behavior_events import UserBehaviorEvent
+from app.services.ingestion.dedup import Duplicate, drop_duplicates
+from app.services.ingestion.enrichment import enrich_rows
+from app.services.ingestion.event_router import EVENT_TYPES, EventType
+from app.services.ingestion.identity import flush_identity_links, resolve_actors
+from app.services.ingestion.validators import reject_unique_conflicts, validate_batch
+from app.services.persistence.aggregates import recompute_hours
+from app.services.persistence.event_writer import insert_events, notify_committed
+
+logger = logging.getLogger(__name__)
+
+TYPE_FIELD = "type"
+
+# (line number, record) pairs as read from a file
+NumberedRecord = Tuple[int, Dict[str, Any]]
+
+
+class LoadStats:
+    """Counters for one load."""
+
+    def __init__(self):
+        self.read = 0
+        self.loaded = 0
+        self.rejected = 0
+        self.loaded_by_type: Dict[str, int] = {}
+        # earliest event_time loaded, of any type (partitions to create)
+        self.first_event_time: Optional[datetime] = None
+        # event_time range of the loaded behavior events (aggregates to rebuild)
+        self.first_behavior_time: Optional[datetime] = None
+        self.last_behavior_time: Optional[datetime] = None
+        self.started = time.perf_counter()
+        self.elapsed_seconds = 0.0
+
+    def record_event_time(self, value: Optional[datetime]) -> None:
+        if value is not None and (self.first_event_time is None or as_utc(value) < self.first_event_time):
+            self.first_event_time = as_utc(value)
+
+    def record_behavior_times(self, times: Iterable[datetime]) -> None:
+        times = [as_utc(value) for value in times]
+        if not times:
+            return
+        first, last = min(times), max(times)
+        if self.first_behavior_time is None or first < self.first_behavior_time:
+            self.first_behavior_time = first
+        if self.last_behavior_time is None or last > self.last_behavior_time:
+            self.last_behavior_time = last
+
+    def merge(self, other: "LoadStats") -> None:
+        self.read += other.read
+        self.loaded += other.loaded
+        self.rejected += other.rejected
+        for name, count in other.loaded_by_type.items():
+            self.loaded_by_type[name] = self.loaded_by_type.get(name, 0) + count
+        self.record_event_time(other.first_event_time)
+        self.record_behavior_times(
+            value for value in (other.first_behavior_time, other.last_behavior_time) if value is not None
+        )
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.loaded / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "read": self.read,
+            "loaded": self.loaded,
+            "rejected": self.rejected,
+            "loaded_by_type": dict(self.loaded_by_type),
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+# --------------------------------------------------------------------------- #
+# Reading
+# --------------------------------------------------------------------------- #
+def detect_format(path: str) -> str:
+    """``"ndjson"`` or ``"csv"`` from the file name, ignoring a trailing ``.gz``."""
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    if name.endswith(".csv"):
+        return "csv"
+    raise ValueError(f"Cannot infer the format of {path}; pass it explicitly")
+
+
+def open_event_file(path: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+class InvalidRecord(ValueError):
+    """A line that could not be parsed into a record."""
+
+
+def iter_ndjson(lines: Iterable[str], first_line: int = 1) -> Iterator[Tuple[int, Any]]:
+    """Parsed NDJSON lines; blank lines are skipped, bad lines yield ``InvalidRecord``."""
+    for number, line in enumerate(lines, start=first_line):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield number, InvalidRecord(f"invalid JSON: {exc}")
+            continue
+        if not isinstance(record, dict):
+            yield number, InvalidRecord("record is not a JSON object")
+            continue
+        yield number, record
+
+
+def iter_csv(lines: Iterable[str], header: Optional[Sequence[str]] = None, first_line: int = 1):
+    """CSV rows as dicts; empty cells become ``None`` so optional fields validate."""
+    reader = csv.reader(lines)
+    number = first_line
+    if header is None:
+        header = next(reader, None)
+        number += 1
+        if header is None:
+            return
+    for row in reader:
+        if row:
+            yield number, {key: (value if value != "" else None) for key, value in zip(header, row)}
+        number += 1
+
+
+def iter_file(path: str, fmt: Optional[str] = None) -> Iterator[Tuple[int, Any]]:
+    fmt = fmt or detect_format(path)
+    with open_event_file(path) as handle:
+        if fmt == "ndjson":
+            yield from iter_ndjson(handle)
+        else:
+            yield from iter_csv(handle)
+
+
+# --------------------------------------------------------------------------- #
+# Writing
+# --------------------------------------------------------------------------- #
+def _copy_value(value: Any) -> str:
+    """Render a value in COPY text format."""
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    value = getattr(value, "value", value)  # enums
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_events(db: Session, model, rows: Sequence[Dict[str, Any]]) -> List[UUID]:
+    """
+    Write ``rows`` with ``COPY ... FROM STDIN`` (Postgres/psycopg2 only).
+
+    Columns left out (server defaults such as ``ingested_at``) are filled by
+    the database. The caller owns the transaction.
+    """
+    if not rows:
+        return []
+    values = [row if row.get("event_id") else {**row, "event_id": uuid4()} for row in rows]
+    columns = list(values[0].keys())
+
+    buffer = io.StringIO()
+    for row in values:
+        buffer.write("\t".join(_copy_value(row[column]) for column in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    quote = db.get_bind().dialect.identifier_preparer.quote
+    sql = "COPY {} ({}) FROM STDIN".format(
+        quote(model.__tablename__), ", ".join(quote(column) for column in columns)
+    )
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+    return [row["event_id"] for row in values]
+
+
+def write_events(db: Session, model, rows: Sequence[Dict[str, Any]]) -> List[UUID]:
+    """
+    COPY on Postgres through psycopg2, batched INSERT elsewhere (including
+    other Postgres drivers, which lack ``copy_expert``). The caller owns the
+    transaction.
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg2":
+        return copy_events(db, model, rows)
+    return insert_events(db, model, rows)
+
+
+# --------------------------------------------------------------------------- #
+# Loading
+# --------------------------------------------------------------------------- #
+RejectCallback = Callable[[int, Optional[str], List[Dict[str, Any]]], None]
+
+
+class BulkLoader:
+    """
+    Routes records to their event type, buffers them per type and writes
+    each full buffer as one validated batch in its own transaction.
+
+    Given ``db`` instead of a session factory, every batch is written into
+    that session and nothing is committed: the caller commits the whole load
+    as one unit (and notifies commit listeners if it needs to).
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]],
+        batch_size: int = BULK_LOAD_BATCH_SIZE,
+        default_type: Optional[str] = None,
+        on_reject: Optional[RejectCallback] = None,
+        db: Optional[Session] = None,
+    ):
+        if default_type is not None and default_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type: {default_type}")
+        if (session_factory is None) == (db is None):
+            raise ValueError("Pass exactly one of session_factory or db")
+        self.session_factory = session_factory
+        self.db = db
+        self.batch_size = batch_size
+        self.default_type = default_type
+        self.on_reject = on_reject
+        self.stats = LoadStats()
+        self._buffers: Dict[str, List[NumberedRecord]] = {name: [] for name in EVENT_TYPES}
+
+    def _reject(self, line: int, type_name: Optional[str], errors: List[Dict[str, Any]]) -> None:
+        self.stats.rejected += 1
+        if self.on_reject is not None:
+            self.on_reject(line, type_name, errors)
+
+    def add(self, line: int, record: Any) -> None:
+        """Route one parsed record (or ``InvalidRecord``) into its type's buffer."""
+        self.stats.read += 1
+        if isinstance(record, InvalidRecord):
+            self._reject(line, None, [{"type": "invalid_record", "msg": str(record)}])
+            return
+
+        type_name = record.pop(TYPE_FIELD, None) or self.default_type
+        buffer = self._buffers.get(type_name)
+        if buffer is None:
+            self._reject(line, type_name, [{
+                "type": "unknown_event_type",
+                "loc": [TYPE_FIELD],
+                "msg": f"unknown or missing event type: {type_name!r}",
+            }])
+            return
+
+        buffer.append((line, record))
+        if len(buffer) >= self.batch_size:
+            self._flush(EVENT_TYPES[type_name])
+
+    def load(self, records: Iterable[Tuple[int, Any]]) -> LoadStats:
+        """Load all ``(line, record)`` pairs and flush what is left."""
+        for line, record in records:
+            self.add(line, record)
+        return self.finish()
+
+    def finish(self) -> LoadStats:
+        for type_name, buffer in self._buffers.items():
+            if buffer:
+                self._flush(EVENT_TYPES[type_name])
+        self.stats.elapsed_seconds = time.perf_counter() - self.stats.started
+        return self.stats
+
+    def _flush(self, event_type: EventType) -> None:
+        batch = self._buffers[event_type.name]
+        self._buffers[event_type.name] = []
+        lines = [line for line, _ in batch]
+
+        accepted, rejected = validate_batch(event_type.schema, [record for _, record in batch])
+        if self.db is not None:
+            rows, conflicts = self._write(self.db, event_type, accepted)
+        else:
+            with self.session_factory() as db:
+                rows, conflicts = self._write(db, event_type, accepted)
+                db.commit()
+                try:
+                    flush_identity_links(db)
+                except Exception:
+                    # Links stay pending and are retried after the next batch.
+                    logger.exception("Persisting identity links failed")
+            if rows:
+                notify_committed(event_type.model, rows)
+
+        for index, errors in sorted(rejected + conflicts, key=lambda pair: pair[0]):
+            self._reject(lines[index], event_type.name, errors)
+        if rows:
+            self.stats.record_event_time(min(as_utc(row["event_time"]) for row in rows))
+        if event_type.model is UserBehaviorEvent:
+            self.stats.record_behavior_times(row["event_time"] for row in rows)
+        self.stats.loaded += len(rows)
+        self.stats.loaded_by_type[event_type.name] = (
+            self.stats.loaded_by_type.get(event_type.name, 0) + len(rows)
+        )
+        logger.debug("Loaded %d %s events", len(rows), event_type.name)
+
+    @staticmethod
+    def _write(db: Session, event_type: EventType, accepted):
+        accepted, conflicts = reject_unique_conflicts(db, event_type.model, accepted)
+        accepted, duplicates = drop_duplicates(db, event_type.model, accepted, always=True)
+        rows = [item.model_dump() for _, item in accepted]
+        if rows:
+            resolve_actors(db, event_type.model, rows)
+            enrich_rows(event_type.model, rows)
+            write_events(db, event_type.model, rows)
+        return rows, conflicts + [(d.index, [_duplicate_error(d)]) for d in duplicates]
+
+
+def _duplicate_error(duplicate: Duplicate) -> Dict[str, Any]:
+    if duplicate.event_id is None:
+        msg = "idempotency_key repeats an earlier record of the batch"
+    else:
+        msg = f"idempotency_key already written as event {duplicate.event_id}"
+    return {"type": "duplicate", "loc": ["idempotency_key"], "msg": msg}
+
+
+# --------------------------------------------------------------------------- #
+# After a load
+# --------------------------------------------------------------------------- #
+def refresh_aggregates(db: Session, stats: LoadStats) -> int:
+    """
+    Rebuild the hourly aggregates over the ``event_time`` range of a finished
+    load. Returns the number of product-hours written.
+
+    Loaded rows are stamped ``ingested_at`` with their transaction's start,
+    so a long load can commit them behind the incremental aggregator's
+    watermark, which then never folds them. Loader processes feed no
+    in-memory counters either.
+    """
+    if stats.first_behavior_time is None:
+        return 0
+    return recompute_hours(
+        db,
+        stats.first_behavior_time,
+        stats.last_behavior_time,
+        up_to_watermark=AGGREGATOR_MODE == "watermark",
+    )
@@ -0,0 +1,222 @@
+"""
+Event Deduplication
+
+Mobile clients retry on timeouts, so the same event can arrive several times.
+Every event has an idempotency key. It is the client's ``idempotency_key``
+when one is sent. Otherwise, with ``DEDUP_CONTENT_HASH`` on, it is a SHA-256
+of the validated payload. The key is stored in the event table's
+``idempotency_key`` column, under a unique index.
+
+``seen_events`` maps the keys of recently written events to their
+``event_id``. It is a bounded LRU and its entries expire after
+``DEDUP_CACHE_TTL_S``. Most retries are answered from it without a query.
+The unique index is the source of truth behind the cache:
+
+- batches look up the keys the cache does not know with one ``IN`` query;
+- single events are inserted straight away, and the original row is only
+  looked up (``find_original``) when the insert actually conflicts.
+
+Duplicates are dropped, not rejected: the client gets the original
+``event_id`` back.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    DEDUP_CACHE_SIZE,
+    DEDUP_CACHE_TTL_S,
+    DEDUP_CONTENT_HASH,
+    DEDUP_ENABLED,
+)
+from app.services.ingestion.validators import Accepted
+
+# (table name, idempotency key)
+SeenKey = Tuple[str, str]
+
+
+class SeenSet:
+    """Thread-safe LRU of ``key -> event_id`` whose entries expire ``ttl`` seconds after being added."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[SeenKey, Tuple[float, UUID]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: SeenKey) -> Optional[UUID]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, event_id = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return event_id
+
+    def add_many(self, items: Iterable[Tuple[SeenKey, UUID]]) -> None:
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, event_id in items:
+                self._entries[key] = (expires_at, event_id)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard_many(self, items: Iterable[Tuple[SeenKey, UUID]]) -> None:
+        """Drop entries that still map ``key`` to ``event_id``."""
+        with self._lock:
+            for key, event_id in items:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] == event_id:
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+seen_events = SeenSet(DEDUP_CACHE_SIZE, DEDUP_CACHE_TTL_S)
+
+
+class Duplicate(NamedTuple):
+    index: int                  # position in the submitted batch
+    key: str
+    event_id: Optional[UUID]    # None: repeats an earlier item of the same batch
+
+
+def content_key(item: BaseModel) -> str:
+    """SHA-256 of the validated payload, without its (empty) idempotency key."""
+    payload = item.model_dump_json(exclude={"idempotency_key"})
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def assign_key(item: BaseModel) -> Optional[str]:
+    """Return ``item``'s idempotency key, deriving it from the content when the client sent none."""
+    if DEDUP_ENABLED and DEDUP_CONTENT_HASH and item.idempotency_key is None:
+        item.idempotency_key = content_key(item)
+    return item.idempotency_key
+
+
+def cached_original(model, key: Optional[str]) -> Optional[UUID]:
+    if not DEDUP_ENABLED or key is None:
+        return None
+    return seen_events.get((model.__tablename__, key))
+
+
+def remember(model, keys: Sequence[Optional[str]], event_ids: Sequence[UUID]) -> None:
+    """Record written events so their retries are recognised without a query."""
+    if DEDUP_ENABLED:
+        table = model.__tablename__
+        seen_events.add_many(
+            ((table, key), event_id) for key, event_id in zip(keys, event_ids) if key is not None
+        )
+
+
+def forget(model, keys: Sequence[Optional[str]], event_ids: Sequence[UUID]) -> None:
+    """Undo ``remember`` for events that were never written (e.g. a failed buffered flush)."""
+    if DEDUP_ENABLED:
+        table = model.__tablename__
+        seen_events.discard_many(
+            ((table, key), event_id) for key, event_id in zip(keys, event_ids) if key is not None
+        )
+
+
+def _known_keys(model, accepted: Accepted) -> Tuple[Dict[str, UUID], List[str]]:
+    """Keys answered by the cache, and the ones that still need a lookup."""
+    known: Dict[str, UUID] = {}
+    misses: Dict[str, None] = {}
+    for _, item in accepted:
+        key = assign_key(item)
+        if key is None or key in known:
+            continue
+        event_id = cached_original(model, key)
+        if event_id is None:
+            misses[key] = None
+        else:
+            known[key] = event_id
+    return known, list(misses)
+
+
+def _lookup(model, keys: List[str]):
+    return select(model.idempotency_key, model.event_id).where(model.idempotency_key.in_(keys))
+
+
+def _split_duplicates(accepted: Accepted, known: Dict[str, UUID]) -> Tuple[Accepted, List[Duplicate]]:
+    kept: Accepted = []
+    duplicates: List[Duplicate] = []
+    batch_keys = set()
+    for index, item in accepted:
+        key = item.idempotency_key
+        if key is None:
+            kept.append((index, item))
+        elif key in known:
+            duplicates.append(Duplicate(index, key, known[key]))
+        elif key in batch_keys:
+            duplicates.append(Duplicate(index, key, None))
+        else:
+            batch_keys.add(key)
+            kept.append((index, item))
+    return kept, duplicates
+
+
+def drop_duplicates(
+    db: Session, model, accepted: Accepted, always: bool = False
+) -> Tuple[Accepted, List[Duplicate]]:
+    """
+    Split off items that were already written (per the cache, then one
+    ``IN`` lookup for the rest) or that repeat an earlier item of the batch.
+    Kept items have their idempotency key filled in.
+
+    ``always`` checks client keys even with ``DEDUP_ENABLED`` off, for
+    writers that must not hit the unique index (the bulk loader).
+    """
+    if not (DEDUP_ENABLED or always):
+        return accepted, []
+    known, misses = _known_keys(model, accepted)
+    if misses:
+        found = dict(db.execute(_lookup(model, misses)).all())
+        remember(model, list(found), list(found.values()))
+        known.update(found)
+    return _split_duplicates(accepted, known)
+
+
+async def drop_duplicates_async(
+    db: AsyncSession, model, accepted: Accepted
+) -> Tuple[Accepted, List[Duplicate]]:
+    """Async counterpart of ``drop_duplicates``."""
+    if not DEDUP_ENABLED:
+        return accepted, []
+    known, misses = _known_keys(model, accepted)
+    if misses:
+        found = dict((await db.execute(_lookup(model, misses))).all())
+        remember(model, list(found), list(found.values()))
+        known.update(found)
+    return _split_duplicates(accepted, known)
+
+
+def find_original(db: Session, model, key: Optional[str]) -> Optional[UUID]:
+    """event_id of the stored event with idempotency key ``key``, if any."""
+    if not DEDUP_ENABLED or key is None:
+        return None
+    return db.scalar(select(model.event_id).where(model.idempotency_key == key))
+
+
+async def find_original_async(db: AsyncSession, model, key: Optional[str]) -> Optional[UUID]:
+    """Async counterpart of ``find_original``."""
+    if not DEDUP_ENABLED or key is None:
+        return None
+    return await db.scalar(select(model.event_id).where(model.idempotency_key == key))
@@ -0,0 +1,188 @@
+"""
+Event Enrichment
+
+Derives breakdown columns for ``user_behavior_events`` at write time, so
+breakdown queries group by a column instead of joining lookup tables:
+
+- ``device_type``: from the canonical ``platform`` (``ios`` -> ``mobile``,
+  ``ipad`` -> ``tablet``)
+- ``traffic_source``: the marketing channel of ``source``, by channel rules
+- ``page_type``: the page an ``event_type`` happens on
+- ``product_category``: from a ``product_id,category`` CSV
+
+Channel rules are ``pattern,channel`` CSV rows matched in order against the
+canonical source (``fnmatch`` patterns, so ``*google*`` works); the first
+match wins and unmatched sources map to ``other``. Without a rules file the
+built-in ``DEFAULT_CHANNEL_RULES`` apply.
+
+Both files are loaded into memory and re-read when their modification time
+changes, checked at most every ``ENRICHMENT_RELOAD_CHECK_S`` on the ingest
+path (one ``stat``, no background thread). A file that fails to load is
+logged and the previous version stays in use. Channel lookups are memoized
+per loaded rule set, so a source costs one pattern scan per reload.
+"""
+import csv
+import fnmatch
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+from app.core.config import (
+    ENRICHMENT_CATEGORY_FILE,
+    ENRICHMENT_CHANNEL_RULES_FILE,
+    ENRICHMENT_ENABLED,
+    ENRICHMENT_RELOAD_CHECK_S,
+)
+from app.db.models.user_behavior_events import UserBehaviorEvent
+
+logger = logging.getLogger(__name__)
+
+DEVICE_TYPES: Dict[str, str] = {
+    "ios": "mobile",
+    "android": "mobile",
+    "mobile": "mobile",
+    "web": "desktop",
+    "ipad": "tablet",
+    "tablet": "tablet",
+}
+
+PAGE_TYPES: Dict[str, str] = {
+    "product_viewed": "product",
+    "product_searched": "search",
+}
+
+DEFAULT_CHANNEL_RULES: List[Tuple[str, str]] = [
+    ("direct", "direct"),
+    ("ads", "paid"),
+    ("*_ads", "paid"),
+    ("email", "email"),
+    ("search", "organic_search"),
+    ("*google*", "organic_search"),
+    ("*bing*", "organic_search"),
+    ("social", "social"),
+    ("facebook", "social"),
+    ("instagram", "social"),
+    ("tiktok", "social"),
+    ("twitter", "social"),
+    ("youtube", "social"),
+    ("referral", "referral"),
+    ("affiliate*", "referral"),
+]
+
+# Channel of unmatched sources, device type of unknown platforms
+OTHER = "other"
+
+T = TypeVar("T")
+
+
+class LookupFile(Generic[T]):
+    """
+    A file parsed into memory and re-parsed when its mtime changes. The mtime
+    is checked at most every ``check_interval`` seconds, when ``get`` is called.
+    """
+
+    def __init__(self, path: str, parse: Callable[[str], T], default: T, check_interval: float):
+        self.path = path
+        self.parse = parse
+        self.check_interval = check_interval
+        self._value = default
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        if self.path and time.monotonic() >= self._next_check:
+            self._check()
+        return self._value
+
+    def _check(self) -> None:
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is reloading; use the current version
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            mtime = os.stat(self.path).st_mtime
+            if mtime != self._mtime:
+                self._value = self.parse(self.path)
+                self._mtime = mtime
+                logger.info("Loaded lookup file %s", self.path)
+        except Exception:
+            logger.exception("Could not load lookup file %s; keeping the previous version", self.path)
+        finally:
+            self._lock.release()
+
+
+def _csv_pairs(path: str, header: str) -> List[Tuple[str, str]]:
+    """Rows of a two-column CSV, skipping blank and ``#`` lines and an optional header row."""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = [
+            (row[0].strip(), row[1].strip())
+            for row in csv.reader(f)
+            if len(row) >= 2 and not row[0].startswith("#")
+        ]
+    if rows and rows[0][0] == header:
+        rows = rows[1:]
+    return rows
+
+
+def load_categories(path: str) -> Dict[int, str]:
+    """``product_id,category`` rows."""
+    return {int(product_id): category for product_id, category in _csv_pairs(path, "product_id")}
+
+
+class ChannelRules:
+    """Ordered ``(pattern, channel)`` rules with memoized lookups."""
+
+    def __init__(self, rules: Sequence[Tuple[str, str]]):
+        self.exact: Dict[str, str] = {}
+        self.patterns: List[Tuple[str, str]] = []
+        for pattern, channel in rules:
+            if any(char in pattern for char in "*?["):
+                self.patterns.append((pattern, channel))
+            else:
+                self.exact.setdefault(pattern, channel)
+        self.channel = lru_cache(maxsize=4096)(self._match)
+
+    def _match(self, source: str) -> str:
+        channel = self.exact.get(source)
+        if channel is not None:
+            return channel
+        for pattern, channel in self.patterns:
+            if fnmatch.fnmatchcase(source, pattern):
+                return channel
+        return OTHER
+
+
+def load_channel_rules(path: str) -> ChannelRules:
+    """``pattern,channel`` rows, in match order."""
+    return ChannelRules(_csv_pairs(path, "pattern"))
+
+
+categories = LookupFile(ENRICHMENT_CATEGORY_FILE, load_categories, {}, ENRICHMENT_RELOAD_CHECK_S)
+channel_rules = LookupFile(
+    ENRICHMENT_CHANNEL_RULES_FILE,
+    load_channel_rules,
+    ChannelRules(DEFAULT_CHANNEL_RULES),
+    ENRICHMENT_RELOAD_CHECK_S,
+)
+
+
+def _enum_value(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+
+def enrich_rows(model, rows: Sequence[Dict[str, Any]]) -> None:
+    """Set the derived columns on ``rows`` (dicts about to be inserted)."""
+    if not ENRICHMENT_ENABLED or model is not UserBehaviorEvent or not rows:
+        return
+    category_of = categories.get()
+    channel_of = channel_rules.get().channel
+    for row in rows:
+        platform = row.get("platform")
+        source = row.get("source")
+        row["device_type"] = DEVICE_TYPES.get(platform, OTHER) if platform else None
+        row["traffic_source"] = channel_of(source) if source else None
+        row["page_type"] = PAGE_TYPES.get(_enum_value(row.get("event_type")))
+        row["product_category"] = category_of.get(row.get("product_id"))
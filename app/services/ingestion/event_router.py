@@ -0,0 +1,92 @@
+"""
+Event Type Registry
+
+Maps each ingestible event type to its Pydantic ``*Create`` schema, its
+``*Query`` read filters and its SQLAlchemy model. Built once at import time,
+so routing an event to its table is a dict lookup.
+
+Also defines the typed envelope accepted by the generic ``POST /events``
+endpoints, ``{"type": "<slug>", "data": {...}}``, and ``group_envelopes``,
+which splits a mixed batch of envelopes per event type.
+"""
+from typing import Annotated, Any, Dict, List, Literal, NamedTuple, Sequence, Tuple, Type, Union
+
+from pydantic import BaseModel, Field, create_model
+
+from app.schemas.events.base import EventQuery
+from app.schemas.events.user_events import UserBehaviorCreate, UserBehaviorQuery
+from app.schemas.events.cart_events import CartCreate, CartQuery
+from app.schemas.events.order_events import OrderCreate, OrderQuery
+from app.schemas.events.order_base import OrderItemCreate, OrderItemQuery
+from app.schemas.events.payment_events import PaymentCreate, PaymentQuery
+from app.schemas.events.logistic_events import LogisticsCreate, LogisticsQuery
+
+from app.db.models.user_behavior_events import UserBehaviorEvent
+from app.db.models.cart_events import CartEvent
+from app.db.models.order_events import OrderEvent
+from app.db.models.order_item_events import OrderItemEvent
+from app.db.models.payment_events import PaymentEvent
+from app.db.models.logistics_events import LogisticsEvent
+
+from app.services.ingestion.validators import Rejected
+
+
+class EventType(NamedTuple):
+    name: str                   # URL slug, e.g. "user-behavior"
+    schema: Type[BaseModel]
+    model: type
+    query: Type[EventQuery]
+
+
+EVENT_TYPES: Dict[str, EventType] = {
+    event_type.name: event_type
+    for event_type in (
+        EventType("user-behavior", UserBehaviorCreate, UserBehaviorEvent, UserBehaviorQuery),
+        EventType("cart", CartCreate, CartEvent, CartQuery),
+        EventType("order", OrderCreate, OrderEvent, OrderQuery),
+        EventType("order-item", OrderItemCreate, OrderItemEvent, OrderItemQuery),
+        EventType("payment", PaymentCreate, PaymentEvent, PaymentQuery),
+        EventType("logistics", LogisticsCreate, LogisticsEvent, LogisticsQuery),
+    )
+}
+
+
+def _envelope_model(event_type: EventType) -> Type[BaseModel]:
+    return create_model(
+        f"{event_type.schema.__name__}Envelope",
+        type=(Literal[event_type.name], ...),
+        data=(event_type.schema, ...),
+    )
+
+
+# One envelope model per type, discriminated by "type"
+EventEnvelope = Annotated[
+    Union[tuple(_envelope_model(event_type) for event_type in EVENT_TYPES.values())],
+    Field(discriminator="type"),
+]
+
+# event type name -> (positions in the batch, "data" payloads)
+EnvelopeGroups = Dict[str, Tuple[List[int], List[Any]]]
+
+
+def group_envelopes(envelopes: Sequence[Dict[str, Any]]) -> Tuple[EnvelopeGroups, Rejected]:
+    """
+    Split a mixed batch of envelopes per event type, keeping each item's
+    position. Items naming an unknown type are rejected here; the ``data``
+    payloads are validated by the caller.
+    """
+    groups: EnvelopeGroups = {}
+    rejected: Rejected = []
+    for index, envelope in enumerate(envelopes):
+        name = envelope.get("type")
+        if not isinstance(name, str) or name not in EVENT_TYPES:
+            rejected.append((index, [{
+                "type": "union_tag_invalid",
+                "loc": ["type"],
+                "msg": f"type should be one of: {', '.join(EVENT_TYPES)}",
+            }]))
+            continue
+        positions, payloads = groups.setdefault(name, ([], []))
+        positions.append(index)
+        payloads.append(envelope.get("data"))
+    return groups, rejected
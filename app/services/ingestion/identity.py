@@ -0,0 +1,317 @@
+"""
+Identity Resolution
+
+Assigns every behavior and cart event an ``actor_id``:
+
+- ``user:<user_id>`` when the event carries a ``user_id``;
+- otherwise the actor its anonymous id (the client's ``session_id``, or
+  ``correlation_id`` for cart events) has been linked to, if any;
+- otherwise ``anon:<anonymous id>``.
+
+An event with both a ``user_id`` and an anonymous id (a login) links that
+anonymous id to the user. Later guest events of the session then resolve to
+the user, and earlier ones are stitched: the write-behind flush
+(``flush_identity_links``) persists the link to ``identity_links`` and
+rewrites ``actor_id`` on the session's rows that are still anonymous, using
+the ``actor_id`` index. Rows already attributed to a user are never moved, so
+a device shared by two users keeps each user's events.
+
+``identity_map`` is an in-memory LRU of ``anonymous id -> actor``, holding
+negative results too, so a guest session costs at most one lookup in
+``identity_links`` (one ``IN`` query per request) until it is evicted.
+
+Each worker keeps its own map. When one worker links a session, another
+worker may still hold a "not linked" entry for it and write more ``anon:``
+rows. Negative entries therefore expire after ``IDENTITY_NEGATIVE_TTL_S``.
+Each flushed link is also stitched a second time once every such entry has
+expired (``IDENTITY_NEGATIVE_TTL_S + IDENTITY_FLUSH_INTERVAL_S`` later),
+which picks up the rows those workers wrote in the meantime.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    IDENTITY_CACHE_SIZE,
+    IDENTITY_CACHE_TTL_S,
+    IDENTITY_FLUSH_INTERVAL_S,
+    IDENTITY_NEGATIVE_TTL_S,
+    IDENTITY_RESOLUTION_ENABLED,
+)
+from app.db.functions import dialect_insert
+from app.db.models.cart_events import CartEvent
+from app.db.models.identity import IdentityLink
+from app.db.models.user_behavior_events import UserBehaviorEvent
+
+# Models with an actor_id -> field holding the client's anonymous id
+IDENTITY_SOURCES = {
+    UserBehaviorEvent: "session_id",
+    CartEvent: "correlation_id",
+}
+
+
+def user_actor(user_id: Any) -> str:
+    return f"user:{user_id}"
+
+
+def anonymous_actor(anonymous_id: str) -> str:
+    return f"anon:{anonymous_id}"
+
+
+def default_actor(row: Dict[str, Any], anonymous_field: str) -> str:
+    """Actor of a row without looking at links: its user, else its anonymous id."""
+    user_id = row.get("user_id")
+    if user_id is not None:
+        return user_actor(user_id)
+    return anonymous_actor(row[anonymous_field])
+
+
+class IdentityMap:
+    """
+    Thread-safe LRU of ``anonymous id -> actor`` (``None``: known to be
+    unlinked). Entries expire ``ttl`` seconds after being added, unlinked
+    ones after ``negative_ttl``. Links not flushed yet are kept apart so
+    eviction does not lose them, and flushed links wait apart for their
+    second stitch.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, max_size: int, ttl: float, negative_ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+        self._pending: Dict[str, str] = {}
+        self._restitch: Dict[str, Tuple[float, str]] = {}   # anonymous id -> (due, actor)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, anonymous_id: str, now: float):
+        pending = self._pending.get(anonymous_id)
+        if pending is not None:
+            return pending
+        entry = self._entries.get(anonymous_id)
+        if entry is None:
+            return self._MISSING
+        expires_at, actor = entry
+        if expires_at <= now:
+            del self._entries[anonymous_id]
+            return self._MISSING
+        self._entries.move_to_end(anonymous_id)
+        return actor
+
+    def _put(self, anonymous_id: str, actor: Optional[str], now: float) -> None:
+        ttl = self.ttl if actor is not None else self.negative_ttl
+        self._entries[anonymous_id] = (now + ttl, actor)
+        self._entries.move_to_end(anonymous_id)
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def lookup(self, anonymous_ids: Iterable[str]) -> Tuple[Dict[str, Optional[str]], List[str]]:
+        """Known actors (``None``: unlinked) and the ids that still need a lookup."""
+        known: Dict[str, Optional[str]] = {}
+        misses: List[str] = []
+        now = time.monotonic()
+        with self._lock:
+            for anonymous_id in set(anonymous_ids):
+                actor = self._get(anonymous_id, now)
+                if actor is self._MISSING:
+                    misses.append(anonymous_id)
+                else:
+                    known[anonymous_id] = actor
+        return known, misses
+
+    def load(self, anonymous_ids: Iterable[str], links: Dict[str, str]) -> None:
+        """Cache looked-up ids, unlinked ones included, unless linked meanwhile."""
+        now = time.monotonic()
+        with self._lock:
+            for anonymous_id in anonymous_ids:
+                if anonymous_id not in self._pending:
+                    self._put(anonymous_id, links.get(anonymous_id), now)
+            self._evict()
+
+    def link(self, links: Dict[str, str]) -> None:
+        """Record ``anonymous id -> user actor`` links seen on ingest."""
+        now = time.monotonic()
+        with self._lock:
+            for anonymous_id, actor in links.items():
+                current = self._get(anonymous_id, now)
+                if current != actor:
+                    self._pending[anonymous_id] = actor
+                self._put(anonymous_id, actor, now)
+            self._evict()
+
+    def take_pending(self) -> Dict[str, str]:
+        with self._lock:
+            taken, self._pending = self._pending, {}
+        return taken
+
+    def restore_pending(self, taken: Dict[str, str]) -> None:
+        """Put back links whose flush failed, unless they changed again meanwhile."""
+        with self._lock:
+            for anonymous_id, actor in taken.items():
+                self._pending.setdefault(anonymous_id, actor)
+
+    def schedule_restitch(self, links: Dict[str, str], delay: float) -> None:
+        """Stitch flushed ``links`` once more ``delay`` seconds from now."""
+        due = time.monotonic() + delay
+        with self._lock:
+            for anonymous_id, actor in links.items():
+                self._restitch[anonymous_id] = (due, actor)
+
+    def take_restitch(self) -> Dict[str, str]:
+        """Links whose second stitch is due."""
+        now = time.monotonic()
+        with self._lock:
+            due = {
+                anonymous_id: actor
+                for anonymous_id, (due_at, actor) in self._restitch.items()
+                if due_at <= now
+            }
+            for anonymous_id in due:
+                del self._restitch[anonymous_id]
+        return due
+
+    def restore_restitch(self, taken: Dict[str, str]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for anonymous_id, actor in taken.items():
+                self._restitch.setdefault(anonymous_id, (now, actor))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            self._restitch.clear()
+
+
+identity_map = IdentityMap(IDENTITY_CACHE_SIZE, IDENTITY_CACHE_TTL_S, IDENTITY_NEGATIVE_TTL_S)
+
+
+def _record_links(model, rows: Sequence[Dict[str, Any]]) -> Optional[Tuple[str, List[str]]]:
+    """
+    Link the anonymous ids of signed-in rows to their users. Returns the
+    anonymous field and the guest ids to resolve, or None when ``model`` is
+    not resolved.
+    """
+    if not IDENTITY_RESOLUTION_ENABLED or not rows:
+        return None
+    anonymous_field = IDENTITY_SOURCES.get(model)
+    if anonymous_field is None:
+        return None
+    links: Dict[str, str] = {}
+    guests: List[str] = []
+    for row in rows:
+        anonymous_id = row.get(anonymous_field)
+        if row.get("user_id") is not None:
+            if anonymous_id is not None:
+                links[anonymous_id] = user_actor(row["user_id"])
+        elif anonymous_id is not None:
+            guests.append(anonymous_id)
+    if links:
+        identity_map.link(links)
+    return anonymous_field, guests
+
+
+def _lookup(anonymous_ids: List[str]):
+    return select(IdentityLink.anonymous_id, IdentityLink.actor_id).where(
+        IdentityLink.anonymous_id.in_(anonymous_ids)
+    )
+
+
+def _apply(rows: Sequence[Dict[str, Any]], anonymous_field: str, known: Dict[str, Optional[str]]) -> None:
+    for row in rows:
+        actor = None
+        if row.get("user_id") is None:
+            actor = known.get(row.get(anonymous_field))
+        row["actor_id"] = actor or default_actor(row, anonymous_field)
+
+
+def resolve_actors(db: Session, model, rows: Sequence[Dict[str, Any]]) -> None:
+    """
+    Set ``actor_id`` on ``rows`` (dicts about to be inserted). Guest ids not
+    in memory are looked up in ``identity_links`` with one query.
+    """
+    resolved = _record_links(model, rows)
+    if resolved is None:
+        return
+    anonymous_field, guests = resolved
+    known, misses = identity_map.lookup(guests)
+    if misses:
+        links = dict(db.execute(_lookup(misses)).all())
+        identity_map.load(misses, links)
+        known.update((anonymous_id, links.get(anonymous_id)) for anonymous_id in misses)
+    _apply(rows, anonymous_field, known)
+
+
+async def resolve_actors_async(db: AsyncSession, model, rows: Sequence[Dict[str, Any]]) -> None:
+    """Async counterpart of ``resolve_actors``."""
+    resolved = _record_links(model, rows)
+    if resolved is None:
+        return
+    anonymous_field, guests = resolved
+    known, misses = identity_map.lookup(guests)
+    if misses:
+        links = dict((await db.execute(_lookup(misses))).all())
+        identity_map.load(misses, links)
+        known.update((anonymous_id, links.get(anonymous_id)) for anonymous_id in misses)
+    _apply(rows, anonymous_field, known)
+
+
+def flush_identity_links(db: Session) -> int:
+    """
+    Persist links recorded since the last flush and stitch the linked
+    sessions' anonymous rows to their users, in one transaction, together
+    with the second stitch of links flushed earlier. On failure everything
+    is put back for the next flush. Returns the number of links persisted.
+    """
+    taken = identity_map.take_pending()
+    restitch = identity_map.take_restitch()
+    if not taken and not restitch:
+        return 0
+
+    table = IdentityLink.__table__
+    upsert = dialect_insert(db)(table)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=["anonymous_id"],
+        set_={"actor_id": upsert.excluded.actor_id, "linked_at": func.now()},
+    )
+    links = [
+        {"anonymous_id": anonymous_id, "actor_id": actor}
+        for anonymous_id, actor in sorted(taken.items())
+    ]
+    stitches = [
+        {"b_anonymous_actor": anonymous_actor(anonymous_id), "b_anonymous_id": anonymous_id, "b_actor": actor}
+        for anonymous_id, actor in sorted({**restitch, **taken}.items())
+    ]
+    try:
+        if links:
+            db.execute(upsert, links)
+        for model, anonymous_field in IDENTITY_SOURCES.items():
+            stmt = (
+                update(model.__table__)
+                .where(
+                    model.__table__.c.actor_id == bindparam("b_anonymous_actor"),
+                    model.__table__.c[anonymous_field] == bindparam("b_anonymous_id"),
+                )
+                .values(actor_id=bindparam("b_actor"))
+            )
+            db.execute(stmt, stitches)
+        db.commit()
+    except Exception:
+        db.rollback()
+        identity_map.restore_pending(taken)
+        identity_map.restore_restitch(restitch)
+        raise
+    identity_map.schedule_restitch(taken, IDENTITY_NEGATIVE_TTL_S + IDENTITY_FLUSH_INTERVAL_S)
+    return len(links)
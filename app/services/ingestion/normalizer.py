@@ -0,0 +1,227 @@
+"""
+Payload Normalization
+
+Canonicalizes raw event payloads before validation, so producers with
+inconsistent field names and casing are accepted:
+
+- keys:  ``productId``, ``ProductID``, ``product-id`` -> ``product_id``, plus a
+  few synonyms (``timestamp`` -> ``event_time``, ``InvoiceNo`` -> ``order_id``)
+- enum values (``event_type``, order/logistics ``status``):
+  ``Product Viewed``, ``productViewed`` -> ``product_viewed``
+- ``country``: ISO 3166 alpha-2, upper case (``uk``, ``United Kingdom`` -> ``GB``)
+- ``source`` / ``platform``: lower-case tokens with common synonyms folded
+
+It runs as a ``mode="before"`` validator on ``EventCreate``, so single
+events, batches, the async router and the bulk loader all share it.
+
+The hot loop does only dict lookups. Each schema gets a ``Normalizer``
+whose key map is precompiled from its fields. The first time an unknown raw
+key is seen, the regex work is done once and the result is cached. Value
+canonicalizers are ``lru_cache``-memoized, so a repeated value (the normal
+case for countries and event names) costs one cache hit.
+"""
+import re
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type, get_args
+
+from pydantic import BaseModel
+
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_SEPARATORS = re.compile(r"[^0-9a-zA-Z]+")
+
+# Canonical key -> field, applied only when the schema has that field
+FIELD_ALIASES: Dict[str, str] = {
+    "timestamp": "event_time",
+    "time": "event_time",
+    "event_timestamp": "event_time",
+    "occurred_at": "event_time",
+    "invoice_date": "event_time",
+    "event": "event_type",
+    "event_name": "event_type",
+    "customer_id": "user_id",
+    "session": "session_id",
+    "invoice_no": "order_id",
+    "invoice": "order_id",
+    "stock_code": "product_id",
+    "sku": "product_id",
+    "country_code": "country",
+    "utm_source": "source",
+    "device_platform": "platform",
+}
+
+COUNTRY_ALIASES: Dict[str, str] = {
+    "UK": "GB",
+    "UNITED KINGDOM": "GB",
+    "GREAT BRITAIN": "GB",
+    "ENGLAND": "GB",
+    "USA": "US",
+    "UNITED STATES": "US",
+    "UNITED STATES OF AMERICA": "US",
+    "INDIA": "IN",
+    "IND": "IN",
+    "GERMANY": "DE",
+    "DEU": "DE",
+    "FRANCE": "FR",
+    "FRA": "FR",
+    "BRAZIL": "BR",
+    "BRA": "BR",
+    "SINGAPORE": "SG",
+    "SGP": "SG",
+    "EIRE": "IE",
+    "IRELAND": "IE",
+    "NETHERLANDS": "NL",
+    "SPAIN": "ES",
+    "AUSTRALIA": "AU",
+    "CANADA": "CA",
+    "JAPAN": "JP",
+}
+
+PLATFORM_ALIASES: Dict[str, str] = {
+    "iphone": "ios",
+    # "ipad" stays distinct so enrichment can tell tablets from phones
+    "ios_app": "ios",
+    "android_app": "android",
+    "desktop": "web",
+    "desktop_web": "web",
+    "mobile_web": "web",
+    "browser": "web",
+}
+
+SOURCE_ALIASES: Dict[str, str] = {
+    "e_mail": "email",
+    "newsletter": "email",
+    "ad": "ads",
+    "paid": "ads",
+    "cpc": "ads",
+    "organic_search": "search",
+    "seo": "search",
+    "none": "direct",
+}
+
+# Raw keys remembered per schema beyond its precompiled ones; bounds memory
+# when producers send arbitrary keys.
+MAX_LEARNED_KEYS = 1024
+
+_UNSEEN = object()
+
+
+@lru_cache(maxsize=4096)
+def canonical_token(value: str) -> str:
+    """``Product Viewed`` / ``productViewed`` / ``PRODUCT-VIEWED`` -> ``product_viewed``."""
+    value = _CAMEL_BOUNDARY.sub("_", value.strip())
+    return _SEPARATORS.sub("_", value).strip("_").lower()
+
+
+@lru_cache(maxsize=1024)
+def canonical_country(value: str) -> str:
+    code = " ".join(value.split()).upper()
+    return COUNTRY_ALIASES.get(code, code)
+
+
+def _label(value: str) -> str:
+    # Like canonical_token, but brand casing is not a word boundary ("iPhone", "YouTube")
+    return _SEPARATORS.sub("_", value.strip().lower()).strip("_")
+
+
+@lru_cache(maxsize=1024)
+def canonical_platform(value: str) -> str:
+    token = _label(value)
+    return PLATFORM_ALIASES.get(token, token)
+
+
+@lru_cache(maxsize=1024)
+def canonical_source(value: str) -> str:
+    token = _label(value)
+    return SOURCE_ALIASES.get(token, token)
+
+
+# Field name -> value canonicalizer, on top of the ones derived from enum fields
+VALUE_CANONICALIZERS: Dict[str, Callable[[str], str]] = {
+    "country": canonical_country,
+    "platform": canonical_platform,
+    "source": canonical_source,
+}
+
+
+def _is_enum(annotation: Any) -> bool:
+    candidates = get_args(annotation) or (annotation,)
+    return any(isinstance(c, type) and issubclass(c, Enum) for c in candidates)
+
+
+def _key_variants(field: str) -> List[str]:
+    parts = field.split("_")
+    camel = parts[0] + "".join(part.title() for part in parts[1:])
+    return [field, camel, camel[:1].upper() + camel[1:], field.upper(), "-".join(parts)]
+
+
+class Normalizer:
+    """Key map and value canonicalizers precompiled for one ``*Create`` schema."""
+
+    def __init__(self, fields: Sequence[str], canonicalizers: Dict[str, Callable[[str], str]]):
+        self.fields = frozenset(fields)
+        self.canonicalizers = canonicalizers
+        self.key_map: Dict[str, Optional[str]] = {}
+        for field in fields:
+            for variant in _key_variants(field):
+                self.key_map[variant] = field
+        for alias, field in FIELD_ALIASES.items():
+            if field in self.fields and alias not in self.fields:
+                self.key_map.setdefault(alias, field)
+        self._precompiled = len(self.key_map)
+
+    @classmethod
+    def for_schema(cls, schema: Type[BaseModel]) -> "Normalizer":
+        canonicalizers: Dict[str, Callable[[str], str]] = {}
+        for name, field in schema.model_fields.items():
+            if name in VALUE_CANONICALIZERS:
+                canonicalizers[name] = VALUE_CANONICALIZERS[name]
+            elif _is_enum(field.annotation):
+                canonicalizers[name] = canonical_token
+        return cls(list(schema.model_fields), canonicalizers)
+
+    def _resolve(self, raw: str) -> Optional[str]:
+        """Field for a raw key not in the key map yet (None: not a field)."""
+        key = canonical_token(raw)
+        field = key if key in self.fields else FIELD_ALIASES.get(key)
+        if field not in self.fields:
+            field = None
+        if len(self.key_map) - self._precompiled < MAX_LEARNED_KEYS:
+            self.key_map[raw] = field
+        return field
+
+    def __call__(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        key_map = self.key_map
+        canonicalizers = self.canonicalizers
+        normalized: Dict[str, Any] = {}
+        for raw, value in payload.items():
+            field = key_map.get(raw, _UNSEEN)
+            if field is _UNSEEN:
+                field = self._resolve(raw)
+            if field is None:
+                normalized[raw] = value  # unknown key: left for the schema to ignore
+                continue
+            if field in normalized and raw != field:
+                continue  # the exactly named key wins over a variant
+            canonicalize = canonicalizers.get(field)
+            if canonicalize is not None and isinstance(value, str):
+                value = canonicalize(value)
+            normalized[field] = value
+        return normalized
+
+
+_normalizers: Dict[Type[BaseModel], Normalizer] = {}
+
+
+def get_normalizer(schema: Type[BaseModel]) -> Normalizer:
+    normalizer = _normalizers.get(schema)
+    if normalizer is None:
+        normalizer = _normalizers[schema] = Normalizer.for_schema(schema)
+    return normalizer
+
+
+def normalize_payload(schema: Type[BaseModel], payload: Any) -> Any:
+    """Canonicalize one raw payload for ``schema``; non-dict input is returned unchanged."""
+    if not isinstance(payload, dict):
+        return payload
+    return get_normalizer(schema)(payload)
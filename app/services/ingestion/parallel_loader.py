@@ -0,0 +1,279 @@
+"""
+Parallel Bulk Loading
+
+Spreads a backfill over several processes. Parsing JSON and validating with
+Pydantic is CPU-bound, so threads would only contend for the GIL.
+
+Every input file is planned into chunks. Uncompressed files are split into
+byte ranges of about ``chunk_bytes``, each extended to the next newline so no
+record is cut in half. A gzip stream cannot be entered mid-file, so each
+``.gz`` file is one chunk. CSV chunks carry the file's header, and ranges
+assume one record per line (no quoted newlines).
+
+Chunks run on a ``ProcessPoolExecutor``. Each worker has its own engine and
+connection, loads its chunk with ``BulkLoader`` in a single transaction, and
+commits once at the end. That makes a chunk all-or-nothing. With a checkpoint
+file, completed chunks are recorded as they finish and skipped on the next
+run, so a crashed backfill resumes without duplicating rows. Chunk keys are
+byte ranges, so the checkpoint also records ``chunk_bytes`` and refuses to
+resume with a different one.
+
+Every row of a chunk carries the chunk transaction's start as
+``ingested_at``, possibly minutes before it commits, so the incremental
+aggregator may already be past it. Callers run ``refresh_aggregates`` on the
+returned stats once the load is done.
+
+Each worker persists the identity links of its chunk after committing it.
+Worker processes do not share their identity maps. A guest row in one chunk
+is therefore stitched to a login in another chunk only if it was committed
+before that other chunk's links were persisted.
+"""
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import BULK_LOAD_BATCH_SIZE, BULK_LOAD_CHUNK_MB, BULK_LOAD_WORKERS
+from app.db.session import engine_options
+from app.services.ingestion.identity import flush_identity_links
+from app.services.ingestion.bulk_loader import (
+    BulkLoader,
+    LoadStats,
+    detect_format,
+    iter_csv,
+    iter_file,
+    iter_ndjson,
+)
+
+logger = logging.getLogger(__name__)
+
+_BLOCK_SIZE = 1 << 20
+
+
+class Chunk(NamedTuple):
+    path: str
+    format: str
+    start: int
+    end: Optional[int]              # None: read to the end (gzip files)
+    first_line: int                 # line number of the first line at ``start``
+    header: Optional[Tuple[str, ...]] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.path}:{self.start}:{self.end}"
+
+
+# (line, type, errors) for rejected records
+ChunkReject = Tuple[int, Optional[str], List[Dict[str, Any]]]
+RejectCallback = Callable[[str, int, Optional[str], List[Dict[str, Any]]], None]
+
+
+# --------------------------------------------------------------------------- #
+# Planning
+# --------------------------------------------------------------------------- #
+def _count_newlines(handle, start: int, end: int) -> int:
+    handle.seek(start)
+    remaining, count = end - start, 0
+    while remaining > 0:
+        block = handle.read(min(_BLOCK_SIZE, remaining))
+        if not block:
+            break
+        count += block.count(b"\n")
+        remaining -= len(block)
+    return count
+
+
+def plan_chunks(
+    path: str,
+    fmt: Optional[str] = None,
+    chunk_bytes: int = BULK_LOAD_CHUNK_MB << 20,
+) -> List[Chunk]:
+    """Split ``path`` into line-aligned byte ranges of roughly ``chunk_bytes``."""
+    path = os.path.abspath(path)
+    fmt = fmt or detect_format(path)
+    if path.endswith(".gz"):
+        return [Chunk(path, fmt, 0, None, 1)]
+
+    size = os.path.getsize(path)
+    chunks: List[Chunk] = []
+    with open(path, "rb") as handle:
+        offset, line = 0, 1
+        header = None
+        if fmt == "csv":
+            first = handle.readline()
+            header = tuple(next(csv.reader([first.decode("utf-8")]), ()))
+            offset, line = len(first), 2
+
+        while offset < size:
+            boundary = offset + chunk_bytes
+            if boundary >= size:
+                boundary = size
+            else:
+                handle.seek(boundary)
+                handle.readline()  # finish the line the boundary landed in
+                boundary = handle.tell()
+            chunks.append(Chunk(path, fmt, offset, boundary, line, header))
+            line += _count_newlines(handle, offset, boundary)
+            offset = boundary
+    return chunks
+
+
+def iter_chunk(chunk: Chunk) -> Iterator[Tuple[int, Any]]:
+    """``(line, record)`` pairs for the records inside ``chunk``."""
+    if chunk.end is None:
+        yield from iter_file(chunk.path, chunk.format)
+        return
+
+    def lines() -> Iterator[str]:
+        with open(chunk.path, "rb") as handle:
+            handle.seek(chunk.start)
+            position = chunk.start
+            while position < chunk.end:
+                raw = handle.readline()
+                if not raw:
+                    break
+                position += len(raw)
+                yield raw.decode("utf-8")
+
+    if chunk.format == "ndjson":
+        yield from iter_ndjson(lines(), chunk.first_line)
+    else:
+        yield from iter_csv(lines(), chunk.header, chunk.first_line)
+
+
+# --------------------------------------------------------------------------- #
+# Workers
+# --------------------------------------------------------------------------- #
+# One engine per database URL per process; never shared across a fork.
+_engines: Dict[str, Engine] = {}
+
+
+def _engine_for(database_url: str) -> Engine:
+    engine = _engines.get(database_url)
+    if engine is None:
+        engine = _engines[database_url] = create_engine(database_url, **engine_options(database_url))
+    return engine
+
+
+def load_chunk(
+    database_url: str,
+    chunk: Chunk,
+    default_type: Optional[str] = None,
+    batch_size: int = BULK_LOAD_BATCH_SIZE,
+) -> Tuple[Chunk, LoadStats, List[ChunkReject]]:
+    """Load one chunk in one transaction. Runs inside a worker process."""
+    rejects: List[ChunkReject] = []
+    with Session(bind=_engine_for(database_url)) as db:
+        loader = BulkLoader(
+            None, batch_size, default_type,
+            on_reject=lambda line, type_name, errors: rejects.append((line, type_name, errors)),
+            db=db,
+        )
+        stats = loader.load(iter_chunk(chunk))
+        db.commit()
+        flush_identity_links(db)
+    return chunk, stats, rejects
+
+
+# --------------------------------------------------------------------------- #
+# Checkpoints
+# --------------------------------------------------------------------------- #
+class Checkpoint:
+    """
+    Completed chunk keys, persisted as JSON after every chunk.
+
+    Raises ``ValueError`` when ``path`` holds completed chunks planned with
+    another ``chunk_bytes``: their byte ranges would not match the new plan,
+    and the overlapping records would be loaded twice.
+    """
+
+    def __init__(self, path: str, chunk_bytes: int):
+        self.path = path
+        self.chunk_bytes = chunk_bytes
+        self.completed: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                data = json.load(handle)
+            self.completed = data.get("completed", {})
+            planned = data.get("chunk_bytes")
+            if self.completed and planned != chunk_bytes:
+                raise ValueError(
+                    f"checkpoint {path} was written with chunks of {planned} bytes, not {chunk_bytes};"
+                    " resume with the same --chunk-mb or start a new checkpoint"
+                )
+
+    def done(self, chunk: Chunk) -> bool:
+        return chunk.key in self.completed
+
+    def mark(self, chunk: Chunk, stats: LoadStats) -> None:
+        self.completed[chunk.key] = {"loaded": stats.loaded, "rejected": stats.rejected}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as handle:
+            json.dump({"chunk_bytes": self.chunk_bytes, "completed": self.completed}, handle)
+        os.replace(tmp, self.path)  # atomic: a crash never leaves a torn checkpoint
+
+
+# --------------------------------------------------------------------------- #
+# Orchestration
+# --------------------------------------------------------------------------- #
+def load_parallel(
+    paths: Sequence[str],
+    database_url: str,
+    workers: int = BULK_LOAD_WORKERS,
+    fmt: Optional[str] = None,
+    default_type: Optional[str] = None,
+    batch_size: int = BULK_LOAD_BATCH_SIZE,
+    chunk_bytes: int = BULK_LOAD_CHUNK_MB << 20,
+    checkpoint_path: Optional[str] = None,
+    on_reject: Optional[RejectCallback] = None,
+) -> LoadStats:
+    """
+    Load ``paths`` chunk by chunk on ``workers`` processes (in-process when 1).
+
+    Failed chunks are not checkpointed. The first failure is re-raised once
+    every other chunk has finished, so their progress is recorded first.
+    """
+    started = time.perf_counter()
+    checkpoint = Checkpoint(checkpoint_path, chunk_bytes) if checkpoint_path else None
+    chunks = [chunk for path in paths for chunk in plan_chunks(path, fmt, chunk_bytes)]
+    pending = [chunk for chunk in chunks if checkpoint is None or not checkpoint.done(chunk)]
+    if len(pending) < len(chunks):
+        logger.info("Skipping %d checkpointed chunks", len(chunks) - len(pending))
+
+    total = LoadStats()
+
+    def finished(chunk: Chunk, stats: LoadStats, rejects: List[ChunkReject]) -> None:
+        total.merge(stats)
+        if on_reject is not None:
+            for line, type_name, errors in rejects:
+                on_reject(chunk.path, line, type_name, errors)
+        if checkpoint is not None:
+            checkpoint.mark(chunk, stats)
+
+    failure: Optional[BaseException] = None
+    if workers <= 1:
+        for chunk in pending:
+            finished(*load_chunk(database_url, chunk, default_type, batch_size))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(load_chunk, database_url, chunk, default_type, batch_size): chunk
+                for chunk in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    finished(*future.result())
+                except Exception as exc:
+                    logger.error("Chunk %s failed: %s", futures[future].key, exc)
+                    failure = failure or exc
+    total.elapsed_seconds = time.perf_counter() - started
+    if failure is not None:
+        raise failure
+    return total
@@ -0,0 +1,35 @@
+"""
+Row Preparation
+
+Stages that run on the row dicts about to be inserted, after validation and
+deduplication, so retried events never reach them:
+
+1. identity resolution (``identity.py``) sets ``actor_id``;
+2. session assignment (``sessionizer.py``) sets ``server_session_id`` per
+   resolved actor;
+3. enrichment (``enrichment.py``) sets the derived breakdown columns.
+
+Each stage is a no-op for models it does not apply to or when it is disabled.
+"""
+from typing import Any, Dict, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.services.ingestion.enrichment import enrich_rows
+from app.services.ingestion.identity import resolve_actors, resolve_actors_async
+from app.services.ingestion.sessionizer import assign_sessions, assign_sessions_async
+
+
+def prepare_rows(db: Session, model, rows: Sequence[Dict[str, Any]]) -> None:
+    """Fill the derived columns of ``rows`` in place."""
+    resolve_actors(db, model, rows)
+    assign_sessions(db, model, rows)
+    enrich_rows(model, rows)
+
+
+async def prepare_rows_async(db: AsyncSession, model, rows: Sequence[Dict[str, Any]]) -> None:
+    """Async counterpart of ``prepare_rows``."""
+    await resolve_actors_async(db, model, rows)
+    await assign_sessions_async(db, model, rows)
+    enrich_rows(model, rows)
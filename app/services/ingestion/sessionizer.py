@@ -0,0 +1,234 @@
+"""
+Session Assignment
+
+Groups each actor's events into server-side sessions: an event that comes
+more than ``SESSION_INACTIVITY_GAP_S`` (by event time) after the actor's
+previous event starts a new session. The session id is written to the
+event's ``server_session_id`` column, so funnels can be scoped to a session
+without rebuilding sessions at read time.
+
+Sessions are kept per actor: the event's ``actor_id`` when identity
+resolution (``ingestion/identity.py``) has run, else ``user:<user_id>`` for
+signed-in events and ``anon:<client session id>`` for guests.
+
+State lives in ``session_table``, an in-memory LRU of actor -> current
+session whose entries are evicted after ``SESSION_CACHE_TTL_S`` without
+events. Changed sessions are written behind to ``actor_sessions`` by a
+periodic flush (``flush_sessions``). That table is only read for actors that
+are not in memory (after a restart or an eviction), with one ``IN`` query
+per request, so assigning a session to an active actor costs no query.
+
+Limitations:
+
+- an event more than the gap *before* the actor's current session started
+  (a late arrival) gets a session of its own; closed sessions are not reopened;
+- sessions changed since the last flush are lost on a crash, so the next
+  event of such an actor starts a new session;
+- the table is per process: with several workers, an actor whose requests
+  alternate between workers can have a session split in two. Routing by
+  user or session id keeps an actor on one worker.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    SESSION_CACHE_SIZE,
+    SESSION_CACHE_TTL_S,
+    SESSION_INACTIVITY_GAP_S,
+    SESSIONIZATION_ENABLED,
+)
+from app.db.functions import as_utc, dialect_insert
+from app.db.models.sessions import ActorSession
+from app.services.ingestion.identity import IDENTITY_SOURCES, default_actor
+
+
+class SessionState(NamedTuple):
+    session_id: str
+    started_at: datetime
+    last_event_at: datetime
+
+
+def _new_session(event_time: datetime) -> SessionState:
+    return SessionState(str(uuid.uuid4()), event_time, event_time)
+
+
+class SessionTable:
+    """
+    Thread-safe LRU of ``actor -> SessionState``. Entries expire ``ttl``
+    seconds after the actor's last event; states changed since the last flush
+    are also kept in a dirty map, so eviction never loses an unwritten session.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, SessionState]]" = OrderedDict()
+        self._dirty: Dict[str, SessionState] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, actor: str, now: float) -> Optional[SessionState]:
+        entry = self._entries.get(actor)
+        if entry is not None:
+            expires_at, state = entry
+            if expires_at > now:
+                return state
+            del self._entries[actor]
+        return self._dirty.get(actor)
+
+    def _put(self, actor: str, state: SessionState, now: float) -> None:
+        self._entries[actor] = (now + self.ttl, state)
+        self._entries.move_to_end(actor)
+
+    def missing(self, actors: Iterable[str]) -> List[str]:
+        """Actors with no state in memory, i.e. the ones to look up."""
+        now = time.monotonic()
+        with self._lock:
+            return [actor for actor in set(actors) if self._get(actor, now) is None]
+
+    def load(self, states: Dict[str, SessionState]) -> None:
+        """Add persisted states, unless a newer one was assigned meanwhile."""
+        now = time.monotonic()
+        with self._lock:
+            for actor, state in states.items():
+                if self._get(actor, now) is None:
+                    self._put(actor, state, now)
+            self._evict()
+
+    def assign(self, events: Sequence[Tuple[str, datetime]], gap: timedelta) -> List[str]:
+        """Session id for each ``(actor, event_time)``; events are applied in time order."""
+        session_ids: List[Optional[str]] = [None] * len(events)
+        now = time.monotonic()
+        with self._lock:
+            for index in sorted(range(len(events)), key=lambda i: events[i][1]):
+                actor, event_time = events[index]
+                state = self._get(actor, now)
+                if state is None or event_time > state.last_event_at + gap:
+                    state = _new_session(event_time)
+                elif event_time < state.started_at - gap:
+                    session_ids[index] = _new_session(event_time).session_id  # late arrival
+                    continue
+                else:
+                    state = state._replace(
+                        started_at=min(state.started_at, event_time),
+                        last_event_at=max(state.last_event_at, event_time),
+                    )
+                self._put(actor, state, now)
+                self._dirty[actor] = state
+                session_ids[index] = state.session_id
+            self._evict()
+        return session_ids
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def take_dirty(self) -> Dict[str, SessionState]:
+        with self._lock:
+            taken, self._dirty = self._dirty, {}
+        return taken
+
+    def restore_dirty(self, taken: Dict[str, SessionState]) -> None:
+        """Put back states whose flush failed, unless they changed again meanwhile."""
+        with self._lock:
+            for actor, state in taken.items():
+                self._dirty.setdefault(actor, state)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._dirty.clear()
+
+
+session_table = SessionTable(SESSION_CACHE_SIZE, SESSION_CACHE_TTL_S)
+
+
+def _actors(model, rows: Sequence[Dict[str, Any]]) -> Optional[List[str]]:
+    """Actor of each row, or None when ``model``'s rows are not sessionized."""
+    if not SESSIONIZATION_ENABLED or not rows:
+        return None
+    anonymous_field = IDENTITY_SOURCES.get(model)
+    if anonymous_field is None:
+        return None
+    return [row.get("actor_id") or default_actor(row, anonymous_field) for row in rows]
+
+
+def _lookup(actors: List[str]):
+    return select(
+        ActorSession.actor, ActorSession.session_id, ActorSession.started_at, ActorSession.last_event_at
+    ).where(ActorSession.actor.in_(actors))
+
+
+def _states(result) -> Dict[str, SessionState]:
+    return {
+        actor: SessionState(session_id, as_utc(started_at), as_utc(last_event_at))
+        for actor, session_id, started_at, last_event_at in result
+    }
+
+
+def _apply(rows: Sequence[Dict[str, Any]], actors: List[str]) -> None:
+    events = [(actor, as_utc(row["event_time"])) for actor, row in zip(actors, rows)]
+    gap = timedelta(seconds=SESSION_INACTIVITY_GAP_S)
+    for row, session_id in zip(rows, session_table.assign(events, gap)):
+        row["server_session_id"] = session_id
+
+
+def assign_sessions(db: Session, model, rows: Sequence[Dict[str, Any]]) -> None:
+    """
+    Set ``server_session_id`` on ``rows`` (dicts about to be inserted).
+    Actors not in memory are looked up in ``actor_sessions`` with one query.
+    """
+    actors = _actors(model, rows)
+    if actors is None:
+        return
+    missing = session_table.missing(actors)
+    if missing:
+        session_table.load(_states(db.execute(_lookup(missing))))
+    _apply(rows, actors)
+
+
+async def assign_sessions_async(db: AsyncSession, model, rows: Sequence[Dict[str, Any]]) -> None:
+    """Async counterpart of ``assign_sessions``."""
+    actors = _actors(model, rows)
+    if actors is None:
+        return
+    missing = session_table.missing(actors)
+    if missing:
+        session_table.load(_states(await db.execute(_lookup(missing))))
+    _apply(rows, actors)
+
+
+def flush_sessions(db: Session) -> int:
+    """
+    Upsert sessions changed since the last flush into ``actor_sessions`` and
+    commit. On failure they are put back for the next flush.
+    Returns the number of actors written.
+    """
+    taken = session_table.take_dirty()
+    if not taken:
+        return 0
+
+    table = ActorSession.__table__
+    stmt = dialect_insert(db)(table)
+    set_ = {name: stmt.excluded[name] for name in SessionState._fields}
+    set_["updated_at"] = func.now()
+    stmt = stmt.on_conflict_do_update(index_elements=["actor"], set_=set_)
+    rows = [{"actor": actor, **state._asdict()} for actor, state in sorted(taken.items())]
+    try:
+        db.execute(stmt, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        session_table.restore_dirty(taken)
+        raise
+    return len(rows)
@@ -0,0 +1,129 @@
+"""
+Batch validation helpers for the ingestion pipeline.
+
+Payloads are validated against the Pydantic ``*Create`` schemas. Failures are
+reported per item so that one bad event does not reject a whole batch.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.partitioning import unique_columns
+
+# (index, validated model) and (index, error list)
+Accepted = List[Tuple[int, BaseModel]]
+Rejected = List[Tuple[int, List[Dict[str, Any]]]]
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def _clean_errors(exc: ValidationError) -> List[Dict[str, Any]]:
+    return exc.errors(include_url=False, include_context=False, include_input=False)
+
+
+def validate_batch(
+    schema: Type[BaseModel], payloads: Sequence[Dict[str, Any]]
+) -> Tuple[Accepted, Rejected]:
+    """Validate a list of raw payloads, splitting them into accepted and rejected."""
+    # Fast path: the whole list validates in a single call into pydantic-core.
+    try:
+        models = _list_adapter(schema).validate_python(payloads)
+        return list(enumerate(models)), []
+    except ValidationError:
+        pass
+
+    accepted: Accepted = []
+    rejected: Rejected = []
+    for index, payload in enumerate(payloads):
+        try:
+            accepted.append((index, schema.model_validate(payload)))
+        except ValidationError as exc:
+            rejected.append((index, _clean_errors(exc)))
+    return accepted, rejected
+
+
+def _split_conflicts(
+    column, accepted: Accepted, existing: Set[Any], rejected: Rejected
+) -> Accepted:
+    kept: Accepted = []
+    for index, item in accepted:
+        value = getattr(item, column.name)
+        if value in existing:
+            rejected.append((index, [{
+                "type": "unique_violation",
+                "loc": [column.name],
+                "msg": f"{column.name} already exists",
+            }]))
+        else:
+            existing.add(value)
+            kept.append((index, item))
+    return kept
+
+
+def reject_unique_conflicts(
+    db: Session, model, accepted: Accepted
+) -> Tuple[Accepted, Rejected]:
+    """
+    Reject items that would violate a single-column unique constraint,
+    either against existing rows or against an earlier item in the batch.
+
+    Uses one ``IN`` lookup per unique column instead of letting the whole
+    transaction fail on commit.
+    """
+    rejected: Rejected = []
+    for column in unique_columns(model):
+        if not accepted:
+            break
+        values = {getattr(item, column.name) for _, item in accepted}
+        existing = set(db.scalars(select(column).where(column.in_(values))))
+        accepted = _split_conflicts(column, accepted, existing, rejected)
+    return accepted, rejected
+
+
+async def reject_unique_conflicts_async(
+    db: AsyncSession, model, accepted: Accepted
+) -> Tuple[Accepted, Rejected]:
+    """Async counterpart of ``reject_unique_conflicts``."""
+    rejected: Rejected = []
+    for column in unique_columns(model):
+        if not accepted:
+            break
+        values = {getattr(item, column.name) for _, item in accepted}
+        existing = set(await db.scalars(select(column).where(column.in_(values))))
+        accepted = _split_conflicts(column, accepted, existing, rejected)
+    return accepted, rejected
+
+
+def _unenforced_lookups(model, item: BaseModel):
+    """``(column, query)`` for unique columns the database does not enforce."""
+    for column in unique_columns(model):
+        if not column.unique:  # constraint dropped for partitioning
+            yield column, select(column).where(column == getattr(item, column.name)).limit(1)
+
+
+def find_unique_conflict(db: Session, model, item: BaseModel) -> Optional[str]:
+    """
+    Name of a unique column whose value ``item`` repeats, for single events.
+
+    Only columns without a database constraint (see ``app/db/partitioning.py``)
+    are looked up; the others already fail the insert.
+    """
+    for column, query in _unenforced_lookups(model, item):
+        if db.scalar(query) is not None:
+            return column.name
+    return None
+
+
+async def find_unique_conflict_async(db: AsyncSession, model, item: BaseModel) -> Optional[str]:
+    """Async counterpart of ``find_unique_conflict``."""
+    for column, query in _unenforced_lookups(model, item):
+        if await db.scalar(query) is not None:
+            return column.name
+    return None
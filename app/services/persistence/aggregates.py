@@ -0,0 +1,330 @@
+"""
+Hourly Product Aggregates
+
+Maintains ``hourly_product_behavior_agg`` from ``user_behavior_events``.
+Two strategies are available (``AGGREGATOR_MODE``); run only one of them,
+since each would count the same events.
+
+``watermark``
+    ``run_incremental_aggregation`` reads only events whose ``ingested_at``
+    is past the job's high-water mark (``aggregation_watermarks``), groups
+    them per ``(product_id, event_hour)`` in SQL and folds the counts into
+    the aggregate table with one batched upsert on ``idx_hourly_product_time``.
+    The upsert and the watermark move commit together, so a crashed run is
+    simply repeated.
+
+``inmemory``
+    ``HourlyCounterMap`` is fed by the ingestion path as rows are committed
+    and keeps increments per ``(product_id, event_hour, event_type)``. Each
+    flush merges them into one upsert per product-hour, so a hot product costs
+    one aggregate write per flush interval instead of one per event.
+
+    Crash safety: increments that were not flushed when the process died are
+    lost from the aggregate (never from the raw table). On startup,
+    ``recompute_recent_hours`` rebuilds the most recent hours from raw events
+    with absolute counts, which repairs the hours that were still receiving
+    events. Older hours are only affected by late-arriving events, and can be
+    repaired the same way over a wider range.
+
+    This mode assumes a single API process. A recompute overwrites hours
+    whose events other processes may still hold as unflushed increments,
+    and those are then counted twice. With several workers, set
+    ``AGGREGATOR_RECOMPUTE_HOURS=0`` and recompute from ``scripts.init_db
+    --recompute-hours`` at deploy, before the workers start.
+"""
+import logging
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, DefaultDict, Dict, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app.db.functions import (
+    advisory_xact_lock,
+    as_utc,
+    dialect_insert,
+    hour_bucket,
+    try_advisory_xact_lock,
+)
+from app.db.models.aggregates import AggregationWatermark, HourlyProductBehaviorAggregate
+from app.db.models.user_behavior_events import UserBehaviorEvent, UserBehaviorEventType
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "hourly_product_behavior"
+
+# (product_id, event_hour) -> {"view_count": .., "search_count": .., "total_events": ..}
+HourKey = Tuple[int, datetime]
+HourlyCounts = Dict[HourKey, Dict[str, int]]
+
+COUNT_COLUMNS = ("view_count", "search_count", "total_events")
+
+
+def upsert_hourly_counts(db: Session, counts: HourlyCounts, replace: bool = False) -> int:
+    """
+    Upsert per product-hour counts into the aggregate table.
+
+    By default counts are deltas added to existing rows; with ``replace=True``
+    they overwrite them (used when recomputing an hour from raw events).
+    Rows are written in key order so concurrent upserters lock in the same order.
+    Returns the number of product-hours written. The caller owns the transaction.
+    """
+    if not counts:
+        return 0
+
+    table = HourlyProductBehaviorAggregate.__table__
+    stmt = dialect_insert(db)(table)
+    excluded = stmt.excluded
+    if replace:
+        set_ = {name: excluded[name] for name in COUNT_COLUMNS}
+    else:
+        set_ = {name: table.c[name] + excluded[name] for name in COUNT_COLUMNS}
+    set_["last_updated_at"] = func.now()
+    stmt = stmt.on_conflict_do_update(index_elements=["product_id", "event_hour"], set_=set_)
+
+    rows = [
+        {"id": uuid.uuid4(), "product_id": product_id, "event_hour": event_hour, **values}
+        for (product_id, event_hour), values in sorted(counts.items())
+    ]
+    db.execute(stmt, rows)
+    return len(rows)
+
+
+def count_events_by_hour(db: Session, *conditions) -> HourlyCounts:
+    """Group raw behavior events matching ``conditions`` into per product-hour counts."""
+    bucket = hour_bucket(UserBehaviorEvent.event_time, db.get_bind().dialect.name)
+    is_view = UserBehaviorEvent.event_type == UserBehaviorEventType.PRODUCT_VIEWED
+    is_search = UserBehaviorEvent.event_type == UserBehaviorEventType.PRODUCT_SEARCHED
+    query = (
+        select(
+            UserBehaviorEvent.product_id,
+            bucket.label("event_hour"),
+            func.sum(case((is_view, 1), else_=0)),
+            func.sum(case((is_search, 1), else_=0)),
+            func.count(),
+        )
+        .where(*conditions)
+        .group_by(UserBehaviorEvent.product_id, bucket)
+    )
+    return {
+        (product_id, as_utc(event_hour)): {
+            "view_count": views,
+            "search_count": searches,
+            "total_events": total,
+        }
+        for product_id, event_hour, views, searches, total in db.execute(query)
+    }
+
+
+def get_watermark(db: Session, job_name: str = JOB_NAME) -> Optional[datetime]:
+    value = db.scalar(
+        select(AggregationWatermark.watermark).where(AggregationWatermark.job_name == job_name)
+    )
+    return as_utc(value) if value is not None else None
+
+
+def _set_watermark(db: Session, job_name: str, watermark: datetime) -> None:
+    row = db.get(AggregationWatermark, job_name)
+    if row is None:
+        db.add(AggregationWatermark(job_name=job_name, watermark=watermark))
+    else:
+        row.watermark = watermark
+
+
+def run_incremental_aggregation(
+    db: Session,
+    lag_seconds: float = 30,
+    max_window_seconds: float = 3600,
+) -> int:
+    """
+    Fold events ingested since the last run into the hourly aggregate table.
+
+    Work is split into windows of at most ``max_window_seconds`` of ingestion
+    time, each committed with its watermark. Events ingested within the last
+    ``lag_seconds`` (by the database clock) are left for the next run.
+
+    Each window is folded under the job's advisory lock, and the watermark is
+    re-read once the lock is held, so workers running the job side by side
+    never fold the same events twice. A worker that finds the lock taken
+    skips the run. Returns the number of events folded.
+    """
+    ingested_at = UserBehaviorEvent.ingested_at
+    upper_limit = as_utc(db.scalar(select(func.now()))) - timedelta(seconds=lag_seconds)
+    folded = 0
+
+    while True:
+        if not try_advisory_xact_lock(db, JOB_NAME):
+            logger.debug("Aggregation is running in another worker, skipping this run")
+            break
+        watermark = get_watermark(db)
+        # Jump straight to the next ingested event so gaps cost one index probe.
+        after = [ingested_at > watermark] if watermark is not None else []
+        next_ingested = db.scalar(select(func.min(ingested_at)).where(*after))
+        if next_ingested is None:
+            break
+        lower = as_utc(next_ingested) - timedelta(microseconds=1)
+        if watermark is not None:
+            lower = max(lower, watermark)
+        if lower >= upper_limit:
+            break
+        upper = min(upper_limit, lower + timedelta(seconds=max_window_seconds))
+
+        counts = count_events_by_hour(db, ingested_at > lower, ingested_at <= upper)
+        upsert_hourly_counts(db, counts)
+        _set_watermark(db, JOB_NAME, upper)
+        db.commit()
+
+        events = sum(values["total_events"] for values in counts.values())
+        folded += events
+        logger.debug("Aggregated %d events up to %s", events, upper.isoformat())
+
+    return folded
+
+
+def recompute_recent_hours(db: Session, hours: int, now: Optional[datetime] = None) -> int:
+    """
+    Rebuild the last ``hours`` hour buckets (by event_time) from raw events,
+    overwriting whatever the aggregate table holds for them. Commits.
+
+    Runs under the job's advisory lock; returns 0 without writing when
+    another process holds it (e.g. a worker starting at the same time).
+    """
+    if not try_advisory_xact_lock(db, JOB_NAME):
+        logger.info("Hourly aggregates are being recomputed elsewhere, skipping")
+        return 0
+    now = now or datetime.now(timezone.utc)
+    since = _truncate_hour(now) - timedelta(hours=max(hours - 1, 0))
+    return _recompute(db, UserBehaviorEvent.event_time >= since)
+
+
+def recompute_hours(db: Session, start: datetime, end: datetime, up_to_watermark: bool = False) -> int:
+    """
+    Rebuild the hour buckets (by event_time) that overlap ``[start, end]``
+    from raw events, e.g. after a backfill. Commits.
+
+    With ``up_to_watermark`` (``watermark`` mode) only events the incremental
+    job has already passed are counted; it folds the others itself. Before
+    its first run there is nothing to rebuild. Waits for the job's advisory
+    lock, so the watermark cannot move while the hours are rebuilt.
+    """
+    advisory_xact_lock(db, JOB_NAME)
+    conditions = [
+        UserBehaviorEvent.event_time >= _truncate_hour(start),
+        UserBehaviorEvent.event_time < _truncate_hour(end) + timedelta(hours=1),
+    ]
+    if up_to_watermark:
+        watermark = get_watermark(db)
+        if watermark is None:
+            db.rollback()
+            return 0
+        conditions.append(UserBehaviorEvent.ingested_at <= watermark)
+    return _recompute(db, *conditions)
+
+
+def _recompute(db: Session, *conditions) -> int:
+    counts = count_events_by_hour(db, *conditions)
+    written = upsert_hourly_counts(db, counts, replace=True)
+    db.commit()
+    return written
+
+
+# --------------------------------------------------------------------------- #
+# In-memory pre-aggregation
+# --------------------------------------------------------------------------- #
+def _truncate_hour(value: datetime) -> datetime:
+    return as_utc(value).replace(minute=0, second=0, microsecond=0)
+
+
+_COUNT_COLUMN_BY_TYPE = {
+    UserBehaviorEventType.PRODUCT_VIEWED.value: "view_count",
+    UserBehaviorEventType.PRODUCT_SEARCHED.value: "search_count",
+}
+
+
+class HourlyCounterMap:
+    """
+    Thread-safe increments keyed by ``(product_id, event_hour, event_type)``,
+    flushed as merged deltas in one bulk upsert.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: DefaultDict[Tuple[int, datetime, str], int] = defaultdict(int)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def record(self, rows: Sequence[Dict[str, Any]]) -> None:
+        """Count committed ``user_behavior_events`` rows."""
+        keys = [
+            (
+                row["product_id"],
+                _truncate_hour(row["event_time"]),
+                getattr(row["event_type"], "value", row["event_type"]),
+            )
+            for row in rows
+        ]
+        with self._lock:
+            for key in keys:
+                self._counts[key] += 1
+
+    def on_commit(self, model, rows: Sequence[Dict[str, Any]]) -> None:
+        """Commit listener: only behavior events feed the hourly aggregate."""
+        if model is UserBehaviorEvent:
+            self.record(rows)
+
+    def _take(self) -> Dict[Tuple[int, datetime, str], int]:
+        with self._lock:
+            taken, self._counts = self._counts, defaultdict(int)
+        return taken
+
+    def _restore(self, taken: Dict[Tuple[int, datetime, str], int]) -> None:
+        with self._lock:
+            for key, value in taken.items():
+                self._counts[key] += value
+
+    def flush(self, db: Session) -> int:
+        """
+        Write accumulated increments with one upsert and commit.
+        On failure the increments are put back for the next flush.
+        Returns the number of product-hours written.
+        """
+        taken = self._take()
+        if not taken:
+            return 0
+
+        merged: HourlyCounts = {}
+        for (product_id, event_hour, event_type), value in taken.items():
+            counts = merged.setdefault(
+                (product_id, event_hour), {name: 0 for name in COUNT_COLUMNS}
+            )
+            column = _COUNT_COLUMN_BY_TYPE.get(event_type)
+            if column is not None:
+                counts[column] += value
+            counts["total_events"] += value
+
+        try:
+            written = upsert_hourly_counts(db, merged)
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._restore(taken)
+            raise
+        return written
+
+
+def read_hourly_counts(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    product_ids: Optional[Iterable[int]] = None,
+):
+    """Pre-aggregated rows for ``[start, end)``, served from the aggregate table only."""
+    agg = HourlyProductBehaviorAggregate
+    query = select(agg).where(agg.event_hour >= start, agg.event_hour < end)
+    if product_ids is not None:
+        query = query.where(agg.product_id.in_(list(product_ids)))
+    return db.scalars(query.order_by(agg.product_id, agg.event_hour)).all()
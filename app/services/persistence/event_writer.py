@@ -0,0 +1,388 @@
+"""
+Event Writer
+
+Persists validated events to their tables using Core bulk inserts.
+
+Two modes are provided:
+
+- ``insert_events`` writes a batch synchronously inside the caller's transaction
+  (``insert_events_async`` does the same on an ``AsyncSession``).
+- ``EventWriter`` is an in-process write-behind buffer. Request handlers
+  enqueue rows and return immediately; a background thread flushes them in
+  batches once ``batch_size`` rows are waiting or the oldest row is
+  ``max_latency`` seconds old. The buffer is bounded: when it is full,
+  ``submit`` raises ``WriterQueueFull`` and the API answers 429.
+
+A batch the database rejects for its data (``IntegrityError``,
+``DataError``) is retried row by row, and only the offending rows are
+dropped. Any other failure (a lost connection, a failover, a lock timeout)
+says nothing about the rows: the unwritten ones go back to the head of the
+buffer and the writer backs off exponentially, up to ``max_retry_backoff``
+seconds, before flushing again. ``event_writer_retried_total`` counts them.
+A writer being stopped keeps retrying until ``stop``'s timeout runs out.
+
+Buffered events are remembered by the dedup cache when they are accepted.
+Dropped rows are removed from that cache too, so a retry of a lost event is
+written again instead of being answered as a replay.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.services.ingestion.dedup import forget
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------------------------------------------- #
+# Commit listeners: called with (model, rows) once rows are durably committed,
+# whichever path wrote them (sync, async or write-behind)
+# --------------------------------------------------------------------------- #
+CommitListener = Callable[[Any, Sequence[Dict[str, Any]]], None]
+_commit_listeners: List[CommitListener] = []
+
+
+def add_commit_listener(listener: CommitListener) -> None:
+    if listener not in _commit_listeners:
+        _commit_listeners.append(listener)
+
+
+def remove_commit_listener(listener: CommitListener) -> None:
+    if listener in _commit_listeners:
+        _commit_listeners.remove(listener)
+
+
+def notify_committed(model, rows: Sequence[Dict[str, Any]]) -> None:
+    """Tell listeners ``rows`` were committed to ``model``'s table. Listener errors are logged."""
+    for listener in _commit_listeners:
+        try:
+            listener(model, rows)
+        except Exception:
+            logger.exception("Commit listener %r failed", listener)
+
+
+def _with_event_ids(rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    values = []
+    for row in rows:
+        row = dict(row)
+        row.setdefault("event_id", uuid.uuid4())
+        values.append(row)
+    return values
+
+
+def _server_columns(model, dialect) -> list:
+    """Server-generated columns to fetch with RETURNING, if the dialect can."""
+    if not dialect.insert_returning:
+        return []
+    return [c for c in model.__table__.columns if c.server_default is not None]
+
+
+def insert_events(db: Session, model, rows: Sequence[Dict[str, Any]]) -> List[uuid.UUID]:
+    """
+    Insert ``rows`` into ``model``'s table as one multi-row statement.
+
+    Primary keys are generated here so they can be returned without a
+    follow-up SELECT. The caller owns the transaction (commit/rollback).
+    """
+    if not rows:
+        return []
+    values = _with_event_ids(rows)
+    # executemany on a Core insert lets SQLAlchemy use "insertmanyvalues",
+    # which renders batched multi-row VALUES on Postgres.
+    db.execute(insert(model), values)
+    return [row["event_id"] for row in values]
+
+
+def insert_event_returning(db: Session, model, row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Insert a single event and return it as a dict without a follow-up SELECT.
+
+    Server-generated columns (e.g. ``ingested_at``) are fetched with
+    ``RETURNING`` when the dialect supports it and left out otherwise.
+    The caller owns the transaction.
+    """
+    data = _with_event_ids([row])[0]
+    stmt = insert(model).values(**data)
+    server_columns = _server_columns(model, db.get_bind().dialect)
+    if server_columns:
+        data.update(db.execute(stmt.returning(*server_columns)).one()._mapping)
+    else:
+        db.execute(stmt)
+    return data
+
+
+async def insert_events_async(
+    db: AsyncSession, model, rows: Sequence[Dict[str, Any]]
+) -> List[uuid.UUID]:
+    """Async counterpart of ``insert_events``."""
+    if not rows:
+        return []
+    values = _with_event_ids(rows)
+    await db.execute(insert(model), values)
+    return [row["event_id"] for row in values]
+
+
+async def insert_event_returning_async(
+    db: AsyncSession, model, row: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Async counterpart of ``insert_event_returning``."""
+    data = _with_event_ids([row])[0]
+    stmt = insert(model).values(**data)
+    server_columns = _server_columns(model, db.get_bind().dialect)
+    if server_columns:
+        result = await db.execute(stmt.returning(*server_columns))
+        data.update(result.one()._mapping)
+    else:
+        await db.execute(stmt)
+    return data
+
+
+class WriterQueueFull(Exception):
+    """Raised when the write-behind buffer has no room for more events."""
+
+
+class WriterStopped(Exception):
+    """Raised when submitting to a writer that is not running."""
+
+
+# (enqueued_at, model, row)
+_Item = Tuple[float, Any, Dict[str, Any]]
+
+# Failures caused by the rows themselves; anything else is retried.
+_ROW_ERRORS = (IntegrityError, DataError)
+
+
+class EventWriter:
+    """Bounded write-behind buffer flushed to the database by a background thread."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int = 500,
+        max_latency: float = 0.05,
+        max_queue_size: int = 50_000,
+        retry_backoff: float = 0.1,
+        max_retry_backoff: float = 5.0,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.max_queue_size = max_queue_size
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+
+        self._buffer: Deque[_Item] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._in_flight = 0
+        self._failed_flushes = 0  # consecutive, drives the backoff
+
+        # Counters, read by health/metrics endpoints
+        self.flushed_total = 0
+        self.failed_total = 0
+        self.retried_total = 0
+        self.last_flush_seconds = 0.0
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """Stop accepting events and flush what is buffered. Returns True if fully drained."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            drained = not self._thread.is_alive()
+            self._thread = None
+            return drained
+        return True
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def alive(self) -> bool:
+        """True while the flush thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def depth(self) -> int:
+        """Rows waiting to be written, including the batch currently being flushed."""
+        return len(self._buffer) + self._in_flight
+
+    # ------------------------------------------------------------------ #
+    # Producer side
+    # ------------------------------------------------------------------ #
+    def submit(self, model, row: Dict[str, Any]) -> uuid.UUID:
+        return self.submit_many(model, [row])[0]
+
+    def submit_many(self, model, rows: Sequence[Dict[str, Any]]) -> List[uuid.UUID]:
+        """Enqueue rows for ``model``. All-or-nothing: either every row fits or none is queued."""
+        now = time.monotonic()
+        items = []
+        event_ids = []
+        for row in rows:
+            row = dict(row)
+            row.setdefault("event_id", uuid.uuid4())
+            event_ids.append(row["event_id"])
+            items.append((now, model, row))
+
+        with self._cond:
+            if not self._running:
+                raise WriterStopped("event writer is not running")
+            if len(self._buffer) + len(items) > self.max_queue_size:
+                raise WriterQueueFull(
+                    f"event writer queue is full ({self.max_queue_size} rows)"
+                )
+            was_empty = not self._buffer
+            self._buffer.extend(items)
+            # Only wake the flusher when it has something new to decide on.
+            if was_empty or len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+        return event_ids
+
+    # ------------------------------------------------------------------ #
+    # Consumer side
+    # ------------------------------------------------------------------ #
+    def _next_batch(self) -> Optional[List[_Item]]:
+        with self._cond:
+            while not self._buffer:
+                if not self._running:
+                    return None
+                self._cond.wait()
+
+            # Wait until the batch is full or the oldest row has aged out.
+            # When stopping we skip the wait and drain as fast as possible.
+            deadline = self._buffer[0][0] + self.max_latency
+            while self._running and len(self._buffer) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            count = min(self.batch_size, len(self._buffer))
+            batch = [self._buffer.popleft() for _ in range(count)]
+            self._in_flight = count
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._flush(batch)
+            finally:
+                with self._cond:
+                    self._in_flight = 0
+
+    def _flush(self, batch: List[_Item]) -> None:
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for _, model, row in batch:
+            groups.setdefault(model, []).append(row)
+
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            try:
+                for model, rows in groups.items():
+                    insert_events(db, model, rows)
+                db.commit()
+                self._failed_flushes = 0
+                self.flushed_total += len(batch)
+                for model, rows in groups.items():
+                    notify_committed(model, rows)
+            except _ROW_ERRORS:
+                db.rollback()
+                logger.exception("Batch flush of %d events failed; retrying row by row", len(batch))
+                self._flush_rows(db, batch)
+            except Exception as exc:
+                db.rollback()
+                self._requeue(batch, exc)
+        finally:
+            db.close()
+            self.last_flush_seconds = time.perf_counter() - started
+
+    def _flush_rows(self, db: Session, batch: List[_Item]) -> None:
+        """Isolate bad rows so one failure doesn't drop the whole batch."""
+        for index, (_, model, row) in enumerate(batch):
+            try:
+                insert_events(db, model, [row])
+                db.commit()
+                self.flushed_total += 1
+                notify_committed(model, [row])
+            except _ROW_ERRORS as exc:
+                db.rollback()
+                self.failed_total += 1
+                logger.error(
+                    "Dropping %s event %s: %s", model.__tablename__, row.get("event_id"), exc
+                )
+                forget(model, [row.get("idempotency_key")], [row["event_id"]])
+            except Exception as exc:
+                db.rollback()
+                self._requeue(batch[index:], exc)
+                return
+        self._failed_flushes = 0
+
+    def _requeue(self, items: List[_Item], exc: Exception) -> None:
+        """Put unwritten ``items`` back at the head of the buffer, then back off."""
+        self._failed_flushes += 1
+        self.retried_total += len(items)
+        delay = min(self.retry_backoff * 2 ** (self._failed_flushes - 1), self.max_retry_backoff)
+        logger.warning("Flush of %d events failed (%s); retrying in %.2fs", len(items), exc, delay)
+        with self._cond:
+            self._buffer.extendleft(reversed(items))
+            self._in_flight = 0
+        time.sleep(delay)
+
+
+# --------------------------------------------------------------------------- #
+# Process-wide writer, started/stopped from the application lifespan
+# --------------------------------------------------------------------------- #
+_event_writer: Optional[EventWriter] = None
+
+
+def start_event_writer(session_factory: Callable[[], Session], **kwargs) -> EventWriter:
+    global _event_writer
+    if _event_writer is None or not _event_writer.running:
+        _event_writer = EventWriter(session_factory, **kwargs)
+        _event_writer.start()
+    return _event_writer
+
+
+def stop_event_writer(timeout: Optional[float] = None) -> bool:
+    global _event_writer
+    if _event_writer is None:
+        return True
+    drained = _event_writer.stop(timeout)
+    if not drained:
+        logger.warning("Event writer did not drain within %ss; %d events lost",
+                       timeout, _event_writer.depth)
+    _event_writer = None
+    return drained
+
+
+def get_event_writer() -> Optional[EventWriter]:
+    """Return the running writer, or None when events are written synchronously."""
+    if _event_writer is not None and _event_writer.running:
+        return _event_writer
+    return None
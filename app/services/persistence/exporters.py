@@ -0,0 +1,125 @@
+"""
+Event Exporters
+
+Streams whole event tables out as NDJSON or CSV without loading them into
+memory. Rows are read through a server-side cursor (``yield_per``) in batches
+of ``EXPORT_BATCH_SIZE``. Each batch is serialised into one text chunk and
+handed to the response before the next batch is fetched, so memory use is
+bounded by the batch size rather than by the export size.
+
+Exports read Core rows (plain tuples, no ORM identity map) and run in a
+session of their own. That session lives for the whole response, independent
+of the request-scoped one.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import EXPORT_BATCH_SIZE
+from app.schemas.events.base import EventExportQuery, ExportFormat
+from app.services.persistence.readers import filter_events
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    plain = _plain(value)
+    if plain is value:
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+    return plain
+
+
+def ndjson_chunk(columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> str:
+    dumps = json.dumps
+    return "".join(
+        dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows
+    )
+
+
+def csv_chunk(columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def csv_header(columns: Sequence[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns)
+    return buffer.getvalue()
+
+
+_CHUNKERS: Dict[ExportFormat, Callable[[Sequence[str], Iterable[Sequence[Any]]], str]] = {
+    ExportFormat.NDJSON: ndjson_chunk,
+    ExportFormat.CSV: csv_chunk,
+}
+
+
+def export_filename(model, export_format: ExportFormat) -> str:
+    return f"{model.__tablename__}.{export_format.value}"
+
+
+def export_statement(model, query: EventExportQuery, batch_size: int):
+    table = model.__table__
+    stmt = filter_events(select(table), table.c, start=query.start, end=query.end)
+    return stmt.execution_options(yield_per=batch_size)
+
+
+def stream_export(
+    bind,
+    model,
+    query: EventExportQuery,
+    batch_size: Optional[int] = None,
+) -> Iterator[str]:
+    """Yield the export of ``model`` as text chunks, one per fetched batch."""
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    columns: List[str] = [column.name for column in model.__table__.columns]
+    chunk = _CHUNKERS[query.format]
+
+    with Session(bind=bind) as db:
+        if query.format is ExportFormat.CSV:
+            yield csv_header(columns)
+        result = db.execute(export_statement(model, query, batch_size))
+        for rows in result.partitions():
+            yield chunk(columns, rows)
+
+
+async def stream_export_async(
+    bind,
+    model,
+    query: EventExportQuery,
+    batch_size: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """Async counterpart of ``stream_export`` on an ``AsyncEngine``."""
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    columns: List[str] = [column.name for column in model.__table__.columns]
+    chunk = _CHUNKERS[query.format]
+
+    async with AsyncSession(bind=bind) as db:
+        if query.format is ExportFormat.CSV:
+            yield csv_header(columns)
+        result = await db.stream(export_statement(model, query, batch_size))
+        async for rows in result.partitions():
+            yield chunk(columns, rows)
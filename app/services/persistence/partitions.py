@@ -0,0 +1,374 @@
+"""
+Partition Maintenance
+
+Keeps the range-partitioned event tables (``DB_PARTITIONING``, see
+``app/db/partitioning.py``) usable and bounded:
+
+- ``ensure_partitions`` creates the partition of the current period and the
+  next ``PARTITION_PREMAKE`` ones, plus a ``DEFAULT`` partition that catches
+  events outside every range (late or far-future ``event_time``s);
+- ``expire_partitions`` removes partitions whose whole range is older than
+  ``RETENTION_DAYS``: ``drop`` detaches and drops them, ``archive`` detaches
+  them and moves them to ``RETENTION_ARCHIVE_SCHEMA``, where they can be
+  dumped or queried. Either way the cost is a catalog change, not a DELETE,
+  and nothing has to be vacuumed afterwards. Expired rows left in a default
+  partition are the exception: they are deleted, or moved to
+  ``<archive schema>.<table>_default``.
+
+Backfilled history is older than the current period. ``ensure_partitions``
+covers it when given ``since`` (``scripts.init_db --partitions-since`` before
+a load, ``scripts.seed_data`` after one); until then it sits in the default
+partition.
+
+Partitions are named ``<table>_pYYYYMMDD`` (daily) or ``<table>_pYYYYMM``
+(monthly) with UTC bounds; only partitions with such names are managed.
+Each created or expired partition is committed on its own, so the
+``ACCESS EXCLUSIVE`` lock on the parent table is held briefly.
+
+Every one of those transactions first takes the ``partition_maintenance``
+advisory lock. Workers that find it taken stop their run and leave the DDL
+to the worker holding it.
+
+Postgres refuses to create a range partition while the default partition
+holds rows of that range (e.g. events dated beyond the premade horizon).
+Such a partition is created detached instead, the rows are moved into it
+from the default partition, and it is then attached, all in one transaction.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    DB_PARTITIONING,
+    PARTITION_PREMAKE,
+    RETENTION_ARCHIVE_SCHEMA,
+    RETENTION_DAYS,
+    RETENTION_MODE,
+)
+from app.db.functions import as_utc, try_advisory_xact_lock
+from app.db.models.cart_events import CartEvent
+from app.db.models.logistics_events import LogisticsEvent
+from app.db.models.order_events import OrderEvent
+from app.db.models.order_item_events import OrderItemEvent
+from app.db.models.payment_events import PaymentEvent
+from app.db.models.user_behavior_events import UserBehaviorEvent
+from app.db.partitioning import PARTITION_COLUMN, PARTITIONED
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = [
+    model.__tablename__
+    for model in (UserBehaviorEvent, CartEvent, OrderEvent, OrderItemEvent, PaymentEvent, LogisticsEvent)
+]
+
+RETENTION_MODES = ("drop", "archive")
+
+MAINTENANCE_LOCK = "partition_maintenance"
+
+_NAME_FORMATS = {"daily": "%Y%m%d", "monthly": "%Y%m"}
+_NAME_DIGITS = {"daily": 8, "monthly": 6}
+
+
+class Partition(NamedTuple):
+    table: str
+    name: str
+    start: datetime     # inclusive
+    end: datetime       # exclusive
+
+
+def period_start(value: datetime, granularity: str) -> datetime:
+    value = as_utc(value).replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "monthly":
+        value = value.replace(day=1)
+    return value
+
+
+def next_period(start: datetime, granularity: str) -> datetime:
+    if granularity == "daily":
+        return start + timedelta(days=1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_for(table: str, start: datetime, granularity: str) -> Partition:
+    name = f"{table}_p{start.strftime(_NAME_FORMATS[granularity])}"
+    return Partition(table, name, start, next_period(start, granularity))
+
+
+def planned_partitions(
+    table: str, since: datetime, until: datetime, granularity: str
+) -> List[Partition]:
+    """Partitions covering every period from the one containing ``since`` to the one containing ``until``."""
+    start = period_start(since, granularity)
+    last = period_start(until, granularity)
+    partitions = []
+    while start <= last:
+        partitions.append(partition_for(table, start, granularity))
+        start = next_period(start, granularity)
+    return partitions
+
+
+def parse_partition(table: str, name: str, granularity: str) -> Optional[Partition]:
+    """The managed partition called ``name``, or None if the name is not ours."""
+    prefix = f"{table}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        start = datetime.strptime(name[len(prefix):], _NAME_FORMATS[granularity])
+    except ValueError:
+        return None
+    return partition_for(table, start.replace(tzinfo=timezone.utc), granularity)
+
+
+def expired_partitions(partitions: List[Partition], cutoff: datetime) -> List[Partition]:
+    """Partitions whose whole range lies before ``cutoff``."""
+    return [partition for partition in partitions if partition.end <= cutoff]
+
+
+# --------------------------------------------------------------------------- #
+# DDL
+# --------------------------------------------------------------------------- #
+def _quote(db: Session, name: str) -> str:
+    return db.get_bind().dialect.identifier_preparer.quote(name)
+
+
+def _bound(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S+00")
+
+
+def create_partition_sql(db: Session, partition: Partition) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {_quote(db, partition.name)} "
+        f"PARTITION OF {_quote(db, partition.table)} "
+        f"FOR VALUES FROM ('{_bound(partition.start)}') TO ('{_bound(partition.end)}')"
+    )
+
+
+def create_default_partition_sql(db: Session, table: str) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {_quote(db, table + '_default')} "
+        f"PARTITION OF {_quote(db, table)} DEFAULT"
+    )
+
+
+def _in_range(db: Session, partition: Partition) -> str:
+    column = _quote(db, PARTITION_COLUMN)
+    return f"{column} >= '{_bound(partition.start)}' AND {column} < '{_bound(partition.end)}'"
+
+
+def default_has_rows_sql(db: Session, partition: Partition) -> str:
+    return (
+        f"SELECT EXISTS (SELECT 1 FROM {_quote(db, partition.table + '_default')} "
+        f"WHERE {_in_range(db, partition)})"
+    )
+
+
+def move_from_default_sql(db: Session, partition: Partition) -> List[str]:
+    """Create ``partition`` detached, move its rows out of the default partition, attach it."""
+    name, table = _quote(db, partition.name), _quote(db, partition.table)
+    return [
+        f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)",
+        f"WITH moved AS (DELETE FROM {_quote(db, partition.table + '_default')} "
+        f"WHERE {_in_range(db, partition)} RETURNING *) INSERT INTO {name} SELECT * FROM moved",
+        f"ALTER TABLE {table} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{_bound(partition.start)}') TO ('{_bound(partition.end)}')",
+    ]
+
+
+def _before(db: Session, cutoff: datetime) -> str:
+    return f"{_quote(db, PARTITION_COLUMN)} < '{_bound(cutoff)}'"
+
+
+def default_has_expired_rows_sql(db: Session, table: str, cutoff: datetime) -> str:
+    return f"SELECT EXISTS (SELECT 1 FROM {_quote(db, table + '_default')} WHERE {_before(db, cutoff)})"
+
+
+def expire_from_default_sql(db: Session, table: str, cutoff: datetime, mode: str) -> List[str]:
+    """Delete the default partition's rows older than ``cutoff``, or move them to the archive schema."""
+    default = _quote(db, table + "_default")
+    if mode == "drop":
+        return [f"DELETE FROM {default} WHERE {_before(db, cutoff)}"]
+    archived = f"{_quote(db, RETENTION_ARCHIVE_SCHEMA)}.{default}"
+    return [
+        f"CREATE TABLE IF NOT EXISTS {archived} (LIKE {_quote(db, table)} INCLUDING DEFAULTS)",
+        f"WITH moved AS (DELETE FROM {default} WHERE {_before(db, cutoff)} RETURNING *) "
+        f"INSERT INTO {archived} SELECT * FROM moved",
+    ]
+
+
+def _claim(db: Session) -> bool:
+    """Take the maintenance lock for the current transaction; False if another worker holds it."""
+    if try_advisory_xact_lock(db, MAINTENANCE_LOCK):
+        return True
+    logger.info("Partition maintenance is running in another worker, skipping")
+    return False
+
+
+def existing_partitions(db: Session, table: str) -> List[str]:
+    return list(db.scalars(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table},
+    ))
+
+
+def partitioning_mismatch(db: Session, granularity: str = DB_PARTITIONING) -> Optional[str]:
+    """
+    Why the existing event tables do not fit ``granularity``, or None.
+
+    Tables are partitioned (or not) when they are created, by whatever
+    ``DB_PARTITIONING`` said at the time, and a later change of the setting
+    does not convert them. Partitions named for the other granularity are a
+    mismatch too. A database without the tables, or not on Postgres, always
+    fits.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    kinds = dict(db.execute(
+        text(
+            "SELECT relname, relkind FROM pg_class "
+            "WHERE relname = ANY(:tables) AND relkind IN ('r', 'p') AND pg_table_is_visible(oid)"
+        ),
+        {"tables": PARTITIONED_TABLES},
+    ).all())
+    if not kinds:
+        return None
+    partitioned = sorted(table for table, kind in kinds.items() if kind == "p")
+    if not granularity:
+        if partitioned:
+            return f"DB_PARTITIONING is off but {', '.join(partitioned)} are partitioned"
+        return None
+    if len(partitioned) < len(kinds):
+        plain = sorted(set(kinds) - set(partitioned))
+        return f"DB_PARTITIONING={granularity} but {', '.join(plain)} are not partitioned"
+    for table in partitioned:
+        for name in existing_partitions(db, table):
+            suffix = name[len(table) + 2:]
+            if name.startswith(f"{table}_p") and suffix.isdigit() and len(suffix) != _NAME_DIGITS[granularity]:
+                return f"DB_PARTITIONING={granularity} but {table} has partition {name}"
+    return None
+
+
+def ensure_partitions(
+    db: Session,
+    now: Optional[datetime] = None,
+    premake: int = PARTITION_PREMAKE,
+    since: Optional[datetime] = None,
+    granularity: str = DB_PARTITIONING,
+) -> List[str]:
+    """
+    Create missing partitions from the period of ``since`` (default: now)
+    through ``premake`` periods after the current one, and each table's
+    default partition. Rows already in the default partition are moved into
+    the range partition they belong to. Returns the names of the partitions
+    created.
+    """
+    now = as_utc(now or datetime.now(timezone.utc))
+    until = period_start(now, granularity)
+    for _ in range(premake):
+        until = next_period(until, granularity)
+
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = set(existing_partitions(db, table))
+        if f"{table}_default" not in existing:
+            if not _claim(db):
+                return created
+            db.execute(text(create_default_partition_sql(db, table)))
+            db.commit()
+        for partition in planned_partitions(table, since or now, until, granularity):
+            if partition.name in existing:
+                continue
+            if not _claim(db):
+                return created
+            if db.scalar(text(default_has_rows_sql(db, partition))):
+                for statement in move_from_default_sql(db, partition):
+                    db.execute(text(statement))
+                logger.info("Moved %s rows out of the default partition", partition.name)
+            else:
+                db.execute(text(create_partition_sql(db, partition)))
+            db.commit()
+            created.append(partition.name)
+    if created:
+        logger.info("Created partitions: %s", ", ".join(created))
+    return created
+
+
+def expire_partitions(
+    db: Session,
+    now: Optional[datetime] = None,
+    retention_days: int = RETENTION_DAYS,
+    mode: str = RETENTION_MODE,
+    granularity: str = DB_PARTITIONING,
+) -> List[str]:
+    """
+    Drop or archive partitions older than ``retention_days`` (0 disables),
+    then the default partitions' rows older than that. Returns the names of
+    the partitions expired.
+    """
+    if retention_days <= 0:
+        return []
+    if mode not in RETENTION_MODES:
+        raise ValueError(f"Unknown RETENTION_MODE '{mode}'")
+    cutoff = as_utc(now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+
+    if mode == "archive":
+        if not _claim(db):
+            return []
+        db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {_quote(db, RETENTION_ARCHIVE_SCHEMA)}"))
+        db.commit()
+
+    expired = []
+    for table in PARTITIONED_TABLES:
+        names = existing_partitions(db, table)
+        partitions = [
+            partition
+            for partition in (parse_partition(table, name, granularity) for name in names)
+            if partition is not None
+        ]
+        for partition in sorted(expired_partitions(partitions, cutoff)):
+            if not _claim(db):
+                return expired
+            name = _quote(db, partition.name)
+            db.execute(text(f"ALTER TABLE {_quote(db, table)} DETACH PARTITION {name}"))
+            if mode == "drop":
+                db.execute(text(f"DROP TABLE {name}"))
+            else:
+                db.execute(text(f"ALTER TABLE {name} SET SCHEMA {_quote(db, RETENTION_ARCHIVE_SCHEMA)}"))
+            db.commit()
+            expired.append(partition.name)
+        if f"{table}_default" in names and db.scalar(text(default_has_expired_rows_sql(db, table, cutoff))):
+            if not _claim(db):
+                return expired
+            for statement in expire_from_default_sql(db, table, cutoff, mode):
+                db.execute(text(statement))
+            db.commit()
+            logger.info("Expired rows of %s_default (%s)", table, mode)
+    if expired:
+        logger.info("Expired partitions (%s): %s", mode, ", ".join(expired))
+    return expired
+
+
+def run_partition_maintenance(
+    db: Session, now: Optional[datetime] = None, since: Optional[datetime] = None
+) -> None:
+    """
+    Create upcoming partitions (and, with ``since``, those back to its period),
+    then apply retention. No-op unless partitioning is on.
+    """
+    if not PARTITIONED:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect != "postgresql":
+        logger.warning("DB_PARTITIONING is set but %s has no declarative partitioning", dialect)
+        return
+    ensure_partitions(db, now, since=since)
+    expire_partitions(db, now)
@@ -0,0 +1,90 @@
+"""
+Event Readers
+
+Paged reads over the event tables using keyset (seek) pagination on
+``(event_time, event_id)``. Each page continues strictly after the last row
+of the previous one, so page N costs the same as page 1. OFFSET would instead
+re-read every earlier row.
+
+Cursors are opaque URL-safe strings that encode the last ``(event_time,
+event_id)`` of a page.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, tuple_
+
+from app.db.functions import as_utc
+
+from app.schemas.events.base import EventQuery
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(event_time: datetime, event_id: UUID) -> str:
+    raw = json.dumps([event_time.isoformat(), str(event_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        event_time, event_id = json.loads(raw)
+        return as_utc(event_time), UUID(event_id)
+    except (binascii.Error, ValueError, TypeError) as exc:
+        raise InvalidCursor("invalid pagination cursor") from exc
+
+
+def filter_events(
+    stmt,
+    model,
+    filters: Optional[Dict[str, Any]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    after: Optional[Tuple[datetime, UUID]] = None,
+):
+    """Apply equality filters, an event_time range and a keyset position; order by (event_time, event_id)."""
+    for name, value in (filters or {}).items():
+        if value is not None:
+            stmt = stmt.where(getattr(model, name) == value)
+    if start is not None:
+        stmt = stmt.where(model.event_time >= as_utc(start))
+    if end is not None:
+        stmt = stmt.where(model.event_time < as_utc(end))
+    if after is not None:
+        stmt = stmt.where(tuple_(model.event_time, model.event_id) > tuple_(*after))
+    return stmt.order_by(model.event_time, model.event_id)
+
+
+def _page_statement(model, query: EventQuery):
+    after = decode_cursor(query.cursor) if query.cursor else None
+    filters = {name: getattr(query, name) for name in query.filter_fields()}
+    stmt = filter_events(select(model), model, filters, query.start, query.end, after)
+    # One extra row tells us whether another page exists.
+    return stmt.limit(query.limit + 1)
+
+
+def _split_page(rows: List[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(as_utc(last.event_time), last.event_id)
+
+
+def read_events_page(db, model, query: EventQuery) -> Tuple[List[Any], Optional[str]]:
+    """One page of ``model`` rows plus the cursor for the next page (None on the last page)."""
+    rows = db.scalars(_page_statement(model, query)).all()
+    return _split_page(list(rows), query.limit)
+
+
+async def read_events_page_async(db, model, query: EventQuery) -> Tuple[List[Any], Optional[str]]:
+    """Async counterpart of ``read_events_page``."""
+    rows = (await db.scalars(_page_statement(model, query))).all()
+    return _split_page(list(rows), query.limit)
@@ -0,0 +1,177 @@
+"""
+Benchmark Runner
+
+Times the ingestion and analytics hot paths in-process and writes the results
+as JSON, so runs can be compared across commits:
+
+    python -m benchmarks.runner --json bench.json
+    python -m benchmarks.runner --suite queries --sizes 10000,1000000 --json big.json
+    python -m benchmarks.runner --json new.json --compare bench.json --threshold 0.15
+
+By default everything runs against a throwaway SQLite file. ``--database-url``
+points the run at another database (e.g. Postgres). The event tables are
+created there and **emptied between cases**, so only ever use a scratch database.
+
+Each case reports the median, min and p95 of its repeats. Cases that process
+many items also report per-item cost and throughput. ``--compare`` matches
+cases by name and parameters and exits non-zero if any median got slower by
+more than ``--threshold``.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+SUITES = ("ingestion", "validation", "inserts", "queries")
+
+
+def measure(
+    fn: Callable[[], Any],
+    repeat: int = 5,
+    setup: Optional[Callable[[], Any]] = None,
+) -> List[float]:
+    """Wall-clock seconds of ``repeat`` calls to ``fn``, each preceded by ``setup``."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def result(name: str, samples: List[float], items: int = 1, **params) -> Dict[str, Any]:
+    ordered = sorted(samples)
+    median = statistics.median(ordered)
+    p95 = ordered[max(math.ceil(0.95 * len(ordered)), 1) - 1]
+    entry = {
+        "name": name,
+        "params": params,
+        "repeat": len(ordered),
+        "items": items,
+        "median_s": round(median, 6),
+        "min_s": round(ordered[0], 6),
+        "p95_s": round(p95, 6),
+    }
+    if items > 1:
+        entry["per_item_us"] = round(median / items * 1e6, 3)
+        entry["items_per_s"] = round(items / median, 1) if median else None
+    return entry
+
+
+def _key(entry: Dict[str, Any]) -> str:
+    return entry["name"] + json.dumps(entry["params"], sort_keys=True)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Median ratios (current / baseline) for cases present in both runs."""
+    previous = {_key(entry): entry for entry in baseline["results"]}
+    rows = []
+    for entry in current["results"]:
+        before = previous.get(_key(entry))
+        if before is None or not before["median_s"]:
+            continue
+        ratio = entry["median_s"] / before["median_s"]
+        rows.append({
+            "name": entry["name"],
+            "params": entry["params"],
+            "baseline_s": before["median_s"],
+            "current_s": entry["median_s"],
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + threshold,
+        })
+    return rows
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the in-process benchmark suite.")
+    parser.add_argument("--suite", action="append", choices=SUITES,
+                        help="suite to run (repeatable; default: all)")
+    parser.add_argument("--database-url", help="scratch database (default: temporary SQLite file)")
+    parser.add_argument("--events", type=int, default=2000, help="events per ingestion/validation/insert case")
+    parser.add_argument("--sizes", default="10000", help="comma-separated table sizes for query cases")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before failing")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    tmpdir = None
+    database_url = args.database_url
+    if database_url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        database_url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    # The app reads DATABASE_URL at import time.
+    os.environ["DATABASE_URL"] = database_url
+
+    from benchmarks.suites import BenchContext, run_suites
+
+    context = BenchContext(
+        database_url,
+        events=args.events,
+        sizes=[int(size) for size in args.sizes.split(",") if size],
+        repeat=args.repeat,
+    )
+    try:
+        results = run_suites(context, args.suite or SUITES, progress=lambda entry: print(
+            f"{entry['name']:<40}{json.dumps(entry['params']):<40}{entry['median_s'] * 1000:>10.2f} ms",
+            file=sys.stderr,
+        ))
+    finally:
+        context.close()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dialect": context.dialect,
+            "events": args.events,
+            "sizes": context.sizes,
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            rows = compare(report, json.load(handle), args.threshold)
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['name']:<40}{json.dumps(row['params']):<40}x{row['ratio']:<8}{flag}")
+        if any(row["regression"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
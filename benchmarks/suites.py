@@ -0,0 +1,243 @@
+"""
+Benchmark Suites
+
+Cases for ``benchmarks.runner``:
+
+``ingestion``   single-event vs batch POSTs through ``TestClient``
+``validation``  Pydantic cost per ``*Create`` schema: per-item vs whole-list validation
+``inserts``     ORM ``add_all`` vs Core executemany vs ``write_events`` per model
+``queries``     hourly aggregation, aggregate reads and the default funnel at each size
+
+Payloads come from the simulator's generator, so field distributions (Zipfian
+products, funnel drop-off) match the load tests.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+import app.db.models  # noqa: F401  (register every table)
+from app.analytics.queries import DEFAULT_FUNNEL, funnel_counts
+from app.db.base import Base
+from app.db.session import engine_options
+from app.services.ingestion.bulk_loader import write_events
+from app.services.ingestion.event_router import EVENT_TYPES
+from app.services.ingestion.validators import validate_batch
+from app.services.persistence.aggregates import (
+    count_events_by_hour,
+    read_hourly_counts,
+    upsert_hourly_counts,
+)
+from app.services.persistence.event_writer import insert_events
+from benchmarks.runner import measure, result
+from simulator.event_generator import EventGenerator
+
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+SEED_BATCH = 5000
+
+
+class BenchContext:
+    """Scratch database plus run parameters shared by the suites."""
+
+    def __init__(self, database_url: str, events: int = 2000, sizes: Sequence[int] = (10_000,), repeat: int = 5):
+        self.engine = create_engine(database_url, **engine_options(database_url))
+        Base.metadata.create_all(bind=self.engine)
+        self.sessions = sessionmaker(bind=self.engine, autoflush=False)
+        self.dialect = self.engine.dialect.name
+        self.events = events
+        self.sizes = list(sizes)
+        self.repeat = repeat
+
+    def reset(self) -> None:
+        """Empty every table (children first)."""
+        with self.engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables):
+                connection.execute(delete(table))
+
+    def close(self) -> None:
+        self.engine.dispose()
+
+
+def generate_payloads(endpoint: str, count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """``count`` generated payloads for one event type."""
+    generator = EventGenerator(seed=seed, clock=BASE_TIME)
+    payloads: List[Dict[str, Any]] = []
+    while len(payloads) < count:
+        payloads.extend(payload for name, payload in generator.session() if name == endpoint)
+    return payloads[:count]
+
+
+def validated_rows(endpoint: str, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    accepted, _ = validate_batch(EVENT_TYPES[endpoint].schema, payloads)
+    return [item.model_dump() for _, item in accepted]
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# --------------------------------------------------------------------------- #
+# Suites
+# --------------------------------------------------------------------------- #
+def bench_ingestion(ctx: BenchContext) -> List[Dict[str, Any]]:
+    from fastapi.testclient import TestClient
+
+    from app.db import get_db
+    from app.main import app
+
+    def override_get_db():
+        with ctx.sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(app)  # no lifespan: background services stay off
+    payloads = generate_payloads("user-behavior", ctx.events)
+    repeat = max(ctx.repeat // 2, 1)
+
+    def single():
+        for payload in payloads:
+            client.post("/api/v1/events/user-behavior", json=payload)
+
+    results = [result("ingest.single", measure(single, repeat, ctx.reset), len(payloads))]
+    for batch_size in (100, 1000):
+        def batched(batch_size=batch_size):
+            for chunk in _chunks(payloads, batch_size):
+                client.post("/api/v1/events/user-behavior/batch", json=chunk)
+        results.append(result(
+            "ingest.batch", measure(batched, repeat, ctx.reset), len(payloads), batch_size=batch_size,
+        ))
+    app.dependency_overrides.pop(get_db, None)
+    return results
+
+
+def bench_validation(ctx: BenchContext) -> List[Dict[str, Any]]:
+    results = []
+    for endpoint, event_type in EVENT_TYPES.items():
+        payloads = generate_payloads(endpoint, ctx.events)
+        schema = event_type.schema
+
+        def per_item():
+            for payload in payloads:
+                schema.model_validate(payload)
+
+        results.append(result(
+            "validate.per_item", measure(per_item, ctx.repeat), len(payloads), type=endpoint,
+        ))
+        results.append(result(
+            "validate.batch", measure(lambda: validate_batch(schema, payloads), ctx.repeat),
+            len(payloads), type=endpoint,
+        ))
+    return results
+
+
+def bench_inserts(ctx: BenchContext) -> List[Dict[str, Any]]:
+    results = []
+    for endpoint, event_type in EVENT_TYPES.items():
+        model = event_type.model
+        rows = validated_rows(endpoint, generate_payloads(endpoint, ctx.events))
+
+        def orm():
+            with ctx.sessions() as db:
+                db.add_all([model(**row) for row in rows])
+                db.commit()
+
+        def writer(write: Callable):
+            def run():
+                with ctx.sessions() as db:
+                    write(db, model, rows)
+                    db.commit()
+            return run
+
+        for name, fn in (
+            ("insert.orm", orm),
+            ("insert.core", writer(insert_events)),
+            ("insert.bulk", writer(write_events)),  # COPY on Postgres
+        ):
+            results.append(result(name, measure(fn, ctx.repeat, ctx.reset), len(rows), type=endpoint))
+    return results
+
+
+def seed_events(ctx: BenchContext, behavior_rows: int, seed: int = 7) -> datetime:
+    """
+    Fill the tables with generated journeys until ``user_behavior_events``
+    holds ``behavior_rows`` rows. Sessions are spread over time.
+    Returns the end of the seeded time range.
+    """
+    generator = EventGenerator(seed=seed, clock=BASE_TIME)
+    buffers: Dict[str, List[Dict[str, Any]]] = {name: [] for name in EVENT_TYPES}
+    seeded = 0
+
+    def flush(endpoint: str) -> None:
+        rows = validated_rows(endpoint, buffers[endpoint])
+        buffers[endpoint] = []
+        with ctx.sessions() as db:
+            write_events(db, EVENT_TYPES[endpoint].model, rows)
+            db.commit()
+
+    while seeded < behavior_rows:
+        generator.clock += timedelta(seconds=5)
+        for endpoint, payload in generator.session():
+            if endpoint == "user-behavior":
+                if seeded >= behavior_rows:
+                    continue
+                seeded += 1
+            buffers[endpoint].append(payload)
+            if len(buffers[endpoint]) >= SEED_BATCH:
+                flush(endpoint)
+    for endpoint, buffer in buffers.items():
+        if buffer:
+            flush(endpoint)
+    return generator.clock + timedelta(days=3)
+
+
+def bench_queries(ctx: BenchContext) -> List[Dict[str, Any]]:
+    results = []
+    for size in ctx.sizes:
+        ctx.reset()
+        end = seed_events(ctx, size)
+        with ctx.sessions() as db:
+            counts = count_events_by_hour(db)
+            upsert_hourly_counts(db, counts, replace=True)
+            db.commit()
+
+            results.append(result(
+                "query.aggregate_by_hour", measure(lambda: count_events_by_hour(db), ctx.repeat), rows=size,
+            ))
+            results.append(result(
+                "query.read_hourly", measure(lambda: read_hourly_counts(db, BASE_TIME, end), ctx.repeat),
+                rows=size,
+            ))
+            results.append(result(
+                "query.funnel",
+                measure(
+                    lambda: funnel_counts(db, DEFAULT_FUNNEL, BASE_TIME, end, timedelta(hours=72)),
+                    ctx.repeat,
+                ),
+                rows=size,
+            ))
+    return results
+
+
+SUITE_FUNCTIONS: Dict[str, Callable[[BenchContext], List[Dict[str, Any]]]] = {
+    "ingestion": bench_ingestion,
+    "validation": bench_validation,
+    "inserts": bench_inserts,
+    "queries": bench_queries,
+}
+
+
+def run_suites(
+    ctx: BenchContext,
+    suites: Iterable[str],
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    results = []
+    for suite in suites:
+        for entry in SUITE_FUNCTIONS[suite](ctx):
+            if progress is not None:
+                progress(entry)
+            results.append(entry)
+    ctx.reset()
+    return results
@@ -0,0 +1,92 @@
+"""
+Alembic environment.
+
+Migrations run against ``DATABASE_URL`` (``app.core.config``) unless the
+caller passes a connection in ``config.attributes["connection"]`` (tests,
+``scripts/init_db.py``), and autogenerate compares against the models
+registered on ``app.db.base.Base``.
+
+SQLite cannot ``ALTER`` most things in place, so migrations are rendered in
+batch mode there; Postgres runs them as plain DDL, in one transaction.
+
+Revisions read ``DB_PARTITIONING`` when they run, so nothing runs against
+event tables created under another setting (``partitioning_mismatch``).
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Session
+
+from app.core.config import DATABASE_URL
+from app.db.base import Base
+import app.db.models  # noqa: F401  (registers every table on Base.metadata)
+from app.services.persistence.partitions import partitioning_mismatch
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def _database_url() -> str:
+    return config.get_main_option("sqlalchemy.url") or DATABASE_URL
+
+
+def _compare_type(context, inspected_column, metadata_column, inspected_type, metadata_type):
+    """SQLite stores the Postgres ``UUID`` columns with NUMERIC affinity; that is not a change."""
+    if context.dialect.name == "sqlite" and isinstance(metadata_type, UUID):
+        return False
+    return None  # default comparison
+
+
+def _configure(**kwargs) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        compare_type=_compare_type,
+        **kwargs,
+    )
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL to stdout instead of running it (``--sql``)."""
+    url = _database_url()
+    _configure(
+        url=url,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=url.startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run(connection) -> None:
+    mismatch = partitioning_mismatch(Session(bind=connection))
+    if mismatch:
+        raise RuntimeError(f"{mismatch}; restore the DB_PARTITIONING the schema was created with")
+    _configure(connection=connection, render_as_batch=connection.dialect.name == "sqlite")
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    engine = create_engine(_database_url(), poolclass=pool.NullPool)
+    try:
+        with engine.connect() as connection:
+            _run(connection)
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,150 @@
+"""initial schema
+
+The schema as it stood before migrations were introduced: the six event
+tables and the hourly aggregate, exactly as ``create_all`` made them. A
+database created that way is adopted with ``scripts.init_db --stamp``
+(which stamps this revision) and then upgraded like any other.
+
+On a fresh database the event tables follow ``DB_PARTITIONING`` when this
+revision runs (see ``app/db/partitioning.py``): partitioned tables get
+``event_time`` in their primary key, ``PARTITION BY RANGE (event_time)``,
+and a plain index on ``order_events.order_id`` instead of its unique
+constraint. Existing tables are never converted, and ``migrations/env.py``
+refuses to migrate tables whose layout no longer matches the setting.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 22:40:00.718953
+"""
+from typing import Any, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.db.partitioning import PARTITIONED, partition_key, partitioned_table_args
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ENUMS = {
+    "userbehavioreventtype": ("product_viewed", "product_searched"),
+    "orderstatus": ("pending", "confirmed", "shipped", "cancelled"),
+    "logisticsstatus": ("picked_up", "in_transit", "out_for_delivery", "delivered", "delayed"),
+}
+
+
+def _event_table(name: str, *columns: Any) -> None:
+    """An event table: ``event_id`` + ``columns``, keyed for ``DB_PARTITIONING``."""
+    options = partitioned_table_args()  # () or ({"postgresql_partition_by": ...},)
+    op.create_table(
+        name,
+        sa.Column("event_id", postgresql.UUID(as_uuid=True), nullable=False),
+        *columns,
+        sa.PrimaryKeyConstraint("event_id", *partition_key()),
+        **(options[-1] if options else {}),
+    )
+
+
+def _index(table: str, name: str, *columns: str, unique: bool = False) -> None:
+    op.create_index(name, table, list(columns), unique=unique)
+
+
+def upgrade() -> None:
+    _event_table(
+        "user_behavior_events",
+        sa.Column("event_type", sa.Enum(*ENUMS["userbehavioreventtype"], name="userbehavioreventtype"), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True, comment="Nullable to support guest users"),
+        sa.Column("event_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("ingested_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.String(), nullable=False),
+        sa.Column("country", sa.String(), nullable=True),
+        sa.Column("source", sa.String(), nullable=True),
+        sa.Column("platform", sa.String(), nullable=True),
+    )
+    _index("user_behavior_events", "idx_user_behavior_user_time", "user_id", "event_time")
+    _index("user_behavior_events", "idx_user_behavior_product_time", "product_id", "event_time")
+
+    _event_table(
+        "cart_events",
+        sa.Column("correlation_id", sa.String(), nullable=False, comment="Maps to session_id"),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("event_time", sa.DateTime(timezone=True), nullable=False),
+    )
+    _index("cart_events", "idx_cart_user_time", "user_id", "event_time")
+
+    _event_table(
+        "order_events",
+        sa.Column("order_id", sa.String(), nullable=False, comment="Maps to InvoiceNo"),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("status", sa.Enum(*ENUMS["orderstatus"], name="orderstatus"), nullable=False),
+        sa.Column("country", sa.String(), nullable=True),
+        sa.Column("event_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("ingested_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        *(() if PARTITIONED else (sa.UniqueConstraint("order_id"),)),
+    )
+    if PARTITIONED:
+        _index("order_events", "idx_order_order_id", "order_id")
+
+    _event_table(
+        "order_item_events",
+        sa.Column("order_id", sa.String(), nullable=False),
+        sa.Column("product_id", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("price_at_purchase", sa.Integer(), nullable=False, comment="Price in cents/pence"),
+        sa.Column("event_time", sa.DateTime(timezone=True), nullable=False),
+    )
+    _index("order_item_events", "ix_order_item_events_order_id", "order_id")
+
+    _event_table(
+        "payment_events",
+        sa.Column("order_id", sa.String(), nullable=False),
+        sa.Column("amount", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("event_time", sa.DateTime(timezone=True), nullable=False),
+    )
+    _index("payment_events", "ix_payment_events_order_id", "order_id")
+
+    _event_table(
+        "logistics_events",
+        sa.Column("order_id", sa.String(), nullable=False),
+        sa.Column("status", sa.Enum(*ENUMS["logisticsstatus"], name="logisticsstatus"), nullable=False),
+        sa.Column("event_time", sa.DateTime(timezone=True), nullable=False),
+    )
+    _index("logistics_events", "ix_logistics_events_order_id", "order_id")
+
+    op.create_table(
+        "hourly_product_behavior_agg",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("event_hour", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("view_count", sa.Integer(), nullable=False),
+        sa.Column("search_count", sa.Integer(), nullable=False),
+        sa.Column("total_events", sa.Integer(), nullable=False),
+        sa.Column("last_updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    _index("hourly_product_behavior_agg", "idx_hourly_product_time", "product_id", "event_hour", unique=True)
+
+
+def downgrade() -> None:
+    for table in (
+        "hourly_product_behavior_agg",
+        "logistics_events",
+        "payment_events",
+        "order_item_events",
+        "order_events",
+        "cart_events",
+        "user_behavior_events",
+    ):
+        op.drop_table(table)  # drops the table's indexes (and partitions) with it
+    bind = op.get_bind()
+    for name in ENUMS:
+        sa.Enum(name=name).drop(bind, checkfirst=True)
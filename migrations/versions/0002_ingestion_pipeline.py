@@ -0,0 +1,131 @@
+"""ingestion pipeline columns and state tables
+
+Everything the ingestion pipeline added on top of the initial schema:
+
+- ``idempotency_key`` and its unique index on every event table (dedup);
+- ``(event_time, event_id)`` indexes for keyset pagination and retention,
+  ``ingested_at`` on behavior events for the incremental aggregator, and
+  ``(user_id, event_time)`` on orders;
+- ``actor_id`` and ``server_session_id`` on behavior and cart events
+  (identity resolution, sessionization), plus their state tables
+  ``identity_links`` and ``actor_sessions``;
+- the enrichment columns of behavior events;
+- ``aggregation_watermarks``.
+
+All new columns are nullable, so existing rows are kept as they are.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 22:41:00.000000
+"""
+from typing import Iterator, List, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.partitioning import partition_key
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> prefix of its index names
+EVENT_TABLES = {
+    "user_behavior_events": "user_behavior",
+    "cart_events": "cart",
+    "order_events": "order",
+    "order_item_events": "order_item",
+    "payment_events": "payment",
+    "logistics_events": "logistics",
+}
+
+# table -> {index name: columns}, on top of the unique idempotency key and the time index
+EXTRA_INDEXES = {
+    "user_behavior_events": {
+        "idx_user_behavior_ingested_at": ("ingested_at",),
+        "idx_user_behavior_actor_time": ("actor_id", "event_time"),
+        "idx_user_behavior_server_session": ("server_session_id", "event_time"),
+        "idx_user_behavior_category_time": ("product_category", "event_time"),
+    },
+    "cart_events": {
+        "idx_cart_actor_time": ("actor_id", "event_time"),
+        "idx_cart_server_session": ("server_session_id", "event_time"),
+    },
+    "order_events": {
+        "idx_order_user_time": ("user_id", "event_time"),
+    },
+}
+
+
+def _columns(table: str) -> List[sa.Column]:
+    """Columns this revision adds to ``table`` (fresh objects on every call)."""
+    columns = [sa.Column("idempotency_key", sa.String(length=128), nullable=True)]
+    if table in ("user_behavior_events", "cart_events"):
+        columns += [
+            sa.Column("actor_id", sa.String(), nullable=True, comment="Assigned by ingestion/identity.py"),
+            sa.Column("server_session_id", sa.String(length=36), nullable=True,
+                      comment="Assigned by ingestion/sessionizer.py"),
+        ]
+    if table == "user_behavior_events":
+        columns += [
+            sa.Column(name, sa.String(), nullable=True)
+            for name in ("device_type", "traffic_source", "page_type", "product_category")
+        ]
+    return columns
+
+
+def _indexes(table: str, prefix: str) -> Iterator[Tuple[str, Sequence[str], bool]]:
+    """``(name, columns, unique)`` for every index this revision adds to ``table``."""
+    yield f"uq_{prefix}_idempotency_key", partition_key("idempotency_key"), True
+    yield f"idx_{prefix}_time", ("event_time", "event_id"), False
+    for name, columns in EXTRA_INDEXES.get(table, {}).items():
+        yield name, columns, False
+
+
+def upgrade() -> None:
+    for table, prefix in EVENT_TABLES.items():
+        with op.batch_alter_table(table) as batch:
+            for column in _columns(table):
+                batch.add_column(column)
+        for name, index_columns, unique in _indexes(table, prefix):
+            op.create_index(name, table, list(index_columns), unique=unique)
+
+    op.create_table(
+        "aggregation_watermarks",
+        sa.Column("job_name", sa.String(), nullable=False),
+        sa.Column("watermark", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("job_name"),
+    )
+
+    op.create_table(
+        "actor_sessions",
+        sa.Column("actor", sa.String(), nullable=False, comment="actor_id, see ingestion/identity.py"),
+        sa.Column("session_id", sa.String(length=36), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_event_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("actor"),
+    )
+
+    op.create_table(
+        "identity_links",
+        sa.Column("anonymous_id", sa.String(), nullable=False),
+        sa.Column("actor_id", sa.String(), nullable=False, comment="user:<user_id>"),
+        sa.Column("linked_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("anonymous_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("identity_links")
+    op.drop_table("actor_sessions")
+    op.drop_table("aggregation_watermarks")
+
+    for table, prefix in EVENT_TABLES.items():
+        for name, _, _ in _indexes(table, prefix):
+            op.drop_index(name, table_name=table)
+        with op.batch_alter_table(table) as batch:
+            for column in reversed(_columns(table)):
+                batch.drop_column(column.name)
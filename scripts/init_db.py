@@ -0,0 +1,122 @@
+"""
+Create or upgrade the database schema.
+
+    python -m scripts.init_db                   # upgrade to the latest revision
+    python -m scripts.init_db --revision 0001   # upgrade to a given revision
+    python -m scripts.init_db --sql > schema.sql
+    python -m scripts.init_db --stamp           # adopt a pre-migrations database
+    python -m scripts.init_db --recompute-hours 2
+    python -m scripts.init_db --partitions-since 2023-01-01
+
+Run it once per deploy, before the API workers start: the workers no longer
+create tables themselves (unless ``DB_AUTO_CREATE=true``). Revisions live in
+``migrations/`` next to ``alembic.ini``, so plain ``alembic`` commands
+(``downgrade``, ``history``, ``revision --autogenerate``) work as well.
+
+``--stamp`` records a database whose tables were created by ``create_all``
+as being at ``--revision`` without running any DDL. Its tables must match
+that revision. Without ``--revision`` it stamps ``BASELINE_REVISION``, the
+schema from before migrations existed; run the script again without
+``--stamp`` to upgrade it from there.
+
+Revision 0001 creates the event tables partitioned or not according to
+``DB_PARTITIONING`` at the time it runs, and nothing converts them later.
+When the setting no longer matches the existing tables, every migration
+command (this script, ``alembic upgrade``, ``alembic check``...) fails
+before touching the schema; restore the setting the tables were made with.
+
+With ``DB_PARTITIONING`` set, partition maintenance runs after the upgrade,
+so the current and upcoming partitions exist before the first insert.
+``--partitions-since`` also creates the partitions back to that date; run it
+before backfilling history, or its rows land in the default partition.
+
+``--recompute-hours`` rebuilds the most recent hourly aggregates from raw
+events (``AGGREGATOR_MODE=inmemory``). Running it here, while no worker holds
+unflushed increments, is what makes it safe with several API workers.
+"""
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+
+from app.core.config import AGGREGATOR_MODE
+from app.db.functions import as_utc
+from app.db.partitioning import PARTITIONED
+from app.db.session import SessionLocal, engine
+from app.services.persistence.aggregates import recompute_recent_hours
+from app.services.persistence.partitions import run_partition_maintenance
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+# Revision matching databases created by create_all before migrations existed
+BASELINE_REVISION = "0001"
+
+
+def alembic_config(connection=None, configure_logger: bool = True) -> Config:
+    """Alembic config for this repo; runs on ``connection`` when one is given."""
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["connection"] = connection
+    config.attributes["configure_logger"] = configure_logger
+    return config
+
+
+def upgrade(connection, revision: str = "head", configure_logger: bool = True) -> None:
+    command.upgrade(alembic_config(connection, configure_logger), revision)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--revision", help=f"target revision (default: head, or {BASELINE_REVISION} with --stamp)"
+    )
+    parser.add_argument("--sql", action="store_true", help="print the migration SQL instead of running it")
+    parser.add_argument("--stamp", action="store_true", help="mark the database as at --revision, run no DDL")
+    parser.add_argument(
+        "--recompute-hours", type=int, default=0, metavar="N",
+        help="rebuild the last N hourly aggregates from raw events (inmemory aggregation only)",
+    )
+    parser.add_argument(
+        "--partitions-since", type=datetime.fromisoformat, metavar="DATE",
+        help="also create the partitions from DATE on, e.g. before a backfill (DB_PARTITIONING only)",
+    )
+    args = parser.parse_args(argv)
+    if args.revision is None:
+        args.revision = BASELINE_REVISION if args.stamp else "head"
+    if args.recompute_hours and AGGREGATOR_MODE != "inmemory":
+        parser.error("--recompute-hours needs AGGREGATOR_MODE=inmemory")
+    if args.partitions_since is not None:
+        if not PARTITIONED:
+            parser.error("--partitions-since needs DB_PARTITIONING")
+        args.partitions_since = as_utc(args.partitions_since)
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.sql:
+        command.upgrade(alembic_config(), args.revision, sql=True)
+        return 0
+
+    with engine.begin() as connection:
+        config = alembic_config(connection)
+        if args.stamp:
+            command.stamp(config, args.revision)
+        else:
+            command.upgrade(config, args.revision)
+
+    if PARTITIONED:
+        with SessionLocal() as db:
+            run_partition_maintenance(db, since=args.partitions_since)
+    if args.recompute_hours:
+        with SessionLocal() as db:
+            written = recompute_recent_hours(db, args.recompute_hours)
+        print(f"Recomputed {written} product-hours")
+    print(f"{engine.url.render_as_string(hide_password=True)}: schema at {args.revision}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Bulk-load historical event files into the database.
+
+    python -m scripts.seed_data events.ndjson.gz carts.csv --type cart
+    python -m scripts.seed_data history/*.ndjson --workers 8 --checkpoint backfill.ckpt
+
+Records carry their event type in a ``"type"`` field (``user-behavior``,
+``cart``, ``order``, ``order-item``, ``payment``, ``logistics``); ``--type``
+sets it for records that don't. Rejected records are written as NDJSON to
+``--rejects`` (file, line, type, errors) and counted in the summary.
+
+With ``--workers`` > 1 or ``--checkpoint``, files are split into line-aligned
+chunks and loaded by a process pool, one transaction per chunk. Rerunning the
+same command with the same checkpoint file skips completed chunks; the
+checkpoint refuses a different ``--chunk-mb``.
+
+Once the files are loaded, and with ``DB_PARTITIONING`` set, partitions are
+created back to the earliest loaded ``event_time``, which moves the history
+out of the default partition. Creating them beforehand (``scripts.init_db
+--partitions-since``) avoids that move. The hourly aggregates are then
+rebuilt over the ``event_time`` range of the loaded behavior events
+(``refresh_aggregates``).
+"""
+import argparse
+import json
+import sys
+
+from app.core.config import BULK_LOAD_BATCH_SIZE, BULK_LOAD_CHUNK_MB, BULK_LOAD_WORKERS, DATABASE_URL
+from app.db.partitioning import PARTITIONED
+from app.db.session import SessionLocal
+from app.services.ingestion.bulk_loader import BulkLoader, LoadStats, iter_file, refresh_aggregates
+from app.services.ingestion.event_router import EVENT_TYPES
+from app.services.ingestion.parallel_loader import load_parallel
+from app.services.persistence.partitions import run_partition_maintenance
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("files", nargs="+", help="NDJSON/CSV event files, optionally .gz")
+    parser.add_argument("--type", choices=sorted(EVENT_TYPES), help="event type for records without one")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="input format (default: from file name)")
+    parser.add_argument("--batch-size", type=int, default=BULK_LOAD_BATCH_SIZE)
+    parser.add_argument("--rejects", help="write rejected records to this NDJSON file")
+    parser.add_argument("--workers", type=int, default=BULK_LOAD_WORKERS, help="loader processes")
+    parser.add_argument("--chunk-mb", type=int, default=BULK_LOAD_CHUNK_MB, help="target chunk size")
+    parser.add_argument("--checkpoint", help="resumable checkpoint file for chunked loads")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    rejects = open(args.rejects, "w", encoding="utf-8") if args.rejects else None
+    total = LoadStats()
+
+    def write_reject(path, line, type_name, errors):
+        if rejects is not None:
+            rejects.write(json.dumps(
+                {"file": path, "line": line, "type": type_name, "errors": errors},
+                default=str,
+            ) + "\n")
+
+    try:
+        if args.workers > 1 or args.checkpoint:
+            total = load_parallel(
+                args.files,
+                DATABASE_URL,
+                workers=args.workers,
+                fmt=args.format,
+                default_type=args.type,
+                batch_size=args.batch_size,
+                chunk_bytes=args.chunk_mb << 20,
+                checkpoint_path=args.checkpoint,
+                on_reject=write_reject,
+            )
+        else:
+            for path in args.files:
+                loader = BulkLoader(
+                    SessionLocal, args.batch_size, args.type,
+                    lambda line, type_name, errors, path=path: write_reject(path, line, type_name, errors),
+                )
+                stats = loader.load(iter_file(path, args.format))
+                total.merge(stats)
+                total.elapsed_seconds += stats.elapsed_seconds
+                print(
+                    f"{path}: {stats.loaded} loaded, {stats.rejected} rejected "
+                    f"in {stats.elapsed_seconds:.1f}s ({stats.rows_per_second:,.0f} rows/s)"
+                )
+    finally:
+        if rejects is not None:
+            rejects.close()
+
+    if PARTITIONED and total.first_event_time is not None:
+        with SessionLocal() as db:
+            run_partition_maintenance(db, since=total.first_event_time)
+    with SessionLocal() as db:
+        refreshed = refresh_aggregates(db, total)
+    if refreshed:
+        print(f"Rebuilt {refreshed} hourly product aggregates")
+    print(json.dumps(total.as_dict(), indent=2))
+    return 1 if total.rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
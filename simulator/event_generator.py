@@ -0,0 +1,207 @@
+"""
+Synthetic Event Generator
+
+Produces realistic shopper journeys as ``(endpoint, payload)`` pairs that can
+be POSTed to ``/api/v1/events/{endpoint}`` unchanged:
+
+    views / searches  ->  cart adds / removes  ->  order + order items
+                      ->  payment  ->  logistics status progression
+
+Product popularity follows a Zipf distribution, so a few products receive most
+of the traffic, as in real catalogs. Funnel drop-off between stages is
+controlled by the ``*_rate`` attributes. Generation is deterministic for a
+given ``seed``.
+"""
+import bisect
+import itertools
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+COUNTRIES = ("IN", "US", "GB", "DE", "BR", "SG")
+SOURCES = ("direct", "search", "ads", "email", "social")
+PLATFORMS = ("web", "android", "ios")
+
+# Logistics statuses in delivery order; "delayed" may be inserted before delivery.
+DELIVERY_PROGRESSION = ("picked_up", "in_transit", "out_for_delivery", "delivered")
+
+
+class SimEvent(NamedTuple):
+    endpoint: str                # URL slug, e.g. "user-behavior"
+    payload: Dict[str, Any]
+
+
+class ZipfSampler:
+    """Draws ranks 0..n-1 with probability proportional to 1 / (rank + 1) ** exponent."""
+
+    def __init__(self, n: int, exponent: float = 1.1, rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
+        self._cumulative = list(itertools.accumulate(1.0 / (rank + 1) ** exponent for rank in range(n)))
+        self._total = self._cumulative[-1]
+
+    def sample(self) -> int:
+        return bisect.bisect_left(self._cumulative, self.rng.random() * self._total)
+
+
+class EventGenerator:
+    """
+    Generates whole user sessions. Event times are spread over the session
+    starting at ``clock`` (now, by default), so every session is internally
+    ordered the way the funnel expects.
+    """
+
+    views_per_session = (1, 8)
+    search_rate = 0.3
+    cart_rate = 0.35
+    remove_rate = 0.15
+    order_rate = 0.45
+    cancel_rate = 0.05
+    payment_failure_rate = 0.08
+    delivery_rate = 0.9
+    delay_rate = 0.1
+
+    def __init__(
+        self,
+        n_products: int = 10_000,
+        n_users: int = 50_000,
+        zipf_exponent: float = 1.1,
+        guest_ratio: float = 0.2,
+        seed: Optional[int] = None,
+        clock: Optional[datetime] = None,
+    ):
+        self.rng = random.Random(seed)
+        self.products = ZipfSampler(n_products, zipf_exponent, self.rng)
+        self.n_users = n_users
+        self.guest_ratio = guest_ratio
+        self.clock = clock
+        # Stable per-product prices (smallest currency unit)
+        self._prices = [self.rng.randint(199, 99_999) for _ in range(n_products)]
+
+    def _now(self) -> datetime:
+        return self.clock or datetime.now(timezone.utc)
+
+    def _uuid(self) -> str:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4).hex
+
+    def product(self) -> int:
+        """A product id (1-based) drawn from the popularity distribution."""
+        return self.products.sample() + 1
+
+    def session(self) -> List[SimEvent]:
+        """One shopper journey, in event-time order."""
+        rng = self.rng
+        user_id = None if rng.random() < self.guest_ratio else rng.randint(1, self.n_users)
+        session_id = f"sess-{self._uuid()[:16]}"
+        context = {
+            "country": rng.choice(COUNTRIES),
+            "source": rng.choice(SOURCES),
+            "platform": rng.choice(PLATFORMS),
+        }
+        t = self._now()
+        events: List[SimEvent] = []
+
+        def at(seconds: float) -> str:
+            nonlocal t
+            t += timedelta(seconds=seconds)
+            return t.isoformat()
+
+        viewed = []
+        for _ in range(rng.randint(*self.views_per_session)):
+            product_id = self.product()
+            viewed.append(product_id)
+            event_type = "product_searched" if rng.random() < self.search_rate else "product_viewed"
+            events.append(SimEvent("user-behavior", {
+                "event_type": event_type,
+                "user_id": user_id,
+                "event_time": at(rng.uniform(2, 60)),
+                "product_id": product_id,
+                "session_id": session_id,
+                **context,
+            }))
+
+        carted = []
+        for product_id in dict.fromkeys(viewed):
+            if rng.random() >= self.cart_rate:
+                continue
+            quantity = rng.choice((1, 1, 1, 2, 3))
+            events.append(SimEvent("cart", {
+                "correlation_id": session_id,
+                "user_id": user_id,
+                "product_id": product_id,
+                "action": "add",
+                "quantity": quantity,
+                "event_time": at(rng.uniform(5, 120)),
+            }))
+            if rng.random() < self.remove_rate:
+                events.append(SimEvent("cart", {
+                    "correlation_id": session_id,
+                    "user_id": user_id,
+                    "product_id": product_id,
+                    "action": "remove",
+                    "quantity": quantity,
+                    "event_time": at(rng.uniform(5, 300)),
+                }))
+            else:
+                carted.append((product_id, quantity))
+
+        if carted and rng.random() < self.order_rate:
+            events.extend(self._order(user_id, carted, context["country"], at))
+        return events
+
+    def _order(self, user_id, carted, country, at) -> List[SimEvent]:
+        rng = self.rng
+        order_id = f"ORD-{self._uuid()[:12].upper()}"
+        cancelled = rng.random() < self.cancel_rate
+        ordered_at = at(rng.uniform(10, 600))
+        events = [SimEvent("order", {
+            "order_id": order_id,
+            "user_id": user_id,
+            "status": "cancelled" if cancelled else "confirmed",
+            "country": country,
+            "event_time": ordered_at,
+        })]
+        total = 0
+        for product_id, quantity in carted:
+            price = self._prices[product_id - 1]
+            total += price * quantity
+            events.append(SimEvent("order-item", {
+                "order_id": order_id,
+                "product_id": str(product_id),
+                "quantity": quantity,
+                "price_at_purchase": price,
+                "event_time": ordered_at,
+            }))
+        if cancelled:
+            return events
+
+        if rng.random() < self.payment_failure_rate:
+            events.append(SimEvent("payment", {
+                "order_id": order_id, "amount": total, "status": "failed",
+                "event_time": at(rng.uniform(5, 60)),
+            }))
+            if rng.random() < 0.5:
+                return events  # abandoned after the failure
+        events.append(SimEvent("payment", {
+            "order_id": order_id, "amount": total, "status": "success",
+            "event_time": at(rng.uniform(5, 60)),
+        }))
+
+        if rng.random() >= self.delivery_rate:
+            return events
+        for status in DELIVERY_PROGRESSION:
+            if status == "delivered" and rng.random() < self.delay_rate:
+                events.append(SimEvent("logistics", {
+                    "order_id": order_id, "status": "delayed",
+                    "event_time": at(rng.uniform(3600, 86_400)),
+                }))
+            events.append(SimEvent("logistics", {
+                "order_id": order_id, "status": status,
+                "event_time": at(rng.uniform(1800, 43_200)),
+            }))
+        return events
+
+    def stream(self) -> Iterator[SimEvent]:
+        """An endless stream of events, session after session."""
+        while True:
+            yield from self.session()
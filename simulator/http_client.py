@@ -0,0 +1,176 @@
+"""
+Async HTTP Load Client
+
+Drives the ingestion API at a target request rate over a pooled
+``httpx.AsyncClient`` and records per-endpoint latency.
+
+Load is open-loop: request *i* is scheduled at ``start + i / rate`` whether or
+not earlier requests have finished, with at most ``concurrency`` in flight.
+Latency is measured from the scheduled time, not from when the request was
+actually sent. When the server falls behind, queueing delay shows up in the
+percentiles instead of silently lowering the offered load (coordinated
+omission).
+"""
+import asyncio
+import math
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import httpx
+
+API_PREFIX = "/api/v1/events"
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class LatencyRecorder:
+    """Latencies and status counts per endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, endpoint: str, seconds: float, status_code: Optional[int]) -> None:
+        self.latencies[endpoint].append(seconds)
+        if status_code is None or status_code >= 400:
+            self.errors[endpoint] += 1
+        if status_code is not None:
+            self.statuses[endpoint][status_code] += 1
+
+    def stop(self) -> None:
+        self.finished = time.perf_counter()
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Throughput and p50/p95/p99 latency (ms) per endpoint, plus ``"total"``."""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+
+        def describe(values: List[float], errors: int, statuses: Dict[int, int]) -> Dict[str, Any]:
+            ordered = sorted(values)
+            return {
+                "requests": len(ordered),
+                "errors": errors,
+                "throughput_rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+                "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+                "statuses": {str(code): count for code, count in sorted(statuses.items())},
+            }
+
+        report = {
+            endpoint: describe(values, self.errors[endpoint], self.statuses[endpoint])
+            for endpoint, values in sorted(self.latencies.items())
+        }
+        combined: Dict[int, int] = defaultdict(int)
+        for statuses in self.statuses.values():
+            for code, count in statuses.items():
+                combined[code] += count
+        report["total"] = describe(
+            [value for values in self.latencies.values() for value in values],
+            sum(self.errors.values()),
+            combined,
+        )
+        return report
+
+
+class ApiClient:
+    """Pooled async client for the event endpoints."""
+
+    def __init__(
+        self,
+        base_url: str,
+        concurrency: int = 100,
+        timeout: float = 30.0,
+        recorder: Optional[LatencyRecorder] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.recorder = recorder or LatencyRecorder()
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> "ApiClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def post(self, path: str, body: Any, label: str, scheduled: Optional[float] = None) -> Optional[int]:
+        """POST ``body`` and record its latency under ``label``; returns the status code."""
+        started = scheduled if scheduled is not None else time.perf_counter()
+        status_code = None
+        try:
+            response = await self._client.post(path, json=body)
+            status_code = response.status_code
+        except httpx.HTTPError:
+            pass
+        self.recorder.record(label, time.perf_counter() - started, status_code)
+        return status_code
+
+    async def send_event(self, endpoint: str, payload: Dict[str, Any], scheduled: Optional[float] = None):
+        return await self.post(f"{API_PREFIX}/{endpoint}", payload, endpoint, scheduled)
+
+    async def send_batch(self, endpoint: str, payloads: List[Dict[str, Any]], scheduled: Optional[float] = None):
+        return await self.post(f"{API_PREFIX}/{endpoint}/batch", payloads, f"{endpoint}/batch", scheduled)
+
+
+async def run_at_rate(
+    client: ApiClient,
+    requests: Iterable,
+    rate: float,
+    duration: float,
+    concurrency: int = 100,
+) -> LatencyRecorder:
+    """
+    Send ``requests`` (``(endpoint, body, is_batch)`` tuples) at ``rate`` per
+    second for ``duration`` seconds, with at most ``concurrency`` in flight.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    start = time.perf_counter()
+    deadline = start + duration
+    client.recorder.started = start
+
+    async def send(endpoint, body, is_batch, scheduled):
+        try:
+            if is_batch:
+                await client.send_batch(endpoint, body, scheduled)
+            else:
+                await client.send_event(endpoint, body, scheduled)
+        finally:
+            semaphore.release()
+
+    for index, (endpoint, body, is_batch) in enumerate(requests):
+        scheduled = start + index / rate
+        if scheduled >= deadline:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await semaphore.acquire()
+        task = loop.create_task(send(endpoint, body, is_batch, scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    client.recorder.stop()
+    return client.recorder
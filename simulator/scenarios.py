@@ -0,0 +1,139 @@
+"""
+Load Scenarios
+
+Named load profiles for sizing deployments and catching regressions:
+
+    python -m simulator.scenarios steady --base-url http://localhost:8000
+    python -m simulator.scenarios batch --rate 50 --duration 120 --json report.json
+
+Each scenario feeds generated journeys (``event_generator``) through the
+open-loop client (``http_client``). It prints throughput and p50/p95/p99
+latency per endpoint, and can write the same report as JSON for comparison
+across runs.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from simulator.event_generator import EventGenerator, SimEvent
+from simulator.http_client import ApiClient, run_at_rate
+
+
+class Scenario(NamedTuple):
+    name: str
+    description: str
+    rate: float                  # requests per second
+    duration: float              # seconds
+    batch_size: int = 0          # 0: one event per request
+    concurrency: int = 100
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("smoke", "Low rate sanity check", rate=10, duration=10, concurrency=10),
+        Scenario("steady", "Sustained single-event ingestion", rate=200, duration=60),
+        Scenario("peak", "Sale-day single-event spike", rate=1000, duration=60, concurrency=500),
+        Scenario("batch", "Batched ingestion, 100 events per request", rate=20, duration=60,
+                 batch_size=100, concurrency=20),
+    )
+}
+
+Request = Tuple[str, Any, bool]
+
+
+def single_requests(events: Iterator[SimEvent]) -> Iterator[Request]:
+    for endpoint, payload in events:
+        yield endpoint, payload, False
+
+
+def batched_requests(events: Iterator[SimEvent], batch_size: int) -> Iterator[Request]:
+    """Group events per endpoint and emit each group once it reaches ``batch_size``."""
+    pending: Dict[str, List[Dict[str, Any]]] = {}
+    for endpoint, payload in events:
+        batch = pending.setdefault(endpoint, [])
+        batch.append(payload)
+        if len(batch) >= batch_size:
+            yield endpoint, batch, True
+            pending[endpoint] = []
+
+
+def build_requests(scenario: Scenario, generator: EventGenerator) -> Iterator[Request]:
+    if scenario.batch_size:
+        return batched_requests(generator.stream(), scenario.batch_size)
+    return single_requests(generator.stream())
+
+
+async def run_scenario(
+    scenario: Scenario,
+    base_url: str,
+    seed: Optional[int] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> Dict[str, Any]:
+    """Run ``scenario`` against ``base_url`` and return its report."""
+    generator = EventGenerator(seed=seed)
+    async with ApiClient(base_url, scenario.concurrency, transport=transport) as client:
+        recorder = await run_at_rate(
+            client,
+            build_requests(scenario, generator),
+            scenario.rate,
+            scenario.duration,
+            scenario.concurrency,
+        )
+    return {"scenario": scenario._asdict(), "endpoints": recorder.summary()}
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    header = f"{'endpoint':<22}{'reqs':>8}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    lines = [header, "-" * len(header)]
+    for endpoint, stats in report["endpoints"].items():
+        lines.append(
+            f"{endpoint:<22}{stats['requests']:>8}{stats['errors']:>8}{stats['throughput_rps']:>9}"
+            f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the ingestion API with a load scenario.")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rate", type=float, help="override requests per second")
+    parser.add_argument("--duration", type=float, help="override duration in seconds")
+    parser.add_argument("--concurrency", type=int, help="override max in-flight requests")
+    parser.add_argument("--batch-size", type=int, help="override events per request (0 = single)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    overrides = {
+        field: value
+        for field, value in (
+            ("rate", args.rate),
+            ("duration", args.duration),
+            ("concurrency", args.concurrency),
+            ("batch_size", args.batch_size),
+        )
+        if value is not None
+    }
+    scenario = SCENARIOS[args.scenario]._replace(**overrides)
+    report = asyncio.run(run_scenario(scenario, args.base_url, args.seed))
+
+    print(f"{scenario.name}: {scenario.description} "
+          f"({scenario.rate:g} req/s for {scenario.duration:g}s)")
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    return 1 if report["endpoints"]["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,9 @@ from sqlalchemy.orm import sessionmaker
 from app.main import app
 from app.db.base import Base
 from app.db import get_db
+from app.services.ingestion.dedup import seen_events
+from app.services.ingestion.identity import identity_map
+from app.services.ingestion.sessionizer import session_table
 
 # --------------------------------------------------------------------------- #
 # In-memory SQLite engine (fast, no external DB required)
@@ -61,3 +64,6 @@ def client(db_session):
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
+    seen_events.clear()   # keys of rolled-back rows must not outlive the test
+    session_table.clear()
+    identity_map.clear()
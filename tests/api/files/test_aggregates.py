@@ -0,0 +1,242 @@
+"""
+Tests for incremental hourly product aggregation
+Covers: folding by product-hour, high-water mark, lag window, in-memory counters,
+recomputation, the hourly read endpoint.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.db.models.aggregates import HourlyProductBehaviorAggregate
+from app.db.models.user_behavior_events import UserBehaviorEvent
+from app.services.persistence import aggregates
+from app.services.persistence.aggregates import (
+    HourlyCounterMap,
+    get_watermark,
+    recompute_recent_hours,
+    run_incremental_aggregation,
+    upsert_hourly_counts,
+)
+from app.services.persistence.event_writer import add_commit_listener, remove_commit_listener
+
+HOUR = datetime(2024, 6, 1, 10, tzinfo=timezone.utc)
+
+
+def add_events(db, product_id, event_type, count, event_time=HOUR, ingested_at=None):
+    ingested_at = ingested_at or datetime.now(timezone.utc) - timedelta(minutes=10)
+    db.execute(insert(UserBehaviorEvent), [
+        {
+            "event_id": uuid.uuid4(),
+            "event_type": event_type,
+            "event_time": event_time,
+            "ingested_at": ingested_at,
+            "product_id": product_id,
+            "session_id": "sess-agg",
+        }
+        for _ in range(count)
+    ])
+    db.flush()
+
+
+def agg_row(db, product_id, hour=HOUR):
+    return db.scalar(
+        select(HourlyProductBehaviorAggregate).where(
+            HourlyProductBehaviorAggregate.product_id == product_id,
+            HourlyProductBehaviorAggregate.event_hour == hour,
+        )
+    )
+
+
+class TestIncrementalAggregation:
+
+    def test_folds_views_and_searches_per_product_hour(self, db_session):
+        add_events(db_session, 8001, "product_viewed", 3)
+        add_events(db_session, 8001, "product_searched", 2, event_time=HOUR + timedelta(minutes=59))
+        add_events(db_session, 8001, "product_viewed", 1, event_time=HOUR + timedelta(hours=1))
+
+        assert run_incremental_aggregation(db_session, lag_seconds=0) == 6
+
+        row = agg_row(db_session, 8001)
+        assert (row.view_count, row.search_count, row.total_events) == (3, 2, 5)
+        assert agg_row(db_session, 8001, HOUR + timedelta(hours=1)).total_events == 1
+
+    def test_second_run_only_reads_new_events(self, db_session):
+        earlier = datetime.now(timezone.utc) - timedelta(minutes=20)
+        add_events(db_session, 8002, "product_viewed", 2, ingested_at=earlier)
+        # 10 minute lag: the watermark stops well before "now"
+        run_incremental_aggregation(db_session, lag_seconds=600)
+        watermark = get_watermark(db_session)
+        assert watermark is not None
+
+        # Nothing new: the aggregate must not be double counted.
+        assert run_incremental_aggregation(db_session, lag_seconds=600) == 0
+        add_events(db_session, 8002, "product_viewed", 1, ingested_at=earlier + timedelta(minutes=15))
+        assert run_incremental_aggregation(db_session, lag_seconds=0) == 1
+
+        assert agg_row(db_session, 8002).view_count == 3
+        assert get_watermark(db_session) > watermark
+
+    def test_recent_events_wait_for_lag(self, db_session):
+        add_events(db_session, 8003, "product_viewed", 1,
+                   ingested_at=datetime.now(timezone.utc) - timedelta(seconds=5))
+        assert run_incremental_aggregation(db_session, lag_seconds=60) == 0
+        assert agg_row(db_session, 8003) is None
+
+    def test_small_windows_cover_everything(self, db_session):
+        base = datetime.now(timezone.utc) - timedelta(hours=3)
+        for i in range(3):
+            add_events(db_session, 8004, "product_viewed", 1, ingested_at=base + timedelta(hours=i))
+        assert run_incremental_aggregation(db_session, lag_seconds=0, max_window_seconds=60) == 3
+        assert agg_row(db_session, 8004).view_count == 3
+
+    def test_skips_run_while_another_worker_holds_the_lock(self, db_session, monkeypatch):
+        monkeypatch.setattr(aggregates, "try_advisory_xact_lock", lambda db, name: False)
+        add_events(db_session, 8006, "product_viewed", 2)
+        assert run_incremental_aggregation(db_session, lag_seconds=0) == 0
+        assert agg_row(db_session, 8006) is None
+
+    def test_watermark_is_read_under_the_lock(self, db_session, monkeypatch):
+        add_events(db_session, 8007, "product_viewed", 2)
+
+        def lock_after_other_worker(db, name):
+            # Another worker folded these events while we waited for the lock.
+            if get_watermark(db) is None:
+                aggregates._set_watermark(db, name, datetime.now(timezone.utc) - timedelta(minutes=1))
+                db.flush()
+            return True
+
+        monkeypatch.setattr(aggregates, "try_advisory_xact_lock", lock_after_other_worker)
+        assert run_incremental_aggregation(db_session, lag_seconds=0) == 0
+        assert agg_row(db_session, 8007) is None
+
+    def test_upsert_replace_overwrites_counts(self, db_session):
+        key = (8005, HOUR)
+        upsert_hourly_counts(db_session, {key: {"view_count": 4, "search_count": 0, "total_events": 4}})
+        upsert_hourly_counts(db_session, {key: {"view_count": 1, "search_count": 1, "total_events": 2}})
+        assert agg_row(db_session, 8005).total_events == 6
+        upsert_hourly_counts(
+            db_session, {key: {"view_count": 2, "search_count": 0, "total_events": 2}}, replace=True
+        )
+        db_session.expire_all()
+        assert agg_row(db_session, 8005).total_events == 2
+
+
+class TestHourlyProductEndpoint:
+
+    def test_reads_pre_aggregated_rows(self, client, db_session):
+        add_events(db_session, 8101, "product_viewed", 2)
+        run_incremental_aggregation(db_session, lag_seconds=0)
+        res = client.get(
+            "/api/v1/analytics/products/hourly",
+            params={
+                "start": "2024-06-01T00:00:00+00:00",
+                "end": "2024-06-02T00:00:00+00:00",
+                "product_id": 8101,
+            },
+        )
+        assert res.status_code == 200
+        rows = res.json()
+        assert len(rows) == 1
+        assert rows[0]["view_count"] == 2
+
+    def test_rejects_inverted_range(self, client):
+        res = client.get(
+            "/api/v1/analytics/products/hourly",
+            params={"start": "2024-06-02T00:00:00+00:00", "end": "2024-06-01T00:00:00+00:00"},
+        )
+        assert res.status_code == 422
+
+    def test_mixed_naive_and_aware_timestamps(self, client):
+        res = client.get(
+            "/api/v1/analytics/products/hourly",
+            params={"start": "2024-06-01T00:00:00", "end": "2024-06-02T00:00:00+00:00"},
+        )
+        assert res.status_code == 200
+
+
+class TestHourlyCounterMap:
+
+    def rows(self, product_id, event_type, count, event_time=HOUR):
+        return [
+            {"product_id": product_id, "event_type": event_type, "event_time": event_time}
+            for _ in range(count)
+        ]
+
+    def test_flush_merges_into_one_row_per_product_hour(self, db_session):
+        counters = HourlyCounterMap()
+        counters.record(self.rows(8201, "product_viewed", 5))
+        counters.record(self.rows(8201, "product_searched", 2, HOUR + timedelta(minutes=30)))
+        counters.record(self.rows(8202, "product_viewed", 1))
+        assert len(counters) == 3
+
+        assert counters.flush(db_session) == 2
+        assert len(counters) == 0
+        row = agg_row(db_session, 8201)
+        assert (row.view_count, row.search_count, row.total_events) == (5, 2, 7)
+
+    def test_flushes_accumulate(self, db_session):
+        counters = HourlyCounterMap()
+        counters.record(self.rows(8203, "product_viewed", 2))
+        counters.flush(db_session)
+        counters.record(self.rows(8203, "product_viewed", 3))
+        counters.flush(db_session)
+        db_session.expire_all()
+        assert agg_row(db_session, 8203).view_count == 5
+
+    def test_failed_flush_keeps_increments(self, db_session, monkeypatch):
+        from app.services.persistence import aggregates
+
+        counters = HourlyCounterMap()
+        counters.record(self.rows(8204, "product_viewed", 2))
+
+        def boom(*args, **kwargs):
+            raise RuntimeError("db down")
+
+        monkeypatch.setattr(aggregates, "upsert_hourly_counts", boom)
+        with pytest.raises(RuntimeError):
+            counters.flush(db_session)
+        assert len(counters) == 1
+
+    def test_commit_listener_only_counts_behavior_events(self):
+        from app.db.models.cart_events import CartEvent
+
+        counters = HourlyCounterMap()
+        counters.on_commit(CartEvent, [{"product_id": 1, "event_time": HOUR}])
+        counters.on_commit(UserBehaviorEvent, self.rows(8205, "product_viewed", 1))
+        assert len(counters) == 1
+
+    def test_ingestion_path_feeds_counters(self, client, db_session):
+        counters = HourlyCounterMap()
+        add_commit_listener(counters.on_commit)
+        try:
+            payloads = [
+                {
+                    "event_type": "product_viewed",
+                    "event_time": "2024-06-01T10:15:00+00:00",
+                    "product_id": 8206,
+                    "session_id": "sess-counters",
+                }
+            ] * 3
+            client.post("/api/v1/events/user-behavior", json=payloads[0])
+            client.post("/api/v1/events/user-behavior/batch", json=payloads[1:])
+        finally:
+            remove_commit_listener(counters.on_commit)
+        counters.flush(db_session)
+        assert agg_row(db_session, 8206).view_count == 3
+
+    def test_recompute_replaces_recent_hours(self, db_session):
+        add_events(db_session, 8207, "product_viewed", 4)
+        upsert_hourly_counts(
+            db_session, {(8207, HOUR): {"view_count": 99, "search_count": 0, "total_events": 99}}
+        )
+        recompute_recent_hours(db_session, hours=1, now=HOUR + timedelta(minutes=30))
+        db_session.expire_all()
+        assert agg_row(db_session, 8207).total_events == 4
+
+    def test_recompute_skips_while_locked(self, db_session, monkeypatch):
+        monkeypatch.setattr(aggregates, "try_advisory_xact_lock", lambda db, name: False)
+        add_events(db_session, 8208, "product_viewed", 2)
+        assert recompute_recent_hours(db_session, hours=1, now=HOUR + timedelta(minutes=30)) == 0
+        assert agg_row(db_session, 8208) is None
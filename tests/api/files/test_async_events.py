@@ -0,0 +1,163 @@
+"""
+Tests for the async ingestion router (DB_ASYNC=true)
+Runs routers/events_async.py against aiosqlite and checks it mirrors the sync API.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.db import get_async_db
+from app.db.base import Base
+from app.db.models.order_events import OrderEvent
+from app.db.session import to_async_url
+from app.api.v1.routers import events_async
+from app.services.ingestion.dedup import seen_events
+
+pytest.importorskip("aiosqlite", reason="async drivers are in requirements-async.txt")
+
+
+@pytest.fixture()
+def async_client(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+
+    # NullPool: every request opens its connection on the TestClient's event loop
+    async_engine = create_async_engine(to_async_url(url), poolclass=NullPool)
+    sessions = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(events_async.router, prefix="/api/v1")
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    with TestClient(app) as c:
+        yield c
+    seen_events.clear()
+    sync_engine.dispose()
+
+
+def behavior_payload(**overrides):
+    base = {
+        "event_type": "product_viewed",
+        "user_id": 101,
+        "event_time": "2024-06-01T10:00:00+00:00",
+        "product_id": 1001,
+        "session_id": "sess-async-001",
+    }
+    base.update(overrides)
+    return base
+
+
+class TestAsyncRouter:
+
+    def test_to_async_url(self):
+        assert to_async_url("postgresql://u:p@db:5432/x") == "postgresql+asyncpg://u:p@db:5432/x"
+        assert to_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+
+    def test_create_user_behavior_full(self, async_client):
+        res = async_client.post("/api/v1/events/user-behavior", json=behavior_payload())
+        assert res.status_code == 201
+        data = res.json()
+        assert data["event_id"]
+        assert data["ingested_at"] is not None
+
+    def test_create_user_behavior_lean(self, async_client):
+        res = async_client.post(
+            "/api/v1/events/user-behavior",
+            params={"response_mode": "lean"},
+            json=behavior_payload(product_id=1002),
+        )
+        assert res.status_code == 201
+        assert res.json()["product_id"] == 1002
+
+    def test_duplicate_order_returns_409(self, async_client):
+        order = {"order_id": "INV-ASYNC-1", "status": "pending",
+                 "event_time": "2024-06-01T10:00:00+00:00"}
+        assert async_client.post("/api/v1/events/order", json=order).status_code == 201
+        res = async_client.post("/api/v1/events/order", json=order)
+        assert res.status_code == 409
+        assert res.json()["detail"] == "order_id already exists"
+
+    def test_duplicate_order_without_constraint_returns_409(self, async_client, monkeypatch):
+        monkeypatch.setattr(OrderEvent.__table__.c.order_id, "unique", False)
+        order = {"order_id": "INV-ASYNC-2", "status": "pending",
+                 "event_time": "2024-06-01T10:00:00+00:00"}
+        assert async_client.post("/api/v1/events/order", json=order).status_code == 201
+
+        async def no_insert(*args):
+            raise AssertionError("duplicate order_id reached the insert")
+
+        monkeypatch.setattr(events_async, "prepare_rows_async", no_insert)
+        res = async_client.post("/api/v1/events/order", json={**order, "status": "shipped"})
+        assert res.status_code == 409
+
+    def test_retries_are_deduplicated(self, async_client):
+        payload = behavior_payload(idempotency_key="async-retry-1")
+        first = async_client.post("/api/v1/events/user-behavior", json=payload)
+        seen_events.clear()   # the retry has to be caught by the unique index
+        retry = async_client.post("/api/v1/events/user-behavior", json=payload)
+        assert (first.status_code, retry.status_code) == (201, 200)
+        assert retry.json()["event_id"] == first.json()["event_id"]
+
+        body = async_client.post("/api/v1/events/user-behavior/batch", json=[payload, payload]).json()
+        assert (body["accepted"], body["duplicates"]) == (0, 2)
+        assert {r["event_id"] for r in body["results"]} == {first.json()["event_id"]}
+
+    def test_envelope_endpoints(self, async_client):
+        cart = {"correlation_id": "sess-async-001", "product_id": 5, "action": "add",
+                "quantity": 1, "event_time": "2024-06-01T10:00:00+00:00"}
+        res = async_client.post("/api/v1/events", json={"type": "cart", "data": cart})
+        assert res.status_code == 201
+
+        body = async_client.post("/api/v1/events/batch", json=[
+            {"type": "user-behavior", "data": behavior_payload()},
+            {"type": "cart", "data": {**cart, "quantity": 0}},
+            {"type": "cart", "data": cart},
+        ]).json()
+        assert (body["accepted"], body["rejected"]) == (2, 1)
+        assert body["results"][1]["errors"][0]["loc"] == ["data", "quantity"]
+        assert len(async_client.get("/api/v1/events/cart").json()) == 2
+
+    def test_batch_and_read_back(self, async_client):
+        payloads = [behavior_payload(product_id=2000 + i) for i in range(3)]
+        payloads.append(behavior_payload(event_type="bogus"))
+        body = async_client.post("/api/v1/events/user-behavior/batch", json=payloads).json()
+        assert body["accepted"] == 3
+        assert body["rejected"] == 1
+
+        res = async_client.get("/api/v1/events/user-behavior")
+        assert res.status_code == 200
+        assert len(res.json()) == 3
+
+    def test_paged_read(self, async_client):
+        payloads = [behavior_payload(product_id=3000 + i) for i in range(3)]
+        async_client.post("/api/v1/events/user-behavior/batch", json=payloads)
+
+        res = async_client.get("/api/v1/events/user-behavior", params={"limit": 2})
+        assert len(res.json()) == 2
+        cursor = res.headers["X-Next-Cursor"]
+        res = async_client.get(
+            "/api/v1/events/user-behavior", params={"limit": 2, "cursor": cursor}
+        )
+        assert len(res.json()) == 1
+        assert "X-Next-Cursor" not in res.headers
+
+    def test_export_streams_ndjson(self, async_client):
+        payloads = [behavior_payload(product_id=4000 + i) for i in range(3)]
+        async_client.post("/api/v1/events/user-behavior/batch", json=payloads)
+
+        res = async_client.get("/api/v1/events/user-behavior/export")
+        assert res.status_code == 200
+        assert len(res.text.splitlines()) == 3
+
+    def test_validation_error(self, async_client):
+        payload = behavior_payload()
+        del payload["session_id"]
+        res = async_client.post("/api/v1/events/user-behavior", json=payload)
+        assert res.status_code == 422
@@ -0,0 +1,115 @@
+"""
+Tests for POST /events/{type}/batch
+Covers: all-valid batches, per-item rejects, duplicate order_ids, batch size limits.
+"""
+import pytest
+
+from app.core.config import BATCH_MAX_SIZE
+
+
+def behavior_payload(**overrides):
+    base = {
+        "event_type": "product_viewed",
+        "user_id": 101,
+        "event_time": "2024-06-01T10:00:00+00:00",
+        "product_id": 1001,
+        "session_id": "sess-batch-001",
+    }
+    base.update(overrides)
+    return base
+
+
+def order_payload(**overrides):
+    base = {
+        "order_id": "INV-B-001",
+        "user_id": 601,
+        "status": "pending",
+        "event_time": "2024-06-01T10:00:00+00:00",
+    }
+    base.update(overrides)
+    return base
+
+
+class TestBatchIngestion:
+
+    def test_all_valid_user_behavior_batch(self, client):
+        payloads = [behavior_payload(product_id=7000 + i) for i in range(5)]
+        res = client.post("/api/v1/events/user-behavior/batch", json=payloads)
+        assert res.status_code == 200
+        body = res.json()
+        assert body["accepted"] == 5
+        assert body["rejected"] == 0
+        assert [r["index"] for r in body["results"]] == list(range(5))
+        assert all(r["status"] == "accepted" and r["event_id"] for r in body["results"])
+
+    def test_mixed_batch_rejects_only_invalid_items(self, client):
+        payloads = [
+            behavior_payload(product_id=7101),
+            behavior_payload(event_type="product_purchased"),
+            behavior_payload(product_id=7103),
+        ]
+        res = client.post("/api/v1/events/user-behavior/batch", json=payloads)
+        assert res.status_code == 200
+        body = res.json()
+        assert body["accepted"] == 2
+        assert body["rejected"] == 1
+        rejected = body["results"][1]
+        assert rejected["status"] == "rejected"
+        assert rejected["errors"][0]["loc"] == ["event_type"]
+
+    def test_accepted_items_are_persisted(self, client):
+        payloads = [behavior_payload(session_id="sess-batch-persist", product_id=7201)]
+        client.post("/api/v1/events/user-behavior/batch", json=payloads)
+        res = client.get("/api/v1/events/user-behavior")
+        assert any(e["session_id"] == "sess-batch-persist" for e in res.json())
+
+    def test_cart_batch(self, client):
+        payloads = [
+            {
+                "correlation_id": "sess-cart-batch",
+                "product_id": 2001,
+                "action": "add",
+                "quantity": q,
+                "event_time": "2024-06-01T10:00:00+00:00",
+            }
+            for q in (1, 2, 0)
+        ]
+        res = client.post("/api/v1/events/cart/batch", json=payloads)
+        body = res.json()
+        assert body["accepted"] == 2
+        assert body["results"][2]["status"] == "rejected"
+
+
+class TestBatchOrderUniqueness:
+
+    def test_duplicate_order_id_within_batch(self, client):
+        payloads = [order_payload(order_id="INV-B-DUP"), order_payload(order_id="INV-B-DUP")]
+        res = client.post("/api/v1/events/order/batch", json=payloads)
+        body = res.json()
+        assert body["accepted"] == 1
+        assert body["results"][1]["errors"][0]["type"] == "unique_violation"
+
+    def test_duplicate_order_id_against_existing_row(self, client):
+        client.post("/api/v1/events/order", json=order_payload(order_id="INV-B-EXIST"))
+        payloads = [order_payload(order_id="INV-B-EXIST"), order_payload(order_id="INV-B-NEW")]
+        res = client.post("/api/v1/events/order/batch", json=payloads)
+        body = res.json()
+        assert body["accepted"] == 1
+        assert body["results"][0]["status"] == "rejected"
+        assert body["results"][1]["status"] == "accepted"
+
+
+class TestBatchLimits:
+
+    def test_empty_batch_rejected(self, client):
+        res = client.post("/api/v1/events/payment/batch", json=[])
+        assert res.status_code == 422
+
+    def test_oversized_batch_rejected(self, client):
+        payloads = [behavior_payload()] * (BATCH_MAX_SIZE + 1)
+        res = client.post("/api/v1/events/user-behavior/batch", json=payloads)
+        assert res.status_code == 422
+
+    def test_non_list_body_rejected(self, client):
+        res = client.post("/api/v1/events/logistics/batch", json=behavior_payload())
+        assert res.status_code == 422
@@ -0,0 +1,44 @@
+"""
+Tests for the benchmark runner (benchmarks/)
+Covers: result summaries, baseline comparison, a tiny end-to-end suite run.
+"""
+import pytest
+
+from benchmarks.runner import compare, result
+from benchmarks.suites import BenchContext, run_suites
+
+
+@pytest.fixture()
+def bench_context(tmp_path):
+    ctx = BenchContext(f"sqlite:///{tmp_path / 'bench.db'}", events=50, sizes=[300], repeat=2)
+    yield ctx
+    ctx.close()
+
+
+class TestRunner:
+
+    def test_result_summary(self):
+        entry = result("case", [0.3, 0.1, 0.2], items=100, type="cart")
+        assert entry["median_s"] == 0.2
+        assert entry["min_s"] == 0.1
+        assert entry["p95_s"] == 0.3
+        assert entry["per_item_us"] == 2000.0
+        assert entry["params"] == {"type": "cart"}
+
+    def test_compare_flags_regressions(self):
+        baseline = {"results": [result("a", [1.0]), result("b", [1.0], rows=10)]}
+        current = {"results": [result("a", [1.05]), result("b", [1.5], rows=10), result("c", [1.0])]}
+        rows = {row["name"]: row for row in compare(current, baseline, threshold=0.1)}
+        assert set(rows) == {"a", "b"}
+        assert not rows["a"]["regression"]
+        assert rows["b"]["regression"] and rows["b"]["ratio"] == 1.5
+
+
+class TestSuites:
+
+    def test_validation_and_queries(self, bench_context):
+        results = run_suites(bench_context, ["validation", "queries"])
+        names = {entry["name"] for entry in results}
+        assert {"validate.per_item", "validate.batch", "query.funnel", "query.aggregate_by_hour"} <= names
+        assert all(entry["median_s"] >= 0 for entry in results)
+        assert len([e for e in results if e["name"] == "validate.batch"]) == 6
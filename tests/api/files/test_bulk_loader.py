@@ -0,0 +1,316 @@
+"""
+Tests for the bulk event loader (app/services/ingestion/bulk_loader.py)
+Covers: NDJSON/CSV/gzip reading, per-record routing, batching, rejects, COPY rendering
+and driver selection, chunk planning, checkpointed resume, multi-process loads and
+rebuilding the hourly aggregates after a load.
+"""
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import UUID
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.db.models.aggregates import HourlyProductBehaviorAggregate
+from app.db.models.cart_events import CartEvent
+from app.db.models.order_events import OrderEvent
+from app.db.models.user_behavior_events import UserBehaviorEvent
+from app.services.ingestion import bulk_loader, identity
+from app.services.ingestion.bulk_loader import (
+    BulkLoader,
+    _copy_value,
+    detect_format,
+    iter_file,
+    refresh_aggregates,
+)
+from app.services.ingestion.parallel_loader import iter_chunk, load_parallel, plan_chunks
+from app.services.persistence import aggregates
+from app.services.persistence.aggregates import run_incremental_aggregation
+
+
+@pytest.fixture()
+def sessions():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def count(sessions, model):
+    with sessions() as db:
+        return db.scalar(select(func.count()).select_from(model))
+
+
+def behavior(product_id, **overrides):
+    record = {
+        "type": "user-behavior",
+        "event_type": "product_viewed",
+        "user_id": 1,
+        "event_time": "2025-01-01T10:00:00+00:00",
+        "product_id": product_id,
+        "session_id": "sess-bulk",
+    }
+    record.update(overrides)
+    return record
+
+
+def write_ndjson(path, records, compress=False):
+    text = "".join(json.dumps(record) + "\n" for record in records)
+    if compress:
+        with gzip.open(path, "wt", encoding="utf-8") as handle:
+            handle.write(text)
+    else:
+        path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+class TestBulkLoader:
+
+    def test_routes_records_by_type(self, sessions, tmp_path):
+        records = [behavior(i) for i in range(5)]
+        records.append({"type": "order", "order_id": "INV-BULK-1", "status": "pending",
+                        "event_time": "2024-12-31T22:00:00+00:00"})
+        path = write_ndjson(tmp_path / "events.ndjson.gz", records, compress=True)
+
+        stats = BulkLoader(sessions, batch_size=2).load(iter_file(path))
+        assert stats.loaded == 6
+        assert stats.loaded_by_type == {"user-behavior": 5, "order": 1}
+        assert stats.first_event_time == datetime(2024, 12, 31, 22, tzinfo=timezone.utc)
+        assert stats.first_behavior_time == datetime(2025, 1, 1, 10, tzinfo=timezone.utc)
+        assert count(sessions, UserBehaviorEvent) == 5
+        assert count(sessions, OrderEvent) == 1
+
+    def test_rejects_are_reported_with_line_numbers(self, sessions, tmp_path):
+        path = tmp_path / "events.ndjson"
+        lines = [
+            json.dumps(behavior(1)),
+            "{not json",
+            json.dumps(behavior(2, event_type="bogus")),
+            json.dumps({"type": "teleport"}),
+            "",
+            json.dumps(behavior(3)),
+        ]
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        rejects = []
+
+        stats = BulkLoader(
+            sessions, on_reject=lambda line, type_name, errors: rejects.append((line, type_name))
+        ).load(iter_file(str(path)))
+        assert stats.loaded == 2
+        assert stats.rejected == 3
+        assert sorted(rejects, key=lambda r: r[0]) == [
+            (2, None), (3, "user-behavior"), (4, "teleport"),
+        ]
+
+    def test_duplicate_orders_rejected(self, sessions, tmp_path):
+        order = {"order_id": "INV-BULK-DUP", "status": "pending",
+                 "event_time": "2025-01-01T10:00:00+00:00"}
+        path = write_ndjson(tmp_path / "orders.jsonl", [order, order])
+        stats = BulkLoader(sessions, default_type="order").load(iter_file(path))
+        assert (stats.loaded, stats.rejected) == (1, 1)
+
+    def test_repeated_idempotency_keys_rejected(self, sessions, tmp_path):
+        path = write_ndjson(tmp_path / "keys.jsonl", [
+            behavior(1, idempotency_key="bulk-key-1"),
+            behavior(2, idempotency_key="bulk-key-1"),
+            behavior(3, idempotency_key="bulk-key-2"),
+        ])
+        rejects = []
+        loader = BulkLoader(sessions, on_reject=lambda line, type_name, errors: rejects.append((line, errors)))
+        assert (loader.load(iter_file(path)).loaded, len(rejects)) == (2, 1)
+        assert (rejects[0][0], rejects[0][1][0]["type"]) == (2, "duplicate")
+
+        # Keys written by an earlier load (or the API) are rejected too.
+        stats = BulkLoader(sessions).load(iter_file(path))
+        assert (stats.loaded, stats.rejected) == (0, 3)
+        assert count(sessions, UserBehaviorEvent) == 2
+
+    def test_guest_history_is_stitched(self, sessions, tmp_path, monkeypatch):
+        monkeypatch.setattr(identity, "IDENTITY_RESOLUTION_ENABLED", True)
+        path = write_ndjson(tmp_path / "history.jsonl", [
+            behavior(1, user_id=None, session_id="bulk-guest"),
+            behavior(2, user_id=None, session_id="bulk-guest"),
+            behavior(3, user_id=5, session_id="bulk-guest"),
+            behavior(4, user_id=None, session_id="bulk-guest"),
+        ])
+        try:
+            BulkLoader(sessions, batch_size=2).load(iter_file(path))
+        finally:
+            identity.identity_map.clear()
+        with sessions() as db:
+            assert set(db.scalars(select(UserBehaviorEvent.actor_id))) == {"user:5"}
+
+    def test_csv_with_default_type(self, sessions, tmp_path):
+        path = tmp_path / "carts.csv"
+        path.write_text(
+            "user_id,product_id,action,quantity,event_time,correlation_id\n"
+            "1,10,add,2,2025-01-01T10:00:00+00:00,c-1\n"
+            ",11,remove,1,2025-01-01T11:00:00+00:00,c-2\n",
+            encoding="utf-8",
+        )
+        stats = BulkLoader(sessions, default_type="cart").load(iter_file(str(path)))
+        assert stats.loaded == 2
+        with sessions() as db:
+            assert db.scalar(select(CartEvent.user_id).where(CartEvent.product_id == 11)) is None
+
+    def test_unknown_default_type(self, sessions):
+        with pytest.raises(ValueError):
+            BulkLoader(sessions, default_type="teleport")
+
+
+class TestFileHelpers:
+
+    def test_detect_format(self):
+        assert detect_format("a.ndjson.gz") == "ndjson"
+        assert detect_format("a.csv") == "csv"
+        with pytest.raises(ValueError):
+            detect_format("a.parquet")
+
+    def test_copy_value_escaping(self):
+        assert _copy_value(None) == r"\N"
+        assert _copy_value("a\tb\\c\n") == "a\\tb\\\\c\\n"
+        assert _copy_value(datetime(2025, 1, 1, tzinfo=timezone.utc)) == "2025-01-01T00:00:00+00:00"
+        assert _copy_value(UUID(int=1)) == "00000000-0000-0000-0000-000000000001"
+        assert _copy_value(True) == "t"
+
+    @pytest.mark.parametrize("driver, writer", [
+        ("psycopg2", "copy"), ("psycopg", "insert"), ("asyncpg", "insert"),
+    ])
+    def test_copy_only_with_psycopg2(self, monkeypatch, driver, writer):
+        dialect = SimpleNamespace(name="postgresql", driver=driver)
+        db = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=dialect))
+        monkeypatch.setattr(bulk_loader, "copy_events", lambda db, model, rows: "copy")
+        monkeypatch.setattr(bulk_loader, "insert_events", lambda db, model, rows: "insert")
+        assert bulk_loader.write_events(db, CartEvent, []) == writer
+
+
+@pytest.fixture()
+def file_db(tmp_path):
+    url = f"sqlite:///{tmp_path / 'backfill.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    yield url, sessionmaker(bind=engine)
+    engine.dispose()
+
+
+class TestParallelLoader:
+
+    def test_chunks_are_line_aligned(self, tmp_path):
+        records = [behavior(i, session_id="s" * (i % 7 + 1)) for i in range(50)]
+        path = write_ndjson(tmp_path / "events.ndjson", records)
+
+        chunks = plan_chunks(path, chunk_bytes=300)
+        assert len(chunks) > 3
+        assert all(a.end == b.start for a, b in zip(chunks, chunks[1:]))
+        pairs = [pair for chunk in chunks for pair in iter_chunk(chunk)]
+        assert [line for line, _ in pairs] == list(range(1, 51))
+        assert [record["product_id"] for _, record in pairs] == list(range(50))
+
+    def test_csv_chunks_keep_header(self, tmp_path):
+        path = tmp_path / "carts.csv"
+        rows = "".join(f"{i},1,add,1,2025-01-01T10:00:00+00:00,c-{i}\n" for i in range(20))
+        path.write_text("user_id,product_id,action,quantity,event_time,correlation_id\n" + rows)
+
+        chunks = plan_chunks(str(path), chunk_bytes=100)
+        pairs = [pair for chunk in chunks for pair in iter_chunk(chunk)]
+        assert [line for line, _ in pairs] == list(range(2, 22))
+        assert pairs[-1][1]["correlation_id"] == "c-19"
+
+    def test_checkpoint_skips_completed_chunks(self, file_db, tmp_path):
+        url, sessions = file_db
+        path = write_ndjson(tmp_path / "events.ndjson", [behavior(i) for i in range(30)])
+        checkpoint = str(tmp_path / "load.ckpt")
+
+        first = load_parallel([path], url, workers=1, chunk_bytes=500, checkpoint_path=checkpoint)
+        assert first.loaded == 30
+        again = load_parallel([path], url, workers=1, chunk_bytes=500, checkpoint_path=checkpoint)
+        assert again.loaded == 0
+        assert count(sessions, UserBehaviorEvent) == 30
+
+    def test_checkpoint_refuses_another_chunk_size(self, file_db, tmp_path):
+        url, sessions = file_db
+        path = write_ndjson(tmp_path / "events.ndjson", [behavior(i) for i in range(30)])
+        checkpoint = str(tmp_path / "load.ckpt")
+
+        load_parallel([path], url, workers=1, chunk_bytes=500, checkpoint_path=checkpoint)
+        with pytest.raises(ValueError, match="--chunk-mb"):
+            load_parallel([path], url, workers=1, chunk_bytes=700, checkpoint_path=checkpoint)
+        assert count(sessions, UserBehaviorEvent) == 30
+
+    def test_multiple_processes(self, file_db, tmp_path):
+        url, sessions = file_db
+        path = write_ndjson(tmp_path / "events.ndjson", [behavior(i) for i in range(40)])
+        rejects = []
+
+        stats = load_parallel(
+            [path], url, workers=2, chunk_bytes=1000,
+            on_reject=lambda *reject: rejects.append(reject),
+        )
+        assert (stats.loaded, stats.rejected, rejects) == (40, 0, [])
+        assert count(sessions, UserBehaviorEvent) == 40
+
+
+class TestRefreshAggregates:
+
+    def load(self, file_db, tmp_path):
+        url, _ = file_db
+        records = [behavior(i % 3, event_time=f"2025-01-01T{10 + i % 2}:15:00+00:00") for i in range(30)]
+        path = write_ndjson(tmp_path / "events.ndjson", records)
+        return load_parallel([path], url, workers=2, chunk_bytes=1000)
+
+    def totals(self, sessions):
+        agg = HourlyProductBehaviorAggregate
+        with sessions() as db:
+            return db.scalar(select(func.sum(agg.total_events))), db.scalar(select(func.count()).select_from(agg))
+
+    def test_rebuilds_hours_the_watermark_already_passed(self, file_db, tmp_path, monkeypatch):
+        monkeypatch.setattr(bulk_loader, "AGGREGATOR_MODE", "watermark")
+        _, sessions = file_db
+        with sessions() as db:
+            # The job ran while the chunks were still uncommitted.
+            aggregates._set_watermark(db, aggregates.JOB_NAME, datetime.now(timezone.utc) + timedelta(minutes=1))
+            db.commit()
+        stats = self.load(file_db, tmp_path)
+        assert (stats.first_behavior_time.hour, stats.last_behavior_time.hour) == (10, 11)
+
+        with sessions() as db:
+            assert run_incremental_aggregation(db, lag_seconds=0) == 0
+            assert refresh_aggregates(db, stats) == 6
+        assert self.totals(sessions) == (30, 6)
+        with sessions() as db:
+            assert refresh_aggregates(db, stats) == 6
+            assert run_incremental_aggregation(db, lag_seconds=0) == 0
+        assert self.totals(sessions) == (30, 6)
+
+    def test_leaves_unseen_rows_to_the_incremental_job(self, file_db, tmp_path, monkeypatch):
+        monkeypatch.setattr(bulk_loader, "AGGREGATOR_MODE", "watermark")
+        _, sessions = file_db
+        stats = self.load(file_db, tmp_path)
+
+        with sessions() as db:
+            assert refresh_aggregates(db, stats) == 0
+            assert run_incremental_aggregation(db, lag_seconds=0) == 30
+            assert refresh_aggregates(db, stats) == 6
+        assert self.totals(sessions) == (30, 6)
+
+    def test_inmemory_mode_counts_every_loaded_row(self, file_db, tmp_path, monkeypatch):
+        monkeypatch.setattr(bulk_loader, "AGGREGATOR_MODE", "inmemory")
+        _, sessions = file_db
+        stats = self.load(file_db, tmp_path)
+
+        with sessions() as db:
+            assert refresh_aggregates(db, stats) == 6
+        assert self.totals(sessions) == (30, 6)
+
+    def test_nothing_to_refresh_without_behavior_rows(self, sessions):
+        with sessions() as db:
+            assert refresh_aggregates(db, bulk_loader.LoadStats()) == 0
@@ -0,0 +1,200 @@
+"""
+Tests for idempotency-key deduplication of retried events.
+Covers: single and batch retries, cache misses answered by the unique index,
+content-hash keys, and the LRU/TTL seen-set itself.
+"""
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import get_db
+from app.db.base import Base
+from app.db.models.order_events import OrderEvent
+from app.db.models.user_behavior_events import UserBehaviorEvent
+from app.main import app
+from app.services.ingestion import dedup
+from app.services.ingestion.dedup import SeenSet, seen_events
+
+
+def behavior_payload(**overrides):
+    base = {
+        "event_type": "product_viewed",
+        "user_id": 101,
+        "event_time": "2024-06-01T10:00:00+00:00",
+        "product_id": 1001,
+        "session_id": "sess-dedup-001",
+    }
+    base.update(overrides)
+    return base
+
+
+def count(db_session, model):
+    return db_session.scalar(select(func.count()).select_from(model))
+
+
+@pytest.fixture()
+def committing_client():
+    """
+    Client on a private database whose sessions really commit and roll back,
+    so a failed insert does not discard the test's earlier rows.
+    """
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    sessions = sessionmaker(bind=engine)
+
+    def override_get_db():
+        with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c, sessions
+    app.dependency_overrides.clear()
+    seen_events.clear()
+    engine.dispose()
+
+
+class TestSingleEventRetries:
+
+    def test_retry_returns_original_event(self, client, db_session):
+        payload = behavior_payload(idempotency_key="retry-1")
+        first = client.post("/api/v1/events/user-behavior", json=payload)
+        assert first.status_code == 201
+
+        retry = client.post("/api/v1/events/user-behavior", json=payload)
+        assert retry.status_code == 200
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert retry.json()["event_id"] == first.json()["event_id"]
+        assert count(db_session, UserBehaviorEvent) == 1
+
+    @pytest.mark.parametrize("mode", ["full", "lean"])
+    def test_retry_after_cache_eviction_is_caught_by_unique_index(self, committing_client, mode):
+        client, sessions = committing_client
+        payload = behavior_payload(idempotency_key="retry-2")
+        url = f"/api/v1/events/user-behavior?response_mode={mode}"
+        first = client.post(url, json=payload)
+        seen_events.clear()
+
+        retry = client.post(url, json=payload)
+        assert retry.status_code == 200
+        assert retry.json()["event_id"] == first.json()["event_id"]
+        with sessions() as db:
+            assert count(db, UserBehaviorEvent) == 1
+
+    def test_events_without_key_are_not_deduplicated_by_default(self, client, db_session):
+        for _ in range(2):
+            assert client.post("/api/v1/events/user-behavior", json=behavior_payload()).status_code == 201
+        assert count(db_session, UserBehaviorEvent) == 2
+
+    def test_order_retry_is_not_a_conflict(self, committing_client):
+        client, _ = committing_client
+        payload = {
+            "order_id": "INV-DEDUP-1",
+            "status": "pending",
+            "event_time": "2024-06-01T10:00:00+00:00",
+            "idempotency_key": "order-retry-1",
+        }
+        assert client.post("/api/v1/events/order", json=payload).status_code == 201
+        assert client.post("/api/v1/events/order", json=payload).status_code == 200
+
+        other = client.post("/api/v1/events/order", json={**payload, "idempotency_key": "other"})
+        assert other.status_code == 409
+
+    def test_content_hash_key(self, client, db_session, monkeypatch):
+        monkeypatch.setattr(dedup, "DEDUP_CONTENT_HASH", True)
+        first = client.post("/api/v1/events/user-behavior", json=behavior_payload())
+        retry = client.post("/api/v1/events/user-behavior", json=behavior_payload())
+        other = client.post("/api/v1/events/user-behavior", json=behavior_payload(product_id=1002))
+        assert (first.status_code, retry.status_code, other.status_code) == (201, 200, 201)
+        assert count(db_session, UserBehaviorEvent) == 2
+
+    def test_disabled(self, committing_client, monkeypatch):
+        client, _ = committing_client
+        monkeypatch.setattr(dedup, "DEDUP_ENABLED", False)
+        payload = behavior_payload(idempotency_key="retry-3")
+        assert client.post("/api/v1/events/user-behavior", json=payload).status_code == 201
+        assert client.post("/api/v1/events/user-behavior", json=payload).status_code == 409
+
+
+class TestBatchRetries:
+
+    def test_duplicates_within_and_across_batches(self, client, db_session):
+        first = client.post("/api/v1/events/user-behavior/batch", json=[
+            behavior_payload(product_id=1, idempotency_key="b-1"),
+            behavior_payload(product_id=2, idempotency_key="b-2"),
+            behavior_payload(product_id=1, idempotency_key="b-1"),
+        ]).json()
+        assert (first["accepted"], first["duplicates"]) == (2, 1)
+        assert first["results"][2]["status"] == "duplicate"
+        assert first["results"][2]["event_id"] == first["results"][0]["event_id"]
+
+        seen_events.clear()  # second batch is answered by the IN lookup
+        retry = client.post("/api/v1/events/user-behavior/batch", json=[
+            behavior_payload(product_id=2, idempotency_key="b-2"),
+            behavior_payload(product_id=3, idempotency_key="b-3"),
+        ]).json()
+        assert (retry["accepted"], retry["duplicates"]) == (1, 1)
+        assert retry["results"][0]["event_id"] == first["results"][1]["event_id"]
+        assert count(db_session, UserBehaviorEvent) == 3
+
+    def test_single_retry_of_batched_event(self, client):
+        payload = behavior_payload(idempotency_key="b-4")
+        batch = client.post("/api/v1/events/user-behavior/batch", json=[payload]).json()
+        retry = client.post("/api/v1/events/user-behavior", json=payload)
+        assert retry.status_code == 200
+        assert retry.json()["event_id"] == batch["results"][0]["event_id"]
+
+    def test_order_retry_is_duplicate_not_conflict(self, client, db_session):
+        payload = {
+            "order_id": "INV-DEDUP-B",
+            "status": "pending",
+            "event_time": "2024-06-01T10:00:00+00:00",
+            "idempotency_key": "order-b-1",
+        }
+        client.post("/api/v1/events/order/batch", json=[payload])
+        body = client.post("/api/v1/events/order/batch", json=[payload]).json()
+        assert (body["accepted"], body["rejected"], body["duplicates"]) == (0, 0, 1)
+        assert count(db_session, OrderEvent) == 1
+
+
+class TestSeenSet:
+
+    def test_lru_eviction(self):
+        seen = SeenSet(max_size=2, ttl=60)
+        ids = [uuid.uuid4() for _ in range(3)]
+        seen.add_many([(("t", "a"), ids[0]), (("t", "b"), ids[1])])
+        assert seen.get(("t", "a")) == ids[0]      # "b" is now least recently used
+        seen.add_many([(("t", "c"), ids[2])])
+        assert seen.get(("t", "b")) is None
+        assert seen.get(("t", "a")) == ids[0]
+        assert len(seen) == 2
+
+    def test_entries_expire(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(dedup, "time", SimpleNamespace(monotonic=lambda: now[0]))
+        seen = SeenSet(max_size=10, ttl=5)
+        seen.add_many([(("t", "a"), uuid.uuid4())])
+        now[0] += 4
+        assert seen.get(("t", "a")) is not None
+        now[0] += 2
+        assert seen.get(("t", "a")) is None
+        assert len(seen) == 0
+
+    def test_keys_are_scoped_per_table(self):
+        seen = SeenSet(max_size=10, ttl=60)
+        seen.add_many([(("cart_events", "k"), uuid.uuid4())])
+        assert seen.get(("payment_events", "k")) is None
+
+    @pytest.mark.parametrize("key", ["", "x" * 129])
+    def test_key_length_is_validated(self, client, key):
+        res = client.post("/api/v1/events/user-behavior", json=behavior_payload(idempotency_key=key))
+        assert res.status_code == 422
@@ -0,0 +1,140 @@
+"""
+Tests for write-time enrichment (services/ingestion/enrichment.py)
+Covers: derived columns on ingest, channel rules, the product category file
+and hot reloading of lookup files.
+"""
+import os
+
+import pytest
+from sqlalchemy import select
+
+from app.db.models.user_behavior_events import UserBehaviorEvent
+from app.services.ingestion import enrichment
+from app.services.ingestion.enrichment import (
+    DEFAULT_CHANNEL_RULES,
+    ChannelRules,
+    LookupFile,
+    load_categories,
+    load_channel_rules,
+)
+
+
+def behavior_payload(**overrides):
+    base = {
+        "event_type": "product_viewed",
+        "user_id": 101,
+        "event_time": "2024-06-01T10:00:00+00:00",
+        "product_id": 1001,
+        "session_id": "sess-enrich-001",
+        "source": "CPC",
+        "platform": "iPhone",
+    }
+    base.update(overrides)
+    return base
+
+
+def write_file(path, text, mtime):
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture()
+def category_file(tmp_path, monkeypatch):
+    path = tmp_path / "categories.csv"
+    write_file(path, "product_id,category\n1001,home\n1002,garden\n", 1_000_000)
+    lookup = LookupFile(str(path), load_categories, {}, check_interval=0)
+    monkeypatch.setattr(enrichment, "categories", lookup)
+    return path
+
+
+class TestIngestion:
+
+    def test_derived_columns(self, client, category_file):
+        data = client.post("/api/v1/events/user-behavior", json=behavior_payload()).json()
+        assert data["device_type"] == "mobile"
+        assert data["traffic_source"] == "paid"
+        assert data["page_type"] == "product"
+        assert data["product_category"] == "home"
+
+    def test_batch_and_missing_values(self, client, db_session, category_file):
+        client.post("/api/v1/events/user-behavior/batch", json=[
+            behavior_payload(event_type="product_searched", product_id=9999, source=None, platform=None),
+            behavior_payload(product_id=1002, source="newsletter", platform="Desktop Web"),
+        ])
+        rows = db_session.execute(
+            select(
+                UserBehaviorEvent.device_type,
+                UserBehaviorEvent.traffic_source,
+                UserBehaviorEvent.page_type,
+                UserBehaviorEvent.product_category,
+            ).order_by(UserBehaviorEvent.product_id)
+        ).all()
+        assert [tuple(row) for row in rows] == [
+            ("desktop", "email", "product", "garden"),
+            (None, None, "search", None),
+        ]
+
+    @pytest.mark.parametrize("platform, device_type", [
+        ("mobile", "mobile"), ("iPad", "tablet"), ("iPhone", "mobile"), ("smart_fridge", "other"),
+    ])
+    def test_device_types(self, client, platform, device_type):
+        data = client.post("/api/v1/events/user-behavior", json=behavior_payload(platform=platform)).json()
+        assert data["device_type"] == device_type
+
+    def test_other_event_types_are_untouched(self, client):
+        res = client.post("/api/v1/events/cart", json={
+            "correlation_id": "sess-enrich-001", "product_id": 1001, "action": "add",
+            "quantity": 1, "event_time": "2024-06-01T10:00:00+00:00",
+        })
+        assert res.status_code == 201
+        assert "device_type" not in res.json()
+
+    def test_disabled(self, client, monkeypatch):
+        monkeypatch.setattr(enrichment, "ENRICHMENT_ENABLED", False)
+        data = client.post("/api/v1/events/user-behavior", json=behavior_payload()).json()
+        assert data["traffic_source"] is None
+
+
+class TestChannelRules:
+
+    @pytest.mark.parametrize("source, channel", [
+        ("ads", "paid"), ("google_ads", "paid"), ("google", "organic_search"),
+        ("instagram", "social"), ("affiliate_network", "referral"), ("carrier_pigeon", "other"),
+    ])
+    def test_default_rules(self, source, channel):
+        assert ChannelRules(DEFAULT_CHANNEL_RULES).channel(source) == channel
+
+    def test_first_matching_pattern_wins(self, tmp_path):
+        path = tmp_path / "channels.csv"
+        path.write_text("pattern,channel\n# partners first\n*partner*,partner\n*,catch_all\n")
+        rules = load_channel_rules(str(path))
+        assert rules.channel("big_partner_site") == "partner"
+        assert rules.channel("anything") == "catch_all"
+
+
+class TestHotReload:
+
+    def test_changed_file_is_reloaded(self, client, category_file):
+        assert enrichment.categories.get()[1001] == "home"
+        write_file(category_file, "1001,kitchen\n", 1_000_100)
+        data = client.post("/api/v1/events/user-behavior", json=behavior_payload()).json()
+        assert data["product_category"] == "kitchen"
+
+    def test_unchanged_file_is_not_reparsed(self, category_file):
+        parsed = []
+        lookup = LookupFile(str(category_file), lambda p: parsed.append(p) or {}, {}, check_interval=0)
+        lookup.get()
+        lookup.get()
+        assert len(parsed) == 1
+
+    def test_broken_file_keeps_previous_version(self, category_file):
+        lookup = enrichment.categories
+        lookup.get()
+        write_file(category_file, "1001,home\nnot-a-number,x\n", 1_000_200)
+        assert lookup.get() == {1001: "home", 1002: "garden"}
+
+    def test_checks_are_rate_limited(self, category_file):
+        lookup = LookupFile(str(category_file), load_categories, {}, check_interval=3600)
+        assert lookup.get()[1001] == "home"
+        write_file(category_file, "1001,kitchen\n", 1_000_300)
+        assert lookup.get()[1001] == "home"
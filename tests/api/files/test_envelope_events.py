@@ -0,0 +1,123 @@
+"""
+Tests for the generic envelope endpoints: POST /events and POST /events/batch
+Covers: dispatch per type, unknown types, mixed batches grouped per table,
+per-item errors and results in submission order.
+"""
+from sqlalchemy import func, select
+
+from app.db.models.cart_events import CartEvent
+from app.db.models.order_events import OrderEvent
+from app.db.models.user_behavior_events import UserBehaviorEvent
+from app.services.ingestion.event_router import group_envelopes
+
+EVENT_TIME = "2024-06-01T10:00:00+00:00"
+
+
+def behavior(**overrides):
+    data = {"event_type": "product_viewed", "event_time": EVENT_TIME,
+            "product_id": 1001, "session_id": "sess-env-001"}
+    data.update(overrides)
+    return {"type": "user-behavior", "data": data}
+
+
+def cart(**overrides):
+    data = {"correlation_id": "sess-env-001", "product_id": 1001, "action": "add",
+            "quantity": 1, "event_time": EVENT_TIME}
+    data.update(overrides)
+    return {"type": "cart", "data": data}
+
+
+def order(**overrides):
+    data = {"order_id": "INV-ENV-001", "status": "pending", "event_time": EVENT_TIME}
+    data.update(overrides)
+    return {"type": "order", "data": data}
+
+
+def count(db_session, model):
+    return db_session.scalar(select(func.count()).select_from(model))
+
+
+class TestSingleEnvelope:
+
+    def test_dispatches_to_the_type_table(self, client, db_session):
+        for envelope in (behavior(), cart(), order()):
+            res = client.post("/api/v1/events", json=envelope)
+            assert res.status_code == 201, res.text
+            assert res.json()["event_id"]
+        assert count(db_session, UserBehaviorEvent) == 1
+        assert count(db_session, CartEvent) == 1
+        assert count(db_session, OrderEvent) == 1
+
+    def test_lean_mode(self, client):
+        res = client.post("/api/v1/events?response_mode=lean", json=cart(quantity=3))
+        assert res.status_code == 201
+        assert res.json()["quantity"] == 3
+
+    def test_unknown_type_is_rejected(self, client):
+        res = client.post("/api/v1/events", json={"type": "refund", "data": {}})
+        assert res.status_code == 422
+
+    def test_data_is_validated_against_the_type_schema(self, client):
+        res = client.post("/api/v1/events", json=cart(quantity=0))
+        assert res.status_code == 422
+        assert res.json()["detail"][0]["loc"][-1] == "quantity"
+
+    def test_duplicate_order_id_conflicts(self, client):
+        assert client.post("/api/v1/events", json=order()).status_code == 201
+        res = client.post("/api/v1/events", json=order())
+        assert res.status_code == 409
+        assert res.json()["detail"] == "order_id already exists"
+
+
+class TestMixedBatch:
+
+    def test_mixed_batch_is_written_per_table(self, client, db_session):
+        envelopes = [behavior(), cart(), behavior(product_id=1002), order(), cart(quantity=2)]
+        res = client.post("/api/v1/events/batch", json=envelopes)
+        assert res.status_code == 200
+        body = res.json()
+        assert (body["accepted"], body["rejected"]) == (5, 0)
+        assert [r["index"] for r in body["results"]] == list(range(5))
+        assert len({r["event_id"] for r in body["results"]}) == 5
+        assert count(db_session, UserBehaviorEvent) == 2
+        assert count(db_session, CartEvent) == 2
+        assert count(db_session, OrderEvent) == 1
+
+    def test_per_item_errors_keep_their_positions(self, client, db_session):
+        envelopes = [
+            behavior(),
+            {"type": "refund", "data": {}},
+            cart(quantity=0),
+            {"type": "cart"},
+            order(),
+            order(),  # same order_id as the previous item
+        ]
+        body = client.post("/api/v1/events/batch", json=envelopes).json()
+        assert (body["accepted"], body["rejected"]) == (2, 4)
+        statuses = [r["status"] for r in body["results"]]
+        assert statuses == ["accepted", "rejected", "rejected", "rejected", "accepted", "rejected"]
+        assert body["results"][1]["errors"][0]["loc"] == ["type"]
+        assert body["results"][2]["errors"][0]["loc"] == ["data", "quantity"]
+        assert body["results"][3]["errors"][0]["loc"] == ["data"]
+        assert body["results"][5]["errors"][0]["type"] == "unique_violation"
+        assert count(db_session, OrderEvent) == 1
+
+    def test_duplicates_across_types(self, client):
+        envelopes = [
+            behavior(idempotency_key="k-1"),
+            cart(idempotency_key="k-1"),   # keys are scoped per table
+            behavior(idempotency_key="k-1"),
+        ]
+        body = client.post("/api/v1/events/batch", json=envelopes).json()
+        assert (body["accepted"], body["duplicates"]) == (2, 1)
+        assert body["results"][2]["status"] == "duplicate"
+        assert body["results"][2]["event_id"] == body["results"][0]["event_id"]
+
+    def test_group_envelopes(self):
+        groups, rejected = group_envelopes([cart(), behavior(), cart(), {"data": {}}])
+        assert groups["cart"][0] == [0, 2]
+        assert groups["user-behavior"][0] == [1]
+        assert [index for index, _ in rejected] == [3]
+
+    def test_empty_batch_is_rejected(self, client):
+        assert client.post("/api/v1/events/batch", json=[]).status_code == 422
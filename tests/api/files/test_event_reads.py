@@ -0,0 +1,90 @@
+"""
+Tests for the paged GET /events/{type} endpoints
+Covers: keyset paging via X-Next-Cursor, filters, time range, cursor and limit validation.
+"""
+import pytest
+
+BASE_URL = "/api/v1/events"
+
+
+def behavior(client, minute, user_id=1, product_id=1):
+    return client.post(f"{BASE_URL}/user-behavior", json={
+        "event_type": "product_viewed",
+        "user_id": user_id,
+        "event_time": f"2025-04-01T10:{minute:02d}:00+00:00",
+        "product_id": product_id,
+        "session_id": f"sess-read-{user_id}",
+    })
+
+
+def read_all(client, path, **params):
+    rows, pages = [], 0
+    while True:
+        res = client.get(f"{BASE_URL}/{path}", params=params)
+        assert res.status_code == 200
+        rows.extend(res.json())
+        pages += 1
+        cursor = res.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return rows, pages
+        params["cursor"] = cursor
+
+
+@pytest.fixture()
+def seeded(client):
+    # two events share a timestamp so paging has to break ties on event_id
+    for minute in (5, 1, 3, 3, 0, 4, 2):
+        behavior(client, minute, user_id=1 if minute % 2 else 2)
+    return client
+
+
+class TestKeysetPaging:
+
+    def test_pages_cover_every_row_once_in_order(self, seeded):
+        rows, pages = read_all(seeded, "user-behavior", limit=2)
+        assert pages == 4
+        ids = [row["event_id"] for row in rows]
+        assert len(ids) == len(set(ids)) == 7
+        keys = [(row["event_time"], row["event_id"]) for row in rows]
+        assert keys == sorted(keys)
+
+    def test_last_page_has_no_cursor(self, seeded):
+        res = seeded.get(f"{BASE_URL}/user-behavior", params={"limit": 7})
+        assert len(res.json()) == 7
+        assert "X-Next-Cursor" not in res.headers
+
+    def test_filters_and_range_apply_across_pages(self, seeded):
+        rows, _ = read_all(
+            seeded, "user-behavior", limit=1, user_id=1,
+            start="2025-04-01T10:02:00+00:00", end="2025-04-01T10:05:00+00:00",
+        )
+        assert [row["event_time"][11:16] for row in rows] == ["10:03", "10:03"]
+        assert {row["user_id"] for row in rows} == {1}
+
+    def test_order_item_filter(self, client):
+        for order_id, product_id in (("INV-R-1", "P-1"), ("INV-R-1", "P-2"), ("INV-R-2", "P-1")):
+            client.post(f"{BASE_URL}/order-item", json={
+                "order_id": order_id, "product_id": product_id, "quantity": 1,
+                "price_at_purchase": 100, "event_time": "2025-04-01T10:00:00+00:00",
+            })
+        res = client.get(f"{BASE_URL}/order-item", params={"product_id": "P-1"})
+        assert res.status_code == 200
+        assert sorted(row["order_id"] for row in res.json()) == ["INV-R-1", "INV-R-2"]
+
+    @pytest.mark.parametrize("path", ["cart", "order", "order-item", "payment", "logistics"])
+    def test_every_type_is_readable(self, client, path):
+        res = client.get(f"{BASE_URL}/{path}")
+        assert res.status_code == 200
+        assert res.json() == []
+
+
+class TestReadValidation:
+
+    def test_invalid_cursor(self, client):
+        res = client.get(f"{BASE_URL}/user-behavior", params={"cursor": "not-a-cursor"})
+        assert res.status_code == 422
+
+    @pytest.mark.parametrize("limit", [0, 1001])
+    def test_limit_bounds(self, client, limit):
+        res = client.get(f"{BASE_URL}/user-behavior", params={"limit": limit})
+        assert res.status_code == 422
@@ -0,0 +1,193 @@
+"""
+Tests for the write-behind EventWriter
+Covers: size/age flushing, backpressure, drain on stop, dropping bad rows,
+requeueing on database errors, 202 responses from the API.
+"""
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.db.models.user_behavior_events import UserBehaviorEvent
+from app.db.models.order_events import OrderEvent
+from app.services.ingestion.dedup import cached_original, remember
+from app.services.persistence import event_writer as writer_module
+from app.services.persistence.event_writer import EventWriter, WriterQueueFull
+
+
+@pytest.fixture()
+def writer_sessions():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def make_row(product_id=1):
+    return {
+        "event_type": "product_viewed",
+        "user_id": 1,
+        "event_time": datetime(2024, 6, 1, 10, tzinfo=timezone.utc),
+        "product_id": product_id,
+        "session_id": "sess-writer",
+    }
+
+
+def count_rows(session_factory):
+    with session_factory() as db:
+        return db.scalar(select(func.count()).select_from(UserBehaviorEvent))
+
+
+class TestEventWriter:
+
+    def test_flushes_on_batch_size(self, writer_sessions):
+        writer = EventWriter(writer_sessions, batch_size=10, max_latency=60)
+        writer.start()
+        writer.submit_many(UserBehaviorEvent, [make_row(i) for i in range(10)])
+        deadline = time.monotonic() + 5
+        while count_rows(writer_sessions) < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert count_rows(writer_sessions) == 10
+        writer.stop(timeout=5)
+
+    def test_flushes_on_age(self, writer_sessions):
+        writer = EventWriter(writer_sessions, batch_size=1000, max_latency=0.02)
+        writer.start()
+        writer.submit(UserBehaviorEvent, make_row())
+        deadline = time.monotonic() + 5
+        while count_rows(writer_sessions) < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert count_rows(writer_sessions) == 1
+        writer.stop(timeout=5)
+
+    def test_queue_full_raises(self, writer_sessions):
+        writer = EventWriter(writer_sessions, batch_size=1000, max_latency=60, max_queue_size=3)
+        writer.start()
+        writer.submit_many(UserBehaviorEvent, [make_row(i) for i in range(3)])
+        with pytest.raises(WriterQueueFull):
+            writer.submit(UserBehaviorEvent, make_row())
+        writer.stop(timeout=5)
+
+    def test_stop_drains_buffer(self, writer_sessions):
+        writer = EventWriter(writer_sessions, batch_size=1000, max_latency=60)
+        writer.start()
+        writer.submit_many(UserBehaviorEvent, [make_row(i) for i in range(25)])
+        assert writer.stop(timeout=5)
+        assert count_rows(writer_sessions) == 25
+        assert writer.depth == 0
+
+    def test_bad_row_does_not_drop_batch(self, writer_sessions):
+        writer = EventWriter(writer_sessions, batch_size=1000, max_latency=60)
+        writer.start()
+        bad = make_row()
+        bad["product_id"] = None  # violates NOT NULL
+        writer.submit_many(UserBehaviorEvent, [make_row(1), bad, make_row(2)])
+        writer.stop(timeout=5)
+        assert count_rows(writer_sessions) == 2
+        assert writer.failed_total == 1
+
+    def test_dropped_row_is_forgotten_by_dedup(self, writer_sessions):
+        writer = EventWriter(writer_sessions, batch_size=1000, max_latency=60)
+        writer.start()
+        bad = make_row()
+        bad["product_id"] = None
+        bad["idempotency_key"] = "writer-lost-1"
+        event_id = writer.submit(UserBehaviorEvent, bad)
+        remember(UserBehaviorEvent, ["writer-lost-1"], [event_id])
+        writer.stop(timeout=5)
+        assert cached_original(UserBehaviorEvent, "writer-lost-1") is None
+
+
+    def test_lost_connection_requeues_the_batch(self, writer_sessions, monkeypatch):
+        real_insert = writer_module.insert_events
+        calls = []
+
+        def flaky_insert(db, model, rows):
+            calls.append(len(rows))
+            if len(calls) == 1:
+                raise OperationalError("INSERT", {}, Exception("server closed the connection"))
+            return real_insert(db, model, rows)
+
+        monkeypatch.setattr(writer_module, "insert_events", flaky_insert)
+        writer = EventWriter(writer_sessions, batch_size=1000, max_latency=60, retry_backoff=0)
+        writer.start()
+        writer.submit_many(UserBehaviorEvent, [make_row(i) for i in range(3)])
+        assert writer.stop(timeout=5)
+        assert calls == [3, 3]
+        assert count_rows(writer_sessions) == 3
+        assert (writer.failed_total, writer.retried_total) == (0, 3)
+
+    def test_lost_connection_while_isolating_rows_keeps_the_rest(self, writer_sessions, monkeypatch):
+        real_insert = writer_module.insert_events
+        failed = []
+
+        def flaky_insert(db, model, rows):
+            if rows[0]["product_id"] == 3 and not failed:
+                failed.append(True)
+                raise OperationalError("INSERT", {}, Exception("server closed the connection"))
+            return real_insert(db, model, rows)
+
+        monkeypatch.setattr(writer_module, "insert_events", flaky_insert)
+        writer = EventWriter(writer_sessions, batch_size=1000, max_latency=60, retry_backoff=0)
+        writer.start()
+        bad = make_row()
+        bad["product_id"] = None
+        writer.submit_many(UserBehaviorEvent, [make_row(1), bad, make_row(3), make_row(4)])
+        assert writer.stop(timeout=5)
+        assert count_rows(writer_sessions) == 3
+        assert (writer.failed_total, writer.retried_total) == (1, 2)
+
+
+class TestBufferedEndpoints:
+
+    @pytest.fixture()
+    def running_writer(self, writer_sessions):
+        writer = writer_module.start_event_writer(writer_sessions, max_latency=0.01)
+        yield writer_sessions
+        writer_module.stop_event_writer(timeout=5)
+
+    def test_post_returns_202_with_event_id(self, client, running_writer):
+        payload = {
+            "event_type": "product_searched",
+            "event_time": "2024-06-01T10:00:00+00:00",
+            "product_id": 42,
+            "session_id": "sess-buffered",
+        }
+        res = client.post("/api/v1/events/user-behavior", json=payload)
+        assert res.status_code == 202
+        assert res.json()["event_id"]
+        writer_module.stop_event_writer(timeout=5)
+        assert count_rows(running_writer) == 1
+
+    def test_queue_full_returns_429(self, client, running_writer, monkeypatch):
+        writer = writer_module.get_event_writer()
+        monkeypatch.setattr(writer, "max_queue_size", 0)
+        payload = {
+            "event_type": "product_viewed",
+            "event_time": "2024-06-01T10:00:00+00:00",
+            "product_id": 43,
+            "session_id": "sess-full",
+        }
+        res = client.post("/api/v1/events/user-behavior", json=payload)
+        assert res.status_code == 429
+        assert res.headers["retry-after"] == "1"
+
+    def test_orders_stay_synchronous(self, client, running_writer):
+        payload = {
+            "order_id": "INV-WRITER-001",
+            "status": "pending",
+            "event_time": "2024-06-01T10:00:00+00:00",
+        }
+        res = client.post("/api/v1/events/order", json=payload)
+        assert res.status_code == 201
+        with running_writer() as db:
+            assert db.scalar(select(func.count()).select_from(OrderEvent)) == 0
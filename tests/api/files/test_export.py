@@ -0,0 +1,75 @@
+"""
+Tests for GET /events/{type}/export
+Covers: NDJSON and CSV bodies, time-range filtering, batching, headers, validation.
+"""
+import csv
+import io
+import json
+
+import pytest
+
+from app.db.models.user_behavior_events import UserBehaviorEvent
+from app.schemas.events.base import EventExportQuery, ExportFormat
+from app.services.persistence.exporters import stream_export
+
+BASE_URL = "/api/v1/events/user-behavior/export"
+
+
+@pytest.fixture()
+def seeded(client):
+    payloads = [
+        {
+            "event_type": "product_viewed",
+            "user_id": 1,
+            "event_time": f"2025-05-0{day}T10:00:00+00:00",
+            "product_id": 100 + day,
+            "session_id": "sess-export",
+        }
+        for day in (3, 1, 2)
+    ]
+    client.post("/api/v1/events/user-behavior/batch", json=payloads)
+    return client
+
+
+class TestExport:
+
+    def test_ndjson(self, seeded):
+        res = seeded.get(BASE_URL)
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("application/x-ndjson")
+        assert 'filename="user_behavior_events.ndjson"' in res.headers["content-disposition"]
+        rows = [json.loads(line) for line in res.text.splitlines()]
+        assert [row["product_id"] for row in rows] == [101, 102, 103]
+        assert rows[0]["event_type"] == "product_viewed"
+        assert rows[0]["event_id"]
+
+    def test_csv(self, seeded):
+        res = seeded.get(BASE_URL, params={"format": "csv"})
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(res.text)))
+        assert [row["product_id"] for row in rows] == ["101", "102", "103"]
+        assert rows[0]["user_id"] == "1"
+
+    def test_time_range(self, seeded):
+        res = seeded.get(BASE_URL, params={
+            "start": "2025-05-02T00:00:00+00:00", "end": "2025-05-03T00:00:00+00:00",
+        })
+        assert [json.loads(line)["product_id"] for line in res.text.splitlines()] == [102]
+
+    def test_empty_table(self, client):
+        res = client.get("/api/v1/events/logistics/export", params={"format": "csv"})
+        assert res.status_code == 200
+        assert res.text.splitlines()[0].startswith("event_id,")
+        assert len(res.text.splitlines()) == 1
+
+    def test_one_chunk_per_batch(self, seeded, db_session):
+        chunks = list(stream_export(
+            db_session.get_bind(), UserBehaviorEvent,
+            EventExportQuery(format=ExportFormat.NDJSON), batch_size=2,
+        ))
+        assert [chunk.count("\n") for chunk in chunks] == [2, 1]
+
+    def test_unknown_format(self, client):
+        res = client.get(BASE_URL, params={"format": "xml"})
+        assert res.status_code == 422
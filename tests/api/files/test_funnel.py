@@ -0,0 +1,120 @@
+"""
+Tests for GET /analytics/funnel
+Covers: step ordering, conversion window, guest exclusion, product scoping, validation.
+"""
+import pytest
+
+BASE_URL = "/api/v1/analytics/funnel"
+RANGE = {"start": "2025-03-01T00:00:00+00:00", "end": "2025-03-02T00:00:00+00:00"}
+
+
+def view(client, user_id, product_id=1, time="2025-03-01T10:00:00+00:00"):
+    client.post("/api/v1/events/user-behavior", json={
+        "event_type": "product_viewed",
+        "user_id": user_id,
+        "event_time": time,
+        "product_id": product_id,
+        "session_id": f"sess-funnel-{user_id}",
+    })
+
+
+def cart(client, user_id, product_id=1, time="2025-03-01T10:05:00+00:00", action="add"):
+    client.post("/api/v1/events/cart", json={
+        "correlation_id": f"sess-funnel-{user_id}",
+        "user_id": user_id,
+        "product_id": product_id,
+        "action": action,
+        "quantity": 1,
+        "event_time": time,
+    })
+
+
+def purchase(client, user_id, order_id, product_id=1, delivered=True):
+    client.post("/api/v1/events/order", json={
+        "order_id": order_id, "user_id": user_id, "status": "confirmed",
+        "event_time": "2025-03-01T10:10:00+00:00",
+    })
+    client.post("/api/v1/events/order-item", json={
+        "order_id": order_id, "product_id": str(product_id), "quantity": 1,
+        "price_at_purchase": 999, "event_time": "2025-03-01T10:10:00+00:00",
+    })
+    client.post("/api/v1/events/payment", json={
+        "order_id": order_id, "amount": 999, "status": "Success",
+        "event_time": "2025-03-01T10:15:00+00:00",
+    })
+    if delivered:
+        client.post("/api/v1/events/logistics", json={
+            "order_id": order_id, "status": "delivered",
+            "event_time": "2025-03-02T09:00:00+00:00",
+        })
+
+
+@pytest.fixture()
+def seeded(client):
+    # user 1 converts all the way, user 2 stops at cart, user 3 only views
+    view(client, 1)
+    cart(client, 1)
+    purchase(client, 1, "INV-F-1")
+    view(client, 2)
+    cart(client, 2)
+    view(client, 3)
+    # user 4 carted *before* viewing; user 5 carted outside the 72h window
+    view(client, 4)
+    cart(client, 4, time="2025-03-01T09:00:00+00:00")
+    view(client, 5)
+    cart(client, 5, time="2025-03-05T10:00:00+00:00")
+    # guests cannot be followed across tables
+    view(client, None)
+    # user 6 converts on a different product and is not delivered yet
+    view(client, 6, product_id=2)
+    cart(client, 6, product_id=2)
+    purchase(client, 6, "INV-F-6", product_id=2, delivered=False)
+    return client
+
+
+class TestFunnel:
+
+    def test_default_funnel_counts(self, seeded):
+        res = seeded.get(BASE_URL, params=RANGE)
+        assert res.status_code == 200
+        steps = res.json()["steps"]
+        assert [s["step"] for s in steps] == ["view", "cart", "order", "payment", "delivered"]
+        assert [s["users"] for s in steps] == [6, 3, 2, 2, 1]
+        assert steps[1]["conversion_from_previous"] == 0.5
+        assert steps[1]["drop_off"] == 3
+        assert steps[4]["conversion_from_start"] == round(1 / 6, 4)
+
+    def test_product_scoped_funnel(self, seeded):
+        res = seeded.get(BASE_URL, params={**RANGE, "product_id": 1})
+        assert [s["users"] for s in res.json()["steps"]] == [5, 2, 1, 1, 1]
+
+    def test_window_limits_conversion(self, seeded):
+        res = seeded.get(BASE_URL, params={**RANGE, "steps": "view,cart", "window_hours": 0.05})
+        # 0.05h = 3 minutes: every cart lands 5 minutes after its view
+        assert [s["users"] for s in res.json()["steps"]] == [6, 0]
+
+    def test_custom_steps(self, seeded):
+        res = seeded.get(BASE_URL, params={**RANGE, "steps": "cart,order"})
+        assert [s["users"] for s in res.json()["steps"]] == [4, 2]
+
+    def test_cart_action_is_case_insensitive(self, client):
+        view(client, 7)
+        cart(client, 7, action="Add")
+        res = client.get(BASE_URL, params={**RANGE, "steps": "view,cart"})
+        assert [s["users"] for s in res.json()["steps"]] == [1, 1]
+
+
+class TestFunnelValidation:
+
+    def test_unknown_step(self, client):
+        res = client.get(BASE_URL, params={**RANGE, "steps": "view,teleport"})
+        assert res.status_code == 422
+        assert "teleport" in res.json()["detail"]
+
+    def test_single_step(self, client):
+        res = client.get(BASE_URL, params={**RANGE, "steps": "view"})
+        assert res.status_code == 422
+
+    def test_inverted_range(self, client):
+        res = client.get(BASE_URL, params={"start": RANGE["end"], "end": RANGE["start"]})
+        assert res.status_code == 422
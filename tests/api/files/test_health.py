@@ -26,3 +26,128 @@ class TestHealthCheck:
         for route in app.routes:
             print(route.path)
         assert True   # just to see the output
+
+
+class TestPoolStats:
+
+    def test_pool_endpoint_reports_sync_pool(self, client):
+        res = client.get("/health/pool")
+        assert res.status_code == 200
+        sync = res.json()["sync"]
+        assert sync["pool_class"] == "InstrumentedQueuePool"
+        for key in ["size", "checked_out", "overflow", "checkouts", "wait_seconds_max"]:
+            assert key in sync, f"Missing pool stat: {key}"
+
+    def test_instrumented_pool_records_checkout_waits(self, tmp_path):
+        from sqlalchemy import create_engine, exc
+        from app.db.pool import InstrumentedQueuePool, pool_stats
+
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05,
+        )
+        held = engine.connect()
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        stats = pool_stats(engine.pool)
+        assert stats["checked_out"] == 1
+        assert stats["checkout_timeouts"] == 1
+        assert stats["wait_seconds_max"] >= 0.05
+        held.close()
+        engine.dispose()
+
+    def test_engine_options_postgres(self, monkeypatch):
+        from app.db import session
+
+        monkeypatch.setattr(session, "DB_STATEMENT_TIMEOUT_MS", 5000)
+        opts = session.engine_options("postgresql+psycopg2://u:p@db/x")
+        assert opts["executemany_mode"] == session.DB_EXECUTEMANY_MODE
+        assert opts["connect_args"] == {"options": "-c statement_timeout=5000"}
+        assert opts["pool_size"] == session.DB_POOL_SIZE
+
+        async_opts = session.engine_options("postgresql+asyncpg://u:p@db/x", is_async=True)
+        assert async_opts["connect_args"]["server_settings"]["statement_timeout"] == "5000"
+        assert "executemany_mode" not in async_opts
+
+    def test_engine_options_in_memory_sqlite_keeps_default_pool(self):
+        from app.db.session import engine_options
+
+        assert "poolclass" not in engine_options("sqlite://")
+
+
+class TestProbes:
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self):
+        from app.api.v1.routers.health import readiness_cache
+
+        readiness_cache.clear()
+        yield
+        readiness_cache.clear()
+
+    def test_liveness(self, client):
+        res = client.get("/health/live")
+        assert res.status_code == 200
+        assert res.json() == {"status": "alive"}
+
+    def test_readiness_reports_checks(self, client):
+        res = client.get("/health/ready")
+        assert res.status_code == 200
+        body = res.json()
+        assert body["status"] == "ready"
+        assert body["checks"]["database"]["ok"] is True
+        assert "latency_ms" in body["checks"]["database"]
+        assert body["checks"]["pool"]["ok"] is True
+        assert body["checks"]["writer"] == {"ok": True, "enabled": False}
+
+    def test_readiness_is_cached(self, client, monkeypatch):
+        from app.api.v1.routers import health
+
+        calls = []
+        real = health.check_readiness
+        monkeypatch.setattr(health, "check_readiness", lambda: calls.append(1) or real())
+        for _ in range(5):
+            assert client.get("/health/ready").status_code == 200
+        assert len(calls) == 1
+
+    def test_slow_database_is_not_ready(self, client, monkeypatch):
+        from app.api.v1.routers import health
+
+        monkeypatch.setattr(health, "HEALTH_DB_LATENCY_MAX_MS", -1)
+        res = client.get("/health/ready")
+        assert res.status_code == 503
+        assert res.json()["checks"]["database"]["ok"] is False
+
+    def test_saturated_pool_skips_database_probe(self, client, monkeypatch):
+        from app.api.v1.routers import health
+
+        stats = {"sync": {"size": 5, "max_overflow": 5, "checked_out": 10}}
+        monkeypatch.setattr(health, "get_pool_stats", lambda: stats)
+        monkeypatch.setattr(health, "_check_database", lambda: pytest.fail("database probed"))
+        res = client.get("/health")
+        assert res.status_code == 503
+        body = res.json()
+        assert body["checks"]["pool"]["pools"]["sync"]["saturation"] == 1.0
+        assert "skipped" in body["checks"]["database"]
+
+    def test_writer_backlog_and_stopped_writer(self, client, monkeypatch):
+        from app.api.v1.routers import health
+
+        class Writer:
+            alive = True
+            depth = 90
+            max_queue_size = 100
+
+        monkeypatch.setattr(health, "EVENT_WRITER_ENABLED", True)
+        monkeypatch.setattr(health, "get_event_writer", lambda: Writer())
+        res = client.get("/health/ready")
+        assert res.status_code == 503
+        assert res.json()["checks"]["writer"]["backlog"] == 0.9
+        assert client.get("/health/live").status_code == 200
+
+        Writer.alive = False
+        res = client.get("/health/live")
+        assert res.status_code == 503
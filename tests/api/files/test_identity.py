@@ -0,0 +1,168 @@
+"""
+Tests for identity resolution (services/ingestion/identity.py)
+Covers: actor_id for users and guests, linking a guest session on login,
+stitching earlier guest events, the persisted links and the in-memory map.
+"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app.db.models.cart_events import CartEvent
+from app.db.models.identity import IdentityLink
+from app.db.models.user_behavior_events import UserBehaviorEvent
+from app.services.ingestion import identity, sessionizer
+from app.services.ingestion.identity import IdentityMap, flush_identity_links, identity_map
+
+
+def behavior_payload(**overrides):
+    base = {
+        "event_type": "product_viewed",
+        "user_id": None,
+        "event_time": "2024-06-01T10:00:00+00:00",
+        "product_id": 1001,
+        "session_id": "guest-sess-1",
+    }
+    base.update(overrides)
+    return base
+
+
+@pytest.fixture()
+def enabled(monkeypatch):
+    monkeypatch.setattr(identity, "IDENTITY_RESOLUTION_ENABLED", True)
+    yield
+    identity_map.clear()
+
+
+def actors(db_session, model=UserBehaviorEvent):
+    query = select(model.actor_id).order_by(model.event_time, model.product_id)
+    return db_session.scalars(query).all()
+
+
+def post(client, **overrides):
+    res = client.post("/api/v1/events/user-behavior", json=behavior_payload(**overrides))
+    assert res.status_code == 201, res.text
+    return res.json()
+
+
+class TestResolution:
+
+    def test_user_and_guest_actors(self, client, enabled):
+        assert post(client, user_id=7)["actor_id"] == "user:7"
+        assert post(client, session_id="other-guest")["actor_id"] == "anon:other-guest"
+
+    def test_guest_events_after_login_resolve_to_user(self, client, enabled):
+        post(client, user_id=7, event_time="2024-06-01T10:05:00+00:00")
+        assert post(client, event_time="2024-06-01T10:10:00+00:00")["actor_id"] == "user:7"
+
+    def test_login_in_the_same_batch(self, client, db_session, enabled):
+        body = client.post("/api/v1/events/user-behavior/batch", json=[
+            behavior_payload(product_id=1),
+            behavior_payload(product_id=2, user_id=7, event_time="2024-06-01T10:05:00+00:00"),
+        ]).json()
+        assert body["accepted"] == 2
+        assert actors(db_session) == ["user:7", "user:7"]
+
+    def test_earlier_guest_events_are_stitched_on_flush(self, client, db_session, enabled):
+        post(client, product_id=1)
+        client.post("/api/v1/events/cart", json={
+            "correlation_id": "guest-sess-1", "product_id": 1, "action": "add",
+            "quantity": 1, "event_time": "2024-06-01T10:01:00+00:00",
+        })
+        post(client, product_id=2, user_id=7, event_time="2024-06-01T10:05:00+00:00")
+        assert actors(db_session) == ["anon:guest-sess-1", "user:7"]
+
+        assert flush_identity_links(db_session) == 1
+        db_session.expire_all()
+        assert actors(db_session) == ["user:7", "user:7"]
+        assert actors(db_session, CartEvent) == ["user:7"]
+        assert db_session.get(IdentityLink, "guest-sess-1").actor_id == "user:7"
+        assert flush_identity_links(db_session) == 0
+
+    def test_stitching_keeps_events_of_another_user(self, client, db_session, enabled):
+        post(client, product_id=1, user_id=7)
+        post(client, product_id=2, user_id=8, event_time="2024-06-01T10:05:00+00:00")
+        flush_identity_links(db_session)
+        db_session.expire_all()
+        assert actors(db_session) == ["user:7", "user:8"]
+
+    def test_persisted_link_is_used_for_unknown_session(self, client, db_session, enabled):
+        db_session.add(IdentityLink(anonymous_id="guest-sess-1", actor_id="user:9"))
+        db_session.commit()
+        assert post(client)["actor_id"] == "user:9"
+
+    def test_read_by_actor(self, client, enabled):
+        post(client, product_id=1, user_id=7)
+        post(client, product_id=2, session_id="someone-else")
+        res = client.get("/api/v1/events/user-behavior", params={"actor_id": "user:7"})
+        assert [row["product_id"] for row in res.json()] == [1]
+
+    def test_sessions_follow_the_resolved_actor(self, client, db_session, enabled, monkeypatch):
+        monkeypatch.setattr(sessionizer, "SESSIONIZATION_ENABLED", True)
+        post(client, product_id=1, user_id=7)
+        second = post(client, product_id=2, event_time="2024-06-01T10:05:00+00:00")
+        assert second["actor_id"] == "user:7"
+        sessions = db_session.scalars(select(UserBehaviorEvent.server_session_id)).all()
+        assert len(set(sessions)) == 1
+
+    def test_rows_written_by_other_workers_are_stitched_later(self, client, db_session, enabled, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(identity, "time", SimpleNamespace(monotonic=lambda: now[0]))
+        post(client, product_id=1, user_id=7)
+        flush_identity_links(db_session)
+        # Another worker, still holding a "not linked" entry, writes a guest row.
+        db_session.add(UserBehaviorEvent(
+            event_type="product_viewed", product_id=2, session_id="guest-sess-1",
+            actor_id="anon:guest-sess-1", event_time=datetime(2024, 6, 1, 10, 5, tzinfo=timezone.utc),
+        ))
+        db_session.flush()
+        assert flush_identity_links(db_session) == 0
+        db_session.expire_all()
+        assert actors(db_session) == ["user:7", "anon:guest-sess-1"]
+
+        now[0] += identity.IDENTITY_NEGATIVE_TTL_S + identity.IDENTITY_FLUSH_INTERVAL_S
+        assert flush_identity_links(db_session) == 0
+        db_session.expire_all()
+        assert actors(db_session) == ["user:7", "user:7"]
+
+    def test_disabled_by_default(self, client):
+        assert post(client, user_id=7)["actor_id"] is None
+
+
+class TestIdentityMap:
+
+    def test_negative_results_are_cached(self):
+        links = IdentityMap(max_size=10, ttl=60)
+        assert links.lookup(["a"]) == ({}, ["a"])
+        links.load(["a"], {})
+        assert links.lookup(["a"]) == ({"a": None}, [])
+
+    def test_only_new_links_are_pending(self):
+        links = IdentityMap(max_size=10, ttl=60)
+        links.load(["a", "b"], {"a": "user:1"})
+        links.link({"a": "user:1", "b": "user:2"})
+        assert links.take_pending() == {"b": "user:2"}
+
+    def test_pending_links_survive_eviction(self):
+        links = IdentityMap(max_size=1, ttl=60)
+        links.link({"a": "user:1"})
+        links.link({"b": "user:2"})
+        assert len(links) == 1
+        assert links.lookup(["a"]) == ({"a": "user:1"}, [])
+
+    def test_negative_results_expire_sooner(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(identity, "time", SimpleNamespace(monotonic=lambda: now[0]))
+        links = IdentityMap(max_size=10, ttl=3600, negative_ttl=30)
+        links.load(["a", "b"], {"b": "user:1"})
+        now[0] += 31
+        assert links.lookup(["a", "b"]) == ({"b": "user:1"}, ["a"])
+
+    def test_entries_expire(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(identity, "time", SimpleNamespace(monotonic=lambda: now[0]))
+        links = IdentityMap(max_size=10, ttl=5)
+        links.load(["a"], {})
+        now[0] += 6
+        assert links.lookup(["a"]) == ({}, ["a"])
@@ -0,0 +1,92 @@
+"""
+Tests for GET /metrics and the metric primitives in app/core/metrics.py
+Covers: exposition format, per-route counters, ingestion/reject counters, histograms, threads.
+"""
+import threading
+
+from app.core.metrics import Counter, Histogram
+
+
+def sample_value(text, prefix):
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def behavior(product_id=1, **overrides):
+    payload = {
+        "event_type": "product_viewed",
+        "user_id": 1,
+        "event_time": "2025-06-01T10:00:00+00:00",
+        "product_id": product_id,
+        "session_id": "sess-metrics",
+    }
+    payload.update(overrides)
+    return payload
+
+
+class TestMetricsEndpoint:
+
+    def test_prometheus_text_format(self, client):
+        res = client.get("/metrics")
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE http_request_duration_seconds histogram" in res.text
+        assert "# TYPE db_pool_connections gauge" in res.text
+        assert "event_writer_queue_depth 0" in res.text
+
+    def test_route_template_counts_and_latency(self, client):
+        route = 'method="POST",route="/api/v1/events/user-behavior"'
+        before = client.get("/metrics").text
+        client.post("/api/v1/events/user-behavior", json=behavior())
+        client.post("/api/v1/events/user-behavior", json=behavior(event_type="bogus"))
+        after = client.get("/metrics").text
+
+        for status, delta in (("201", 1), ("422", 1)):
+            prefix = f'http_requests_total{{{route},status="{status}"}}'
+            assert sample_value(after, prefix) - sample_value(before, prefix) == delta
+        count = f"http_request_duration_seconds_count{{{route}}}"
+        assert sample_value(after, count) - sample_value(before, count) == 2
+
+    def test_ingested_and_rejected_counters(self, client):
+        ingested = 'events_ingested_total{table="user_behavior_events"}'
+        rejected = 'ingest_rejects_total{table="user_behavior_events",reason="validation"}'
+        before = client.get("/metrics").text
+        client.post("/api/v1/events/user-behavior/batch",
+                    json=[behavior(1), behavior(2), behavior(3, event_type="bogus")])
+        after = client.get("/metrics").text
+        assert sample_value(after, ingested) - sample_value(before, ingested) == 2
+        assert sample_value(after, rejected) - sample_value(before, rejected) == 1
+        assert sample_value(after, "db_commit_duration_seconds_count") > \
+            sample_value(before, "db_commit_duration_seconds_count")
+
+
+class TestPrimitives:
+
+    def test_counter_sums_thread_shards(self):
+        counter = Counter("test_total", "test", ("kind",))
+
+        def work():
+            for _ in range(1000):
+                counter.inc("a")
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counter.values() == {("a",): 8000}
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("test_seconds", "test", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        lines = list(histogram.samples())
+        assert lines == [
+            'test_seconds_bucket{le="0.1"} 2',
+            'test_seconds_bucket{le="1.0"} 3',
+            'test_seconds_bucket{le="+Inf"} 4',
+            "test_seconds_sum 2.65",
+            "test_seconds_count 4",
+        ]
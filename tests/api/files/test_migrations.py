@@ -0,0 +1,128 @@
+"""
+Tests for schema migrations (migrations/, scripts/init_db.py)
+Covers: the migrations produce the schema the models declare, a
+pre-migrations database is adopted at the baseline and upgraded, downgrade
+removes the schema again, tables made under another DB_PARTITIONING are
+refused, startup leaves the schema alone unless DB_AUTO_CREATE, and the
+init_db options.
+"""
+from datetime import datetime, timezone
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+
+from app import main
+from app.db.base import Base
+from scripts import init_db
+
+
+@pytest.fixture()
+def empty_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    yield engine
+    engine.dispose()
+
+
+def upgrade(engine, revision="head"):
+    with engine.begin() as connection:
+        init_db.upgrade(connection, revision, configure_logger=False)
+
+
+def assert_matches_models(engine):
+    with engine.connect() as connection:
+        # Types are compared by `alembic check` (SQLite reflects UUID as NUMERIC).
+        context = MigrationContext.configure(connection, opts={"compare_type": False})
+        assert compare_metadata(context, Base.metadata) == []
+
+
+def columns(engine, table):
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+
+class TestMigrations:
+
+    def test_head_matches_models(self, empty_engine):
+        upgrade(empty_engine)
+        assert_matches_models(empty_engine)
+        with empty_engine.connect() as connection:
+            assert MigrationContext.configure(connection).get_current_revision() is not None
+
+    def test_downgrade_to_base(self, empty_engine):
+        upgrade(empty_engine)
+        with empty_engine.begin() as connection:
+            config = init_db.alembic_config(connection, configure_logger=False)
+            command.downgrade(config, "base")
+        assert inspect(empty_engine).get_table_names() == ["alembic_version"]
+
+    def test_pre_migrations_database_is_stamped_and_upgraded(self, empty_engine):
+        # A database created by create_all before migrations: baseline tables, no version.
+        upgrade(empty_engine, init_db.BASELINE_REVISION)
+        with empty_engine.begin() as connection:
+            connection.execute(text("DROP TABLE alembic_version"))
+            connection.execute(text(
+                "INSERT INTO order_events (event_id, order_id, status, event_time)"
+                " VALUES (1, 'INV-1', 'pending', '2024-01-01 00:00:00')"
+            ))
+        assert "idempotency_key" not in columns(empty_engine, "order_events")
+
+        with empty_engine.begin() as connection:
+            command.stamp(init_db.alembic_config(connection, configure_logger=False), init_db.BASELINE_REVISION)
+        upgrade(empty_engine)
+        assert_matches_models(empty_engine)
+        with empty_engine.connect() as connection:
+            assert connection.scalar(text("SELECT order_id FROM order_events")) == "INV-1"
+
+    def test_downgrade_to_baseline(self, empty_engine):
+        upgrade(empty_engine)
+        upgrade_columns = columns(empty_engine, "user_behavior_events")
+        with empty_engine.begin() as connection:
+            command.downgrade(init_db.alembic_config(connection, configure_logger=False), init_db.BASELINE_REVISION)
+        removed = upgrade_columns - columns(empty_engine, "user_behavior_events")
+        assert {"idempotency_key", "actor_id", "server_session_id", "product_category"} <= removed
+        assert "identity_links" not in inspect(empty_engine).get_table_names()
+
+    def test_refuses_tables_made_under_another_partitioning(self, empty_engine, monkeypatch):
+        from app.services.persistence import partitions
+
+        monkeypatch.setattr(partitions, "partitioning_mismatch", lambda db: "cart_events are partitioned")
+        with pytest.raises(RuntimeError, match="cart_events are partitioned"):
+            upgrade(empty_engine)
+        assert "cart_events" not in inspect(empty_engine).get_table_names()
+
+    def test_stamp_defaults_to_baseline(self):
+        assert init_db.parse_args(["--stamp"]).revision == init_db.BASELINE_REVISION
+        assert init_db.parse_args([]).revision == "head"
+
+    def test_partitions_since(self, monkeypatch):
+        with pytest.raises(SystemExit):
+            init_db.parse_args(["--partitions-since", "2023-01-01"])
+        monkeypatch.setattr(init_db, "PARTITIONED", True)
+        since = init_db.parse_args(["--partitions-since", "2023-01-01"]).partitions_since
+        assert since == datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+    def test_upgrade_is_idempotent(self, empty_engine):
+        upgrade(empty_engine)
+        upgrade(empty_engine)
+        assert "user_behavior_events" in inspect(empty_engine).get_table_names()
+
+
+class TestStartup:
+
+    def test_startup_skips_create_all(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(Base.metadata, "create_all", lambda **kwargs: calls.append(kwargs))
+        with TestClient(main.app):
+            pass
+        assert calls == []
+
+    def test_auto_create(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(main, "DB_AUTO_CREATE", True)
+        monkeypatch.setattr(Base.metadata, "create_all", lambda **kwargs: calls.append(kwargs))
+        with TestClient(main.app):
+            pass
+        assert calls == [{"bind": main.engine}]
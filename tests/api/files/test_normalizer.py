@@ -0,0 +1,120 @@
+"""
+Tests for payload normalization (services/ingestion/normalizer.py)
+Covers: key variants and synonyms, enum/country/source/platform values,
+and that both single and batch ingestion accept non-canonical payloads.
+"""
+import pytest
+
+from app.schemas.events.order_base import OrderItemCreate
+from app.schemas.events.user_events import UserBehaviorCreate
+from app.services.ingestion.normalizer import (
+    MAX_LEARNED_KEYS,
+    canonical_country,
+    canonical_platform,
+    canonical_source,
+    canonical_token,
+    get_normalizer,
+)
+
+
+def messy_behavior_payload(**overrides):
+    base = {
+        "eventType": "Product Viewed",
+        "userId": 101,
+        "timestamp": "2024-06-01T10:00:00+00:00",
+        "ProductID": 1001,
+        "session-id": "sess-norm-001",
+        "Country": " united kingdom ",
+        "source": "CPC",
+        "platform": "iPhone",
+    }
+    base.update(overrides)
+    return base
+
+
+class TestCanonicalValues:
+
+    @pytest.mark.parametrize("raw", [
+        "product_viewed", "Product Viewed", "productViewed", "ProductViewed",
+        "PRODUCT_VIEWED", "product-viewed", "  product viewed ",
+    ])
+    def test_event_names(self, raw):
+        assert canonical_token(raw) == "product_viewed"
+
+    @pytest.mark.parametrize("raw, expected", [
+        ("us", "US"), (" GB ", "GB"), ("uk", "GB"), ("United  Kingdom", "GB"), ("EIRE", "IE"), ("ZZ", "ZZ"),
+    ])
+    def test_countries(self, raw, expected):
+        assert canonical_country(raw) == expected
+
+    def test_sources_and_platforms(self):
+        assert canonical_platform("iPhone") == "ios"
+        assert canonical_platform("Android") == "android"
+        assert canonical_platform("Mobile Web") == "web"
+        assert canonical_source("E-Mail") == "email"
+        assert canonical_source("Organic") == "organic"
+
+
+class TestNormalizer:
+
+    def test_keys_and_values(self):
+        normalized = get_normalizer(UserBehaviorCreate)(messy_behavior_payload())
+        assert normalized == {
+            "event_type": "product_viewed",
+            "user_id": 101,
+            "event_time": "2024-06-01T10:00:00+00:00",
+            "product_id": 1001,
+            "session_id": "sess-norm-001",
+            "country": "GB",
+            "source": "ads",
+            "platform": "ios",
+        }
+
+    def test_exact_key_wins_over_variant(self):
+        normalizer = get_normalizer(UserBehaviorCreate)
+        assert normalizer({"productId": 1, "product_id": 2})["product_id"] == 2
+        assert normalizer({"product_id": 2, "productId": 1})["product_id"] == 2
+
+    def test_unknown_keys_pass_through(self):
+        assert get_normalizer(UserBehaviorCreate)({"someExtra": 1}) == {"someExtra": 1}
+
+    def test_retail_dataset_columns(self):
+        normalized = get_normalizer(OrderItemCreate)({
+            "InvoiceNo": "536365", "StockCode": "85123A", "Description": "HEART",
+            "Quantity": 6, "InvoiceDate": "2010-12-01T08:26:00",
+        })
+        assert set(normalized) == {"order_id", "product_id", "description", "quantity", "event_time"}
+
+    def test_non_string_values_are_left_for_validation(self):
+        assert get_normalizer(UserBehaviorCreate)({"country": 7})["country"] == 7
+
+    def test_learned_keys_are_bounded(self):
+        normalizer = get_normalizer(UserBehaviorCreate)
+        for i in range(MAX_LEARNED_KEYS + 10):
+            normalizer({f"junk{i}": i})
+        assert len(normalizer.key_map) <= normalizer._precompiled + MAX_LEARNED_KEYS
+
+
+class TestIngestion:
+
+    def test_single_event(self, client):
+        res = client.post("/api/v1/events/user-behavior", json=messy_behavior_payload())
+        assert res.status_code == 201
+        data = res.json()
+        assert data["event_type"] == "product_viewed"
+        assert data["product_id"] == 1001
+        assert (data["country"], data["source"], data["platform"]) == ("GB", "ads", "ios")
+
+    def test_batch(self, client):
+        payloads = [messy_behavior_payload(ProductID=i) for i in range(3)]
+        payloads.append(messy_behavior_payload(eventType="Product Purchased"))
+        body = client.post("/api/v1/events/user-behavior/batch", json=payloads).json()
+        assert (body["accepted"], body["rejected"]) == (3, 1)
+        assert body["results"][3]["errors"][0]["loc"] == ["event_type"]
+
+    def test_order_status_casing(self, client):
+        res = client.post("/api/v1/events/order", json={
+            "orderId": "INV-NORM-1", "Status": "Confirmed", "eventTime": "2024-06-01T10:00:00+00:00",
+        })
+        assert res.status_code == 201
+        assert res.json()["status"] == "confirmed"
@@ -1,9 +1,13 @@
 """
 Tests for POST /events/order
-Covers: all OrderStatus enum values, nullable user_id, missing fields.
+Covers: all OrderStatus enum values, nullable user_id, missing fields,
+order_id uniqueness without a database constraint (partitioned tables).
 """
 import pytest
 
+from app.api.v1.routers import events
+from app.db.models.order_events import OrderEvent
+
 BASE_URL = "/api/v1/events/order"
 
 
@@ -72,6 +76,27 @@ class TestCreateOrderEvent:
         # unique violation → 500 (integrity error) or 409 depending on error handler
         assert res.status_code in (409, 500)
 
+    @pytest.mark.parametrize("path, order_id", [
+        (BASE_URL, "INV-DUP-SINGLE"),
+        ("/api/v1/events", "INV-DUP-ENVELOPE"),
+    ])
+    def test_duplicate_order_id_without_constraint(self, client, monkeypatch, path, order_id):
+        """Partitioned tables have no order_id constraint: the pre-check answers 409 before the insert."""
+        monkeypatch.setattr(OrderEvent.__table__.c.order_id, "unique", False)
+        assert client.post(BASE_URL, json=make_payload(order_id=order_id)).status_code == 201
+
+        def fail_insert(*args):
+            raise AssertionError("duplicate order_id reached the insert")
+
+        monkeypatch.setattr(events, "insert_event_returning", fail_insert)
+        monkeypatch.setattr(OrderEvent, "__init__", fail_insert)
+        payload = make_payload(order_id=order_id, status="confirmed")
+        if path != BASE_URL:
+            payload = {"type": "order", "data": payload}
+        res = client.post(path, json=payload)
+        assert res.status_code == 409
+        assert res.json()["detail"] == "order_id already exists"
+
 
 class TestCreateOrderEventValidation:
 
@@ -0,0 +1,268 @@
+"""
+Tests for time partitioning (app/db/partitioning.py, services/persistence/partitions.py)
+Covers: partition ranges and names, the partitioned table DDL, creating
+upcoming and backfilled partitions (moving rows out of the default
+partition), expiring old partitions and old default-partition rows, the
+maintenance lock, startup failures and detecting tables created under another
+DB_PARTITIONING. The DDL runs only on
+Postgres, so maintenance is checked against a session stand-in that records
+statements.
+"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from app.core import startup
+from app.db import partitioning
+from app.db.models.order_events import OrderEvent
+from app.db.partitioning import unique_columns
+from app.services.persistence import partitions
+from app.services.persistence.partitions import (
+    PARTITIONED_TABLES,
+    ensure_partitions,
+    expire_partitions,
+    parse_partition,
+    partitioning_mismatch,
+    planned_partitions,
+)
+
+NOW = datetime(2024, 11, 15, 12, 30, tzinfo=timezone.utc)
+
+
+class RecordingSession:
+    """
+    Stands in for a Postgres session: lists existing partitions, records DDL.
+    ``misplaced`` tables have rows in their default partition for every range;
+    ``locked`` is False while another worker holds the maintenance lock.
+    """
+
+    def __init__(self, existing=(), misplaced=(), locked=True):
+        self.existing = list(existing)
+        self.misplaced = set(misplaced)
+        self.locked = locked
+        self.statements = []
+        self.commits = 0
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=postgresql.dialect())
+
+    def scalars(self, statement, params):
+        return [name for name in self.existing if name.startswith(params["table"] + "_")]
+
+    def scalar(self, statement):
+        sql = str(statement)
+        if "pg_try_advisory_xact_lock" in sql:
+            return self.locked
+        return any(f"FROM {table}_default " in sql for table in self.misplaced)
+
+    def execute(self, statement):
+        self.statements.append(str(statement))
+
+    def commit(self):
+        self.commits += 1
+
+
+class CatalogSession(RecordingSession):
+    """Also answers the ``pg_class`` lookup with ``kinds`` (table -> relkind)."""
+
+    def __init__(self, kinds, existing=()):
+        super().__init__(existing)
+        self.kinds = kinds
+
+    def execute(self, statement, params=None):
+        return SimpleNamespace(all=lambda: list(self.kinds.items()))
+
+
+class TestRanges:
+
+    def test_monthly_partitions_roll_over_the_year(self):
+        planned = planned_partitions("cart_events", NOW, datetime(2025, 1, 3, tzinfo=timezone.utc), "monthly")
+        assert [p.name for p in planned] == ["cart_events_p202411", "cart_events_p202412", "cart_events_p202501"]
+        assert planned[1].start == datetime(2024, 12, 1, tzinfo=timezone.utc)
+        assert planned[1].end == datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def test_daily_partitions(self):
+        planned = planned_partitions("cart_events", NOW, NOW, "daily")
+        assert [(p.name, p.start.day, p.end.day) for p in planned] == [("cart_events_p20241115", 15, 16)]
+
+    def test_parse_partition(self):
+        assert parse_partition("cart_events", "cart_events_p202411", "monthly").end.month == 12
+        assert parse_partition("cart_events", "cart_events_default", "monthly") is None
+        assert parse_partition("cart_events", "other_p202411", "monthly") is None
+
+
+class TestTableDefinition:
+
+    def test_partitioned_table_ddl(self, monkeypatch):
+        monkeypatch.setattr(partitioning, "PARTITIONED", True)
+        *indexes, options = partitioning.partitioned_table_args(
+            Index("uq_events_key", *partitioning.partition_key("idempotency_key"), unique=True),
+        )
+        table = Table(
+            "events", MetaData(),
+            Column("event_id", Integer, primary_key=True),
+            Column("event_time", DateTime(timezone=True), primary_key=True),
+            Column("idempotency_key", String),
+            *indexes,
+            **options,
+        )
+        ddl = str(CreateTable(table).compile(dialect=postgresql.dialect()))
+        assert "PRIMARY KEY (event_id, event_time)" in ddl
+        assert "PARTITION BY RANGE (event_time)" in ddl
+        assert [c.name for c in table.indexes.pop().columns] == ["idempotency_key", "event_time"]
+
+    def test_unpartitioned_by_default(self):
+        assert partitioning.partitioned_table_args("x") == ("x",)
+        assert partitioning.partition_key("idempotency_key") == ("idempotency_key",)
+
+    def test_order_id_stays_unique_for_ingestion(self):
+        assert [c.name for c in unique_columns(OrderEvent)] == ["order_id"]
+
+
+class TestMaintenance:
+
+    def test_creates_default_current_and_upcoming_partitions(self):
+        db = RecordingSession(existing=["cart_events_default", "cart_events_p202411"])
+        created = ensure_partitions(db, NOW, premake=1, granularity="monthly")
+        assert "cart_events_p202411" not in created
+        assert "cart_events_p202412" in created
+        assert len(created) == 2 * len(PARTITIONED_TABLES) - 1
+        assert (
+            'CREATE TABLE IF NOT EXISTS cart_events_p202412 PARTITION OF cart_events '
+            "FOR VALUES FROM ('2024-12-01 00:00:00+00') TO ('2025-01-01 00:00:00+00')"
+        ) in db.statements
+        assert "CREATE TABLE IF NOT EXISTS order_events_default PARTITION OF order_events DEFAULT" in db.statements
+        assert not any("cart_events_default" in s for s in db.statements)
+
+    def test_rows_in_the_default_partition_are_moved(self):
+        db = RecordingSession(existing=["cart_events_default"], misplaced=["cart_events"])
+        ensure_partitions(db, NOW, premake=0, granularity="monthly")
+        start = db.statements.index("CREATE TABLE cart_events_p202411 (LIKE cart_events INCLUDING DEFAULTS)")
+        assert db.statements[start + 1:start + 3] == [
+            "WITH moved AS (DELETE FROM cart_events_default WHERE event_time >= '2024-11-01 00:00:00+00' "
+            "AND event_time < '2024-12-01 00:00:00+00' RETURNING *) INSERT INTO cart_events_p202411 SELECT * FROM moved",
+            "ALTER TABLE cart_events ATTACH PARTITION cart_events_p202411 "
+            "FOR VALUES FROM ('2024-11-01 00:00:00+00') TO ('2024-12-01 00:00:00+00')",
+        ]
+        assert (
+            "CREATE TABLE IF NOT EXISTS payment_events_p202411 PARTITION OF payment_events "
+            "FOR VALUES FROM ('2024-11-01 00:00:00+00') TO ('2024-12-01 00:00:00+00')"
+        ) in db.statements
+
+    def test_skips_while_another_worker_maintains(self):
+        db = RecordingSession(locked=False)
+        assert ensure_partitions(db, NOW, premake=1, granularity="monthly") == []
+        assert expire_partitions(db, NOW, retention_days=1, mode="archive", granularity="monthly") == []
+        assert db.statements == []
+
+    def test_backfill_range(self):
+        db = RecordingSession()
+        created = ensure_partitions(
+            db, NOW, premake=0, since=datetime(2024, 9, 20, tzinfo=timezone.utc), granularity="monthly"
+        )
+        assert [n for n in created if n.startswith("payment_events")] == [
+            "payment_events_p202409", "payment_events_p202410", "payment_events_p202411",
+        ]
+
+    def test_drop_expired(self):
+        db = RecordingSession(existing=[
+            "cart_events_p20241101", "cart_events_p20241102", "cart_events_p20241103", "cart_events_default",
+        ])
+        expired = expire_partitions(db, NOW, retention_days=12, mode="drop", granularity="daily")
+        assert expired == ["cart_events_p20241101", "cart_events_p20241102"]
+        assert db.statements[:2] == [
+            "ALTER TABLE cart_events DETACH PARTITION cart_events_p20241101",
+            "DROP TABLE cart_events_p20241101",
+        ]
+        assert db.commits == 2
+
+    def test_archive_expired(self):
+        db = RecordingSession(existing=["logistics_events_p202401"])
+        expire_partitions(db, NOW, retention_days=90, mode="archive", granularity="monthly")
+        assert db.statements == [
+            "CREATE SCHEMA IF NOT EXISTS archive",
+            "ALTER TABLE logistics_events DETACH PARTITION logistics_events_p202401",
+            "ALTER TABLE logistics_events_p202401 SET SCHEMA archive",
+        ]
+
+    def test_expired_rows_are_deleted_from_the_default_partition(self):
+        db = RecordingSession(existing=["cart_events_default"], misplaced=["cart_events"])
+        assert expire_partitions(db, NOW, retention_days=14, mode="drop", granularity="monthly") == []
+        assert db.statements == ["DELETE FROM cart_events_default WHERE event_time < '2024-11-01 12:30:00+00'"]
+        assert db.commits == 1
+
+    def test_expired_rows_of_the_default_partition_are_archived(self):
+        db = RecordingSession(existing=["cart_events_default"], misplaced=["cart_events"])
+        expire_partitions(db, NOW, retention_days=14, mode="archive", granularity="monthly")
+        assert db.statements[1:] == [
+            "CREATE TABLE IF NOT EXISTS archive.cart_events_default (LIKE cart_events INCLUDING DEFAULTS)",
+            "WITH moved AS (DELETE FROM cart_events_default WHERE event_time < '2024-11-01 12:30:00+00' "
+            "RETURNING *) INSERT INTO archive.cart_events_default SELECT * FROM moved",
+        ]
+
+    def test_maintenance_covers_backfilled_history(self, monkeypatch):
+        monkeypatch.setattr(partitions, "PARTITIONED", True)
+        monkeypatch.setattr(partitions, "expire_partitions", lambda db, now: [])
+        calls = []
+        monkeypatch.setattr(partitions, "ensure_partitions", lambda db, now, since: calls.append(since))
+        since = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        partitions.run_partition_maintenance(RecordingSession(), NOW, since=since)
+        assert calls == [since]
+
+    def test_retention_disabled(self):
+        db = RecordingSession(existing=["cart_events_p202001"])
+        assert expire_partitions(db, NOW, retention_days=0, granularity="monthly") == []
+        assert db.statements == []
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            expire_partitions(RecordingSession(), NOW, retention_days=1, mode="truncate", granularity="daily")
+
+    def test_failed_startup_maintenance_does_not_stop_startup(self, monkeypatch):
+        def fail():
+            raise RuntimeError("partition overlaps rows in the default partition")
+
+        started = []
+        monkeypatch.setattr(startup, "PARTITIONED", True)
+        monkeypatch.setattr(startup, "_maintain_partitions", fail)
+        monkeypatch.setattr(startup, "start_periodic", lambda name, func, interval: started.append(name))
+        for flag in ("EVENT_WRITER_ENABLED", "AGGREGATOR_ENABLED", "IDENTITY_RESOLUTION_ENABLED",
+                     "SESSIONIZATION_ENABLED"):
+            monkeypatch.setattr(startup, flag, False)
+        startup.start_background_services()
+        assert started == ["partition-maintenance"]
+
+    def test_maintenance_is_a_no_op_when_unpartitioned(self):
+        db = RecordingSession()
+        partitions.run_partition_maintenance(db, NOW)
+        assert db.statements == []
+
+
+class TestSchemaMismatch:
+
+    def test_fresh_database_fits(self):
+        assert partitioning_mismatch(CatalogSession({}), "monthly") is None
+
+    def test_matching_layout(self):
+        kinds = {table: "p" for table in PARTITIONED_TABLES}
+        db = CatalogSession(kinds, existing=["cart_events_default", "cart_events_p202411"])
+        assert partitioning_mismatch(db, "monthly") is None
+        assert partitioning_mismatch(CatalogSession({"cart_events": "r"}), "") is None
+
+    def test_partitioning_turned_on(self):
+        mismatch = partitioning_mismatch(CatalogSession({"cart_events": "r"}), "monthly")
+        assert mismatch == "DB_PARTITIONING=monthly but cart_events are not partitioned"
+
+    def test_partitioning_turned_off(self):
+        mismatch = partitioning_mismatch(CatalogSession({"cart_events": "p", "order_events": "p"}), "")
+        assert mismatch == "DB_PARTITIONING is off but cart_events, order_events are partitioned"
+
+    def test_granularity_changed(self):
+        db = CatalogSession({"cart_events": "p"}, existing=["cart_events_default", "cart_events_p20241115"])
+        assert partitioning_mismatch(db, "monthly") == (
+            "DB_PARTITIONING=monthly but cart_events has partition cart_events_p20241115"
+        )
@@ -0,0 +1,164 @@
+"""
+Tests for server-side session assignment (services/ingestion/sessionizer.py)
+Covers: inactivity gaps per actor, guests vs signed-in users, late events,
+the persisted fallback, write-behind flushes and the in-memory table itself.
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app.db.models.cart_events import CartEvent
+from app.db.models.sessions import ActorSession
+from app.db.models.user_behavior_events import UserBehaviorEvent
+from app.services.ingestion import sessionizer
+from app.services.ingestion.sessionizer import (
+    SessionState,
+    SessionTable,
+    flush_sessions,
+    session_table,
+)
+
+T0 = datetime(2024, 6, 1, 10, 0, tzinfo=timezone.utc)
+GAP = timedelta(minutes=30)
+
+
+def at(minutes):
+    return (T0 + timedelta(minutes=minutes)).isoformat()
+
+
+def behavior_payload(**overrides):
+    base = {
+        "event_type": "product_viewed",
+        "user_id": 101,
+        "event_time": at(0),
+        "product_id": 1001,
+        "session_id": "sess-client-001",
+    }
+    base.update(overrides)
+    return base
+
+
+@pytest.fixture()
+def enabled(monkeypatch):
+    monkeypatch.setattr(sessionizer, "SESSIONIZATION_ENABLED", True)
+    monkeypatch.setattr(sessionizer, "SESSION_INACTIVITY_GAP_S", GAP.total_seconds())
+    yield
+    session_table.clear()
+
+
+def stored_sessions(db_session, model=UserBehaviorEvent):
+    query = select(model.server_session_id).order_by(model.event_time)
+    return db_session.scalars(query).all()
+
+
+class TestIngestion:
+
+    def test_gap_starts_a_new_session(self, client, db_session, enabled):
+        for minutes in (0, 10, 35, 80):
+            client.post("/api/v1/events/user-behavior", json=behavior_payload(event_time=at(minutes)))
+        first, second, third, fourth = stored_sessions(db_session)
+        assert first == second == third  # 25 minutes between the 2nd and 3rd event
+        assert fourth != third
+
+    def test_batch_is_sessionized_in_event_time_order(self, client, db_session, enabled):
+        payloads = [behavior_payload(event_time=at(m), product_id=m) for m in (50, 0, 25, 200)]
+        body = client.post("/api/v1/events/user-behavior/batch", json=payloads).json()
+        assert body["accepted"] == 4
+        sessions = stored_sessions(db_session)
+        assert sessions[0] == sessions[1] == sessions[2] != sessions[3]
+
+    def test_actors_are_separate(self, client, db_session, enabled):
+        client.post("/api/v1/events/user-behavior/batch", json=[
+            behavior_payload(user_id=1),
+            behavior_payload(user_id=2),
+            behavior_payload(user_id=None, session_id="guest-a"),
+            behavior_payload(user_id=None, session_id="guest-b"),
+        ])
+        assert len(set(stored_sessions(db_session))) == 4
+
+    def test_cart_events_use_correlation_id_for_guests(self, client, db_session, enabled):
+        cart = {"correlation_id": "guest-c", "product_id": 1, "action": "add", "quantity": 1}
+        for minutes in (0, 5):
+            res = client.post("/api/v1/events/cart", json={**cart, "event_time": at(minutes)})
+            assert res.status_code == 201
+        first, second = stored_sessions(db_session, CartEvent)
+        assert first is not None and first == second
+
+    def test_late_event_does_not_reopen_session(self, client, db_session, enabled):
+        client.post("/api/v1/events/user-behavior", json=behavior_payload(event_time=at(120)))
+        client.post("/api/v1/events/user-behavior", json=behavior_payload(event_time=at(0)))
+        client.post("/api/v1/events/user-behavior", json=behavior_payload(event_time=at(130)))
+        late, current, later = stored_sessions(db_session)
+        assert current == later != late
+
+    def test_persisted_session_is_used_for_unknown_actor(self, client, db_session, enabled):
+        db_session.add(ActorSession(
+            actor="user:101", session_id="persisted-session", started_at=T0, last_event_at=T0
+        ))
+        db_session.commit()
+        res = client.post("/api/v1/events/user-behavior", json=behavior_payload(event_time=at(20)))
+        assert res.json()["server_session_id"] == "persisted-session"
+
+    def test_disabled_by_default(self, client, db_session):
+        client.post("/api/v1/events/user-behavior", json=behavior_payload())
+        assert stored_sessions(db_session) == [None]
+
+
+class TestFlush:
+
+    def test_changed_sessions_are_written_behind(self, client, db_session, enabled):
+        client.post("/api/v1/events/user-behavior", json=behavior_payload(event_time=at(0)))
+        client.post("/api/v1/events/user-behavior", json=behavior_payload(event_time=at(10)))
+        assert flush_sessions(db_session) == 1
+        assert flush_sessions(db_session) == 0
+
+        row = db_session.get(ActorSession, "user:101")
+        assert row.session_id == stored_sessions(db_session)[0]
+        assert row.last_event_at.replace(tzinfo=timezone.utc) == T0 + timedelta(minutes=10)
+
+        client.post("/api/v1/events/user-behavior", json=behavior_payload(event_time=at(20)))
+        assert flush_sessions(db_session) == 1
+        db_session.expire_all()
+        assert db_session.get(ActorSession, "user:101").last_event_at.replace(
+            tzinfo=timezone.utc
+        ) == T0 + timedelta(minutes=20)
+
+    def test_failed_flush_keeps_sessions(self, db_session, enabled):
+        session_table.assign([("user:1", T0)], GAP)
+
+        def fail(*args):
+            raise RuntimeError("database unavailable")
+
+        broken = SimpleNamespace(get_bind=db_session.get_bind, execute=fail, rollback=lambda: None)
+        with pytest.raises(RuntimeError):
+            flush_sessions(broken)
+        assert flush_sessions(db_session) == 1
+
+
+class TestSessionTable:
+
+    def test_evicted_actor_keeps_unflushed_state(self):
+        table = SessionTable(max_size=1, ttl=60)
+        first = table.assign([("a", T0)], GAP)[0]
+        table.assign([("b", T0)], GAP)
+        assert len(table) == 1
+        assert table.missing(["a"]) == []   # still pending a flush
+        assert table.assign([("a", T0 + GAP)], GAP)[0] == first
+
+    def test_flushed_state_expires(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(sessionizer, "time", SimpleNamespace(monotonic=lambda: now[0]))
+        table = SessionTable(max_size=10, ttl=5)
+        table.assign([("a", T0)], GAP)
+        table.take_dirty()
+        assert table.missing(["a"]) == []
+        now[0] += 6
+        assert table.missing(["a"]) == ["a"]
+
+    def test_load_does_not_override_newer_state(self):
+        table = SessionTable(max_size=10, ttl=60)
+        current = table.assign([("a", T0)], GAP)[0]
+        table.load({"a": SessionState("stale", T0, T0)})
+        assert table.assign([("a", T0)], GAP)[0] == current
@@ -0,0 +1,86 @@
+"""
+Tests for the load simulator (simulator/)
+Covers: generated payloads validate, journey consistency, Zipf skew, percentiles, a short run.
+"""
+import asyncio
+from collections import Counter
+
+import httpx
+
+from app.main import app
+from app.services.ingestion.event_router import EVENT_TYPES
+from simulator.event_generator import EventGenerator, ZipfSampler
+from simulator.http_client import LatencyRecorder, percentile
+from simulator.scenarios import SCENARIOS, batched_requests, run_scenario
+
+
+class TestEventGenerator:
+
+    def test_payloads_validate_against_schemas(self):
+        generator = EventGenerator(n_products=50, seed=7)
+        events = [event for _ in range(200) for event in generator.session()]
+        assert {endpoint for endpoint, _ in events} == set(EVENT_TYPES)
+        for endpoint, payload in events:
+            EVENT_TYPES[endpoint].schema.model_validate(payload)
+
+    def test_sessions_are_time_ordered_and_orders_unique(self):
+        generator = EventGenerator(seed=3)
+        order_ids = []
+        for _ in range(300):
+            session = generator.session()
+            times = [payload["event_time"] for _, payload in session]
+            assert times == sorted(times)
+            order_ids += [payload["order_id"] for endpoint, payload in session if endpoint == "order"]
+        assert order_ids and len(order_ids) == len(set(order_ids))
+
+    def test_seed_is_deterministic(self):
+        first, second = EventGenerator(seed=11), EventGenerator(seed=11)
+        for _ in range(20):
+            a, b = first.session(), second.session()
+            assert [e.payload.get("product_id") for e in a] == [e.payload.get("product_id") for e in b]
+
+    def test_zipf_skew(self):
+        sampler = ZipfSampler(1000, exponent=1.1)
+        counts = Counter(sampler.sample() for _ in range(20_000))
+        assert counts[0] > counts[9] > counts[99]
+
+
+class TestLatencyReporting:
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert (percentile(values, 50), percentile(values, 95), percentile(values, 99)) == (50, 95, 99)
+        assert percentile([], 99) == 0.0
+
+    def test_summary(self):
+        recorder = LatencyRecorder()
+        for ms in range(1, 11):
+            recorder.record("cart", ms / 1000, 201)
+        recorder.record("cart", 0.5, 503)
+        recorder.stop()
+        summary = recorder.summary()
+        assert summary["cart"]["requests"] == 11
+        assert summary["cart"]["errors"] == 1
+        assert summary["cart"]["statuses"] == {"201": 10, "503": 1}
+        assert summary["total"]["p99_ms"] == 500.0
+
+    def test_batched_requests_group_per_endpoint(self):
+        requests = batched_requests(EventGenerator(seed=1).stream(), 5)
+        for _ in range(20):
+            endpoint, body, is_batch = next(requests)
+            assert is_batch and len(body) == 5
+            EVENT_TYPES[endpoint].schema.model_validate(body[0])
+
+
+class TestScenarioRun:
+
+    def test_short_run_against_app(self, client):
+        # one request in flight: the test client shares a single DB session
+        scenario = SCENARIOS["smoke"]._replace(rate=200, duration=0.25, concurrency=1)
+        report = asyncio.run(run_scenario(
+            scenario, "http://test", seed=5, transport=httpx.ASGITransport(app=app)
+        ))
+        total = report["endpoints"]["total"]
+        assert total["requests"] == 50
+        assert total["errors"] == 0
+        assert total["p99_ms"] >= total["p50_ms"] > 0
@@ -0,0 +1,119 @@
+"""
+Tests for GET /analytics/trends
+Covers: hourly/daily/weekly roll-ups of the aggregate table, zero filling,
+product vs global series, the raw tail after the aggregation watermark, and
+range/granularity validation.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+
+from app.analytics import trends
+from app.db.models.user_behavior_events import UserBehaviorEvent
+from app.services.persistence.aggregates import _set_watermark, upsert_hourly_counts
+
+BASE_URL = "/api/v1/analytics/trends"
+MONDAY = datetime(2022, 3, 7, tzinfo=timezone.utc)
+
+
+def add_hour(db, product_id, hour, views=0, searches=0):
+    upsert_hourly_counts(db, {
+        (product_id, hour): {"view_count": views, "search_count": searches, "total_events": views + searches},
+    })
+    db.flush()
+
+
+def add_raw(db, product_id, event_time, ingested_at, event_type="product_viewed"):
+    db.execute(insert(UserBehaviorEvent), [{
+        "event_id": uuid.uuid4(),
+        "event_type": event_type,
+        "event_time": event_time,
+        "ingested_at": ingested_at,
+        "product_id": product_id,
+        "session_id": "sess-trend",
+    }])
+    db.flush()
+
+
+def get_trend(client, start, end, **params):
+    return client.get(BASE_URL, params={"start": start.isoformat(), "end": end.isoformat(), **params})
+
+
+class TestRollups:
+
+    def test_hourly_series_is_zero_filled(self, client, db_session):
+        add_hour(db_session, 9001, MONDAY + timedelta(hours=1), views=3, searches=1)
+        res = get_trend(client, MONDAY, MONDAY + timedelta(hours=3), product_id=9001)
+        assert res.status_code == 200
+        points = res.json()["points"]
+        assert [(p["view_count"], p["search_count"], p["total_events"]) for p in points] == [
+            (0, 0, 0), (3, 1, 4), (0, 0, 0),
+        ]
+
+    def test_daily_and_weekly(self, client, db_session):
+        add_hour(db_session, 9002, MONDAY + timedelta(hours=5), views=2)
+        add_hour(db_session, 9002, MONDAY + timedelta(hours=23), views=1)
+        add_hour(db_session, 9002, MONDAY + timedelta(days=6, hours=12), searches=4)
+        add_hour(db_session, 9002, MONDAY + timedelta(days=7), views=5)
+
+        daily = get_trend(client, MONDAY, MONDAY + timedelta(days=2), product_id=9002, granularity="day")
+        assert [p["total_events"] for p in daily.json()["points"]] == [3, 0]
+
+        weekly = get_trend(
+            client, MONDAY + timedelta(days=2), MONDAY + timedelta(days=8),
+            product_id=9002, granularity="week",
+        ).json()
+        # Widened to whole weeks starting on Monday
+        assert weekly["start"].startswith("2022-03-07T00:00:00")
+        assert weekly["end"].startswith("2022-03-21T00:00:00")
+        assert [(p["view_count"], p["search_count"]) for p in weekly["points"]] == [(3, 4), (5, 0)]
+
+    def test_global_series_sums_products(self, client, db_session):
+        add_hour(db_session, 9003, MONDAY, views=2)
+        add_hour(db_session, 9004, MONDAY, searches=3)
+        points = get_trend(client, MONDAY, MONDAY + timedelta(hours=1)).json()["points"]
+        assert points[0]["total_events"] == 5
+
+
+class TestRawTail:
+
+    def test_events_after_the_watermark_are_added(self, client, db_session):
+        watermark = datetime.now(timezone.utc) - timedelta(minutes=5)
+        _set_watermark(db_session, "hourly_product_behavior", watermark)
+        add_hour(db_session, 9005, MONDAY, views=2)
+        # Already folded into the aggregate: must not be counted again.
+        add_raw(db_session, 9005, MONDAY, ingested_at=watermark - timedelta(minutes=1))
+        add_raw(db_session, 9005, MONDAY + timedelta(minutes=30), ingested_at=watermark + timedelta(minutes=1))
+        add_raw(db_session, 9005, MONDAY + timedelta(hours=1), ingested_at=watermark + timedelta(minutes=2),
+                event_type="product_searched")
+
+        data = get_trend(client, MONDAY, MONDAY + timedelta(hours=2), product_id=9005).json()
+        assert [(p["view_count"], p["search_count"]) for p in data["points"]] == [(3, 0), (0, 1)]
+        assert data["aggregated_until"] is not None
+
+    def test_no_raw_reads_without_a_watermark(self, client, db_session):
+        add_raw(db_session, 9006, MONDAY, ingested_at=datetime.now(timezone.utc))
+        data = get_trend(client, MONDAY, MONDAY + timedelta(hours=1), product_id=9006).json()
+        assert data["points"][0]["total_events"] == 0
+        assert data["aggregated_until"] is None
+
+    def test_inmemory_mode_serves_the_aggregate_only(self, client, db_session, monkeypatch):
+        monkeypatch.setattr(trends, "AGGREGATOR_MODE", "inmemory")
+        watermark = datetime.now(timezone.utc) - timedelta(minutes=5)
+        _set_watermark(db_session, "hourly_product_behavior", watermark)
+        add_raw(db_session, 9007, MONDAY, ingested_at=watermark + timedelta(minutes=1))
+        data = get_trend(client, MONDAY, MONDAY + timedelta(hours=1), product_id=9007).json()
+        assert data["points"][0]["total_events"] == 0
+
+
+class TestValidation:
+
+    def test_unknown_granularity(self, client):
+        assert get_trend(client, MONDAY, MONDAY + timedelta(days=1), granularity="minute").status_code == 422
+
+    def test_too_many_points(self, client):
+        assert get_trend(client, MONDAY, MONDAY + timedelta(days=365)).status_code == 422
+
+    def test_inverted_range(self, client):
+        assert get_trend(client, MONDAY, MONDAY - timedelta(days=1)).status_code == 422
@@ -161,6 +161,43 @@ class TestCreateUserBehaviorEventValidation:
         assert res.status_code == 422
 
 
+# --------------------------------------------------------------------------- #
+# POST — lean response mode (no post-commit re-read)
+# --------------------------------------------------------------------------- #
+class TestLeanResponseMode:
+
+    def test_lean_returns_payload_and_generated_fields(self, client):
+        payload = make_payload(session_id="sess-lean-1", product_id=6001)
+        res = client.post(BASE_URL, params={"response_mode": "lean"}, json=payload)
+        assert res.status_code == 201
+        data = res.json()
+        assert data["session_id"] == "sess-lean-1"
+        assert data["product_id"] == 6001
+        assert data["event_id"]
+        assert data["ingested_at"] is not None   # via RETURNING on SQLite/Postgres
+
+    def test_lean_event_is_persisted(self, client):
+        payload = make_payload(session_id="sess-lean-2", product_id=6002)
+        event_id = client.post(BASE_URL, params={"response_mode": "lean"}, json=payload).json()["event_id"]
+        res = client.get(BASE_URL)
+        assert any(e["event_id"] == event_id for e in res.json())
+
+    def test_invalid_response_mode(self, client):
+        res = client.post(BASE_URL, params={"response_mode": "tiny"}, json=make_payload())
+        assert res.status_code == 422
+
+    def test_lean_duplicate_order_still_conflicts(self, client):
+        order = {
+            "order_id": "INV-LEAN-DUP",
+            "status": "pending",
+            "event_time": "2024-06-01T10:00:00+00:00",
+        }
+        url = "/api/v1/events/order"
+        assert client.post(url, params={"response_mode": "lean"}, json=order).status_code == 201
+        res = client.post(url, params={"response_mode": "lean"}, json=order)
+        assert res.status_code == 409
+
+
 # --------------------------------------------------------------------------- #
 # GET /events/user-behavior
 # --------------------------------------------------------------------------- #